@@ -1,32 +1,119 @@
 """Health analysis API routes"""
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from datetime import datetime
-from app.models.requests import HealthAnalysisRequest, URLAnalysisRequest
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.models.requests import HealthAnalysisRequest, URLAnalysisRequest, AnalysisMode
 from app.models.responses import (
     HealthAnalysisResponse,
     ErrorResponse,
     HealthCheckResponse,
-    IngredientProfileResponse
+    BatchItemResult,
+    BatchAnalysisResponse
 )
-from app.services.health_agent import build_health_copilot
+from app.services.health_agent import BatchAnalyzer, WORKFLOW_STAGES, FAST_WORKFLOW_STAGES
+from app.services.health_agent.copilot import agent_nodes, health_copilot, fast_health_copilot
+from app.services.health_agent.preprocessing import image_preprocessor
+from app.services.health_agent.label_index import label_index
+from app.services.health_agent.ocr import local_label_reader
+from app.utils.json_repair import json_repair_parser
+from app.services.health_agent.ingredient_cache import ingredient_cache
+from app.services.health_agent.canonicalizer import canonicalizer
+from app.services.health_agent.keywords import category_matcher, natural_food_matcher, allergen_matcher
+from app.services.health_agent.wikipedia import wikipedia_fetcher
+from app.services.health_agent.prompt_context import prompt_context
+from app.services.health_agent.profile_store import clinical_profile_store
+from app.services.health_agent.products import product_table
+from app.api.routes.sessions import resolve_health_inputs
 from app.utils.file_handler import file_handler
+from app.utils.hashing import analysis_key
+from app.utils.http_client import http_client
+from app.utils.rate_limit import openfoodfacts_rate_limiter
+from app.utils.cache import ResponseCache
+from app.utils.singleflight import SingleFlight
 from app.utils.logger import logger
 from app.config.settings import settings
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+import json
 
 router = APIRouter(prefix="/api/v1", tags=["health-analysis"])
 
-# Initialize LLM
-llm = ChatGoogleGenerativeAI(
-    model=settings.gemini_model,
-    temperature=settings.gemini_temperature,
-    google_api_key=settings.google_api_key
+# Batch analyzer (shares profiling and ingredient research across images)
+batch_analyzer = BatchAnalyzer(agent_nodes, max_concurrency=settings.batch_max_concurrency)
+
+# Identical concurrent analyses (same image bytes + health profile) share one execution
+analysis_flights = SingleFlight("health_copilot")
+
+# Serialized responses for repeat scans, keyed the same way as coalescing
+response_cache = ResponseCache(
+    max_bytes=settings.response_cache_max_mb * 1024 * 1024,
+    ttl_seconds=settings.response_cache_ttl_seconds
 )
 
-# Build health copilot workflow
-health_copilot = build_health_copilot(llm)
+
+def _copilot(mode: AnalysisMode):
+    """Compiled workflow for an analysis mode"""
+    return fast_health_copilot if mode == "fast" else health_copilot
+
+
+async def _execute_health_copilot(inputs: Dict[str, Any], key: str, mode: AnalysisMode) -> bytes:
+    """Run the workflow once and return (and cache) the serialized response"""
+    
+    # Run health copilot workflow without blocking the event loop
+    result = await _copilot(mode).ainvoke(inputs)
+    
+    logger.info(f"Analysis complete for brand: {result.get('brand_name', 'Unknown')}")
+    
+    response = HealthAnalysisResponse.from_workflow_result(result)
+    body = response.model_dump_json().encode("utf-8")
+    
+    # Don't pin a failed extraction (e.g. transient vision API error) in the cache;
+    # node timings describe this run only, so cache hits return none
+    if settings.response_cache_enabled and result.get("ingredients_list"):
+        response_cache.set(key, response.model_copy(update={"node_timings": {}}).model_dump_json().encode("utf-8"))
+    
+    return body
+
+
+async def _run_health_copilot(
+    image_input: Dict[str, Any],
+    image_digest: str,
+    health_inputs: Dict[str, str],
+    mode: AnalysisMode = "full"
+) -> Response:
+    """
+    Analyze an image, serving repeat scans from the response cache and
+    coalescing with an identical analysis already in flight
+    
+    image_input is {"image_bytes": ...} or {"image_path": ...} (see FileHandler)
+    and is released here: a spilled file is deleted once the analysis reading
+    it finishes, even if this request is cancelled first while coalesced
+    requests still wait on it. health_inputs comes from resolve_health_inputs
+    """
+    
+    def cleanup():
+        file_handler.cleanup_image_input(image_input)
+    
+    key = analysis_key(image_digest, health_inputs["user_raw_health"], mode)
+    
+    body = response_cache.get(key) if settings.response_cache_enabled else None
+    if body is not None:
+        logger.info("Serving analysis from response cache")
+        cleanup()
+    else:
+        # Prepare inputs for health copilot
+        inputs = {
+            **image_input,
+            **health_inputs
+        }
+        
+        logger.info(f"Running health copilot analysis ({mode} mode)...")
+        body = await analysis_flights.do(key, lambda: _execute_health_copilot(inputs, key, mode), cleanup=cleanup)
+    
+    # Body is already-validated JSON; skip re-serialization through the response model
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/health", response_model=HealthCheckResponse)
@@ -39,16 +126,46 @@ async def health_check():
     )
 
 
+@router.get("/metrics")
+async def get_metrics():
+    """Runtime counters for request coalescing, caching, image preprocessing and extraction shortcuts"""
+    return {
+        "coalescing": analysis_flights.stats(),
+        "response_cache": response_cache.stats(),
+        "image_preprocessing": image_preprocessor.stats(),
+        "label_index": label_index.stats(),
+        "local_ocr": local_label_reader.stats(),
+        "json_repair": json_repair_parser.stats(),
+        "barcode_fast_path": product_table.stats(),
+        "ingredient_cache": ingredient_cache.stats(),
+        "canonicalizer": canonicalizer.stats(),
+        "keywords": {
+            "product_categories": category_matcher.stats(),
+            "natural_foods": natural_food_matcher.stats(),
+            "allergens": allergen_matcher.stats()
+        },
+        "http_client": http_client.stats(),
+        "openfoodfacts_rate_limit": openfoodfacts_rate_limiter.stats(),
+        "wikipedia": wikipedia_fetcher.stats(),
+        "prompt_context": prompt_context.stats(),
+        "clinical_profile_cache": clinical_profile_store.stats()
+    }
+
+
 @router.post("/analyze", response_model=HealthAnalysisResponse)
 async def analyze_food_label(
     file: UploadFile = File(..., description="Food label image"),
-    user_health_profile: str = File(..., description="User's health profile")
+    user_health_profile: Optional[str] = File(None, description="User's health profile"),
+    session_id: Optional[str] = File(None, description="Session with a precomputed clinical profile"),
+    mode: AnalysisMode = File("full", description="full or fast (risk analysis and insight in one LLM call)")
 ):
     """
     Analyze a food product label from an uploaded image
     
     - **file**: Food label image (jpg, png, webp)
     - **user_health_profile**: User's health conditions or dietary restrictions
+    - **session_id**: Session from `POST /api/v1/sessions` (instead of user_health_profile)
+    - **mode**: `full` (default) or `fast` (risk analysis and insight from one LLM call)
     
     Returns detailed health analysis including:
     - Brand and ingredient extraction
@@ -58,70 +175,25 @@ async def analyze_food_label(
     - Conversational health insights
     """
     
-    file_path = None
-    
     try:
         logger.info(f"Received analysis request for file: {file.filename}")
         
-        # Save uploaded file
-        file_path = file_handler.save_upload_file(file)
-        
-        # Prepare inputs for health copilot
-        inputs = {
-            "image_path": file_path,
-            "user_raw_health": user_health_profile
-        }
-        
-        logger.info("Running health copilot analysis...")
+        health_inputs = await resolve_health_inputs(user_health_profile, session_id)
         
-        # Run health copilot workflow
-        result = health_copilot.invoke(inputs)
-        
-        logger.info(f"Analysis complete for brand: {result.get('brand_name', 'Unknown')}")
-        
-        # Convert ingredient knowledge base to response models
-        ingredient_profiles = []
-        for item in result.get("ingredient_knowledge_base", []):
-            # Handle both dict and Pydantic model
-            if hasattr(item, 'dict'):
-                item_dict = item.dict() if hasattr(item, 'dict') else item.model_dump()
-            else:
-                item_dict = item
-            
-            ingredient_profiles.append(IngredientProfileResponse(
-                name=item_dict.get("name", "Unknown"),
-                manufacturing=item_dict.get("manufacturing", "Unknown"),
-                regulatory_gap=item_dict.get("regulatory_gap", "No data"),
-                health_risks=item_dict.get("health_risks", "No data"),
-                nova_score=item_dict.get("nova_score", 3)
-            ))
-        
-        # Build response
-        response = HealthAnalysisResponse(
-            success=True,
-            brand_name=result.get("brand_name", "Unknown"),
-            ingredients_list=result.get("ingredients_list", []),
-            user_clinical_profile=result.get("user_clinical_profile", ""),
-            ingredient_knowledge_base=ingredient_profiles,
-            clinical_risk_analysis=result.get("clinical_risk_analysis", ""),
-            product_alternatives=result.get("product_alternatives", []),
-            final_conversational_insight=result.get("final_conversational_insight", ""),
-            decision_color=result.get("decision_color", "#EAB308")  # Default yellow
-        )
+        # Read uploaded image into memory (large uploads spill to disk)
+        image_input, image_digest = await file_handler.load_upload_image(file)
         
-        return response
+        # Releases the spilled upload, if any, once the analysis is done with it
+        return await _run_health_copilot(image_input, image_digest, health_inputs, mode)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error during analysis: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Analysis failed: {str(e)}"
         )
-    
-    finally:
-        # Cleanup uploaded file
-        if file_path and os.path.exists(file_path):
-            file_handler.cleanup_file(file_path)
 
 
 @router.post("/analyze-url", response_model=HealthAnalysisResponse)
@@ -131,72 +203,205 @@ async def analyze_food_label_from_url(request: URLAnalysisRequest):
     
     - **image_url**: Public URL of the food label image
     - **user_health_profile**: User's health conditions or dietary restrictions
+    - **session_id**: Session from `POST /api/v1/sessions` (instead of user_health_profile)
+    - **mode**: `full` (default) or `fast` (risk analysis and insight from one LLM call)
     
     Returns the same detailed analysis as the upload endpoint
     """
     
-    file_path = None
-    
     try:
         logger.info(f"Received analysis request for URL: {request.image_url}")
         
-        # Download image from URL
-        file_path = file_handler.download_from_url(request.image_url)
+        health_inputs = await resolve_health_inputs(request.user_health_profile, request.session_id)
         
-        # Prepare inputs for health copilot
-        inputs = {
-            "image_path": file_path,
-            "user_raw_health": request.user_health_profile
-        }
+        # Download image from URL into memory (size-capped, type checked from magic bytes)
+        image_input, image_digest = await file_handler.download_image(request.image_url)
         
-        logger.info("Running health copilot analysis...")
+        return await _run_health_copilot(image_input, image_digest, health_inputs, request.mode)
         
-        # Run health copilot workflow
-        result = health_copilot.invoke(inputs)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error during URL analysis: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analysis failed: {str(e)}"
+        )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a single server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+async def _stream_health_copilot(
+    inputs: Dict[str, Any],
+    mode: AnalysisMode = "full"
+) -> AsyncIterator[str]:
+    """
+    Run the health copilot and yield server-sent events as each stage finishes
+
+    Node updates are emitted as `<node>` events (extract, profile, research,
+    alternatives, analyze, design); the designer narrative is additionally streamed token by
+    token as `insight_token` events. In fast mode analyze and design arrive
+    together as one `analyze_design` event (no insight tokens). The final
+    `complete` event carries the full HealthAnalysisResponse payload.
+    """
+    
+    final_state = dict(inputs)
+    
+    try:
+        yield _sse_event("started", {"stages": FAST_WORKFLOW_STAGES if mode == "fast" else WORKFLOW_STAGES})
+        
+        async for stream_mode, chunk in _copilot(mode).astream(inputs, stream_mode=["updates", "messages"]):
+            if stream_mode == "messages":
+                # Only the designer narrative is streamed token by token
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "design" and message.content:
+                    yield _sse_event("insight_token", {"token": message.content})
+                continue
+            
+            for node_name, update in chunk.items():
+                if not update:
+                    continue
+                final_state.update(update)
+                logger.info(f"Streaming stage '{node_name}' result")
+                yield _sse_event(node_name, update)
         
-        logger.info(f"Analysis complete for brand: {result.get('brand_name', 'Unknown')}")
+        logger.info(f"Streamed analysis complete for brand: {final_state.get('brand_name', 'Unknown')}")
         
-        # Convert ingredient knowledge base to response models
-        ingredient_profiles = []
-        for item in result.get("ingredient_knowledge_base", []):
-            # Handle both dict and Pydantic model
-            if hasattr(item, 'dict'):
-                item_dict = item.dict() if hasattr(item, 'dict') else item.model_dump()
+        response = HealthAnalysisResponse.from_workflow_result(final_state)
+        yield _sse_event("complete", response.model_dump())
+        
+    except Exception as e:
+        logger.error(f"Error during streamed analysis: {e}", exc_info=True)
+        yield _sse_event("error", {"success": False, "error": "Analysis failed", "detail": str(e)})
+
+
+@router.post("/analyze/stream")
+async def analyze_food_label_stream(
+    file: UploadFile = File(..., description="Food label image"),
+    user_health_profile: Optional[str] = File(None, description="User's health profile"),
+    session_id: Optional[str] = File(None, description="Session with a precomputed clinical profile"),
+    mode: AnalysisMode = File("full", description="full or fast (risk analysis and insight in one LLM call)")
+):
+    """
+    Analyze a food product label and stream results as server-sent events
+    
+    - **file**: Food label image (jpg, png, webp)
+    - **user_health_profile**: User's health conditions or dietary restrictions
+    - **session_id**: Session from `POST /api/v1/sessions` (instead of user_health_profile)
+    - **mode**: `full` (default) or `fast` (risk analysis and insight from one LLM call)
+    
+    Emits one event per workflow stage as soon as it finishes:
+    - `extract`: brand, ingredients and nutrition facts
+    - `profile`: clinical health profile
+    - `research`: ingredient profiles
+    - `alternatives`: product alternatives
+    - `analyze`: clinical risk analysis
+    - `insight_token`: conversational insight, token by token
+    - `design`: final conversational insight and decision color
+    - `analyze_design`: risk analysis, insight and decision color (fast mode, replaces `analyze` and `design`)
+    - `complete`: the full analysis response (same schema as `/analyze`)
+    """
+    
+    logger.info(f"Received streaming analysis request for file: {file.filename}")
+    
+    # Resolve the profile and read the upload before the response starts so errors surface as HTTP errors
+    health_inputs = await resolve_health_inputs(user_health_profile, session_id)
+    image_input, _ = await file_handler.load_upload_image(file)
+    
+    inputs = {
+        **image_input,
+        **health_inputs
+    }
+    
+    # Cleanup runs after the response even if the client disconnects before the stream starts
+    return StreamingResponse(
+        _stream_health_copilot(inputs, mode),
+        background=BackgroundTask(file_handler.cleanup_image_input, image_input),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so events flush immediately
+        }
+    )
+
+
+@router.post("/analyze/batch", response_model=BatchAnalysisResponse)
+async def analyze_food_labels_batch(
+    files: List[UploadFile] = File(..., description="Food label images"),
+    user_health_profile: Optional[str] = File(None, description="User's health profile"),
+    session_id: Optional[str] = File(None, description="Session with a precomputed clinical profile"),
+    mode: AnalysisMode = File("full", description="full or fast (risk analysis and insight in one LLM call)")
+):
+    """
+    Analyze many food product labels for a single health profile
+    
+    - **files**: Food label images (jpg, png, webp)
+    - **user_health_profile**: User's health conditions or dietary restrictions
+    - **session_id**: Session from `POST /api/v1/sessions` (instead of user_health_profile)
+    - **mode**: `full` (default) or `fast` (risk analysis and insight from one LLM call)
+    
+    The health profile is analyzed once and every distinct ingredient across
+    all labels is researched once; per-product results are returned in upload order.
+    """
+    
+    if len(files) > settings.batch_max_images:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many images. Maximum per batch: {settings.batch_max_images}"
+        )
+    
+    health_inputs = await resolve_health_inputs(user_health_profile, session_id)
+    image_inputs = []
+    
+    try:
+        logger.info(f"Received batch analysis request for {len(files)} files")
+        
+        # Read uploaded images into memory (large uploads spill to disk)
+        for file in files:
+            image_input, _ = await file_handler.load_upload_image(file)
+            image_inputs.append(image_input)
+        
+        batch = await batch_analyzer.run(
+            image_inputs,
+            health_inputs["user_raw_health"],
+            user_clinical_profile=health_inputs.get("user_clinical_profile"),
+            mode=mode
+        )
+        
+        results = []
+        for file, state in zip(files, batch["states"]):
+            if state is None:
+                results.append(BatchItemResult(filename=file.filename, success=False, error="Analysis failed"))
             else:
-                item_dict = item
-            
-            ingredient_profiles.append(IngredientProfileResponse(
-                name=item_dict.get("name", "Unknown"),
-                manufacturing=item_dict.get("manufacturing", "Unknown"),
-                regulatory_gap=item_dict.get("regulatory_gap", "No data"),
-                health_risks=item_dict.get("health_risks", "No data"),
-                nova_score=item_dict.get("nova_score", 3)
-            ))
-        
-        # Build response
-        response = HealthAnalysisResponse(
+                results.append(BatchItemResult(
+                    filename=file.filename,
+                    success=True,
+                    analysis=HealthAnalysisResponse.from_workflow_result(state)
+                ))
+        
+        logger.info(f"Batch analysis complete: {sum(r.success for r in results)}/{len(results)} succeeded")
+        
+        return BatchAnalysisResponse(
             success=True,
-            brand_name=result.get("brand_name", "Unknown"),
-            ingredients_list=result.get("ingredients_list", []),
-            user_clinical_profile=result.get("user_clinical_profile", ""),
-            ingredient_knowledge_base=ingredient_profiles,
-            clinical_risk_analysis=result.get("clinical_risk_analysis", ""),
-            product_alternatives=result.get("product_alternatives", []),
-            final_conversational_insight=result.get("final_conversational_insight", "")
+            total_images=len(files),
+            unique_ingredients=batch["unique_ingredients"],
+            user_clinical_profile=batch["user_clinical_profile"],
+            results=results
         )
         
-        return response
-        
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error during URL analysis: {e}", exc_info=True)
+        logger.error(f"Error during batch analysis: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Analysis failed: {str(e)}"
+            detail=f"Batch analysis failed: {str(e)}"
         )
     
     finally:
-        # Cleanup downloaded file
-        if file_path and os.path.exists(file_path):
-            file_handler.cleanup_file(file_path)
+        # Cleanup spilled uploads, if any
+        for image_input in image_inputs:
+            file_handler.cleanup_image_input(image_input)
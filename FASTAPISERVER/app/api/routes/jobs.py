@@ -0,0 +1,78 @@
+"""Background job API routes"""
+
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from app.models.responses import JobCreatedResponse, JobStatusResponse
+from app.services.health_agent import WORKFLOW_STAGES
+from app.services.health_agent.copilot import health_copilot
+from app.services.jobs import JobStore, JobStatus, JobWorkerPool
+from app.utils.file_handler import file_handler
+from app.utils.logger import logger
+from app.config.settings import settings
+
+router = APIRouter(prefix="/api/v1", tags=["jobs"])
+
+# Persistent job queue and the worker pool that drains it (started on app startup)
+job_store = JobStore(settings.job_store_path, max_attempts=settings.job_max_attempts)
+job_worker_pool = JobWorkerPool(
+    job_store,
+    health_copilot,
+    num_workers=settings.job_workers,
+    poll_interval=settings.job_poll_interval,
+    result_ttl=settings.job_result_ttl_seconds
+)
+
+
+@router.post("/jobs", response_model=JobCreatedResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_analysis_job(
+    file: UploadFile = File(..., description="Food label image"),
+    user_health_profile: str = File(..., description="User's health profile")
+):
+    """
+    Queue a food label analysis and return immediately
+    
+    - **file**: Food label image (jpg, png, webp)
+    - **user_health_profile**: User's health conditions or dietary restrictions
+    
+    Poll `GET /api/v1/jobs/{job_id}` for progress and the final result.
+    """
+    
+    # Same validation and MAX_FILE_SIZE cap as /analyze; the job keeps the bytes in its store
+    image_input, _ = await file_handler.load_upload_image(file)
+    try:
+        image = image_input.get("image_bytes")
+        if image is None:
+            image = await asyncio.to_thread(Path(image_input["image_path"]).read_bytes)
+    finally:
+        file_handler.cleanup_image_input(image_input)
+    
+    job_id = await asyncio.to_thread(job_store.create, image, user_health_profile)
+    job_worker_pool.notify()
+    
+    logger.info(f"Queued analysis job {job_id} for file: {file.filename}")
+    return JobCreatedResponse(job_id=job_id, status=JobStatus.QUEUED)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_analysis_job(job_id: str):
+    """Get status, per-stage progress and (once completed) the result of a job"""
+    
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job not found: {job_id}"
+        )
+    
+    return JobStatusResponse(
+        job_id=job["id"],
+        status=job["status"],
+        stages_completed=job["stages"],
+        total_stages=len(WORKFLOW_STAGES),
+        created_at=datetime.fromtimestamp(job["created_at"]).isoformat(),
+        updated_at=datetime.fromtimestamp(job["updated_at"]).isoformat(),
+        result=job["result"],
+        error=job["error"]
+    )
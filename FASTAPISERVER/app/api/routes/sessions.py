@@ -0,0 +1,92 @@
+"""Session API routes (precomputed clinical profiles for repeat scans)"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, HTTPException, status
+from app.models.requests import SessionCreateRequest
+from app.models.responses import SessionResponse
+from app.services.health_agent.copilot import agent_nodes
+from app.services.health_agent.profile_store import clinical_profile_store
+from app.utils.logger import logger
+from app.config.settings import settings
+
+router = APIRouter(prefix="/api/v1", tags=["sessions"])
+
+
+def _session_response(session: Dict[str, Any]) -> SessionResponse:
+    return SessionResponse(
+        session_id=session["id"],
+        user_clinical_profile=session["user_clinical_profile"],
+        expires_at=datetime.fromtimestamp(session["last_used_at"] + settings.session_ttl_seconds).isoformat()
+    )
+
+
+async def resolve_health_inputs(user_health_profile: Optional[str], session_id: Optional[str]) -> Dict[str, str]:
+    """
+    Workflow inputs for the user's health profile: the raw profile text and,
+    for a session, its precomputed clinical profile (so profiling is skipped)
+    """
+
+    if session_id:
+        session = await asyncio.to_thread(clinical_profile_store.get_session, session_id)
+        if session is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Session not found or expired: {session_id}"
+            )
+        return {
+            "user_raw_health": session["user_raw_health"],
+            "user_clinical_profile": session["user_clinical_profile"]
+        }
+
+    if not user_health_profile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either user_health_profile or session_id is required"
+        )
+    return {"user_raw_health": user_health_profile}
+
+
+@router.post("/sessions", response_model=SessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_session(request: SessionCreateRequest):
+    """
+    Profile the user's health once and return a session bound to the result
+
+    - **user_health_profile**: User's health conditions or dietary restrictions
+
+    Pass the returned `session_id` to the analyze endpoints instead of
+    `user_health_profile` to skip clinical profiling on every scan.
+    """
+
+    try:
+        profile = await agent_nodes.health_profiler_node({"user_raw_health": request.user_health_profile})
+    except Exception as e:
+        logger.error(f"Error during session profiling: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Health profiling failed: {str(e)}"
+        )
+
+    session = await asyncio.to_thread(
+        clinical_profile_store.create_session,
+        request.user_health_profile,
+        profile["user_clinical_profile"]
+    )
+
+    logger.info(f"Created session {session['id']}")
+    return _session_response(session)
+
+
+@router.get("/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    """Get a session's clinical profile (extends its lifetime)"""
+
+    session = await asyncio.to_thread(clinical_profile_store.get_session, session_id)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session not found or expired: {session_id}"
+        )
+
+    return _session_response(session)
@@ -36,6 +36,7 @@ class Settings(BaseSettings):
     # File Upload Configuration
     upload_dir: str = "uploads"
     max_file_size: int = 10 * 1024 * 1024  # 10MB
+    upload_spill_threshold: int = 8 * 1024 * 1024  # Larger uploads are spilled to upload_dir
     allowed_extensions_str: str = "jpg,jpeg,png,webp"
     
     @property
@@ -45,6 +46,106 @@ class Settings(BaseSettings):
         extensions = [ext.strip() for ext in self.allowed_extensions_str.split(",")]
         return {f".{ext}" if not ext.startswith(".") else ext for ext in extensions}
     
+    # Image Preprocessing (before the vision call)
+    image_preprocess_enabled: bool = True
+    image_max_long_edge: int = 1600  # Pixels; larger photos are downscaled
+    image_jpeg_quality: int = 85
+    image_grayscale: bool = False
+    image_normalize_contrast: bool = False  # CLAHE on grayscale (implies grayscale)
+    image_preprocess_workers: int = 2  # Processes in the preprocessing pool
+    
+    # Barcode Fast Path (resolve EAN/UPC scans from a local OpenFoodFacts export)
+    barcode_fast_path_enabled: bool = True
+    product_table_path: Optional[str] = None  # OFF JSONL/CSV export (.gz ok), e.g. data/off_products.jsonl.gz
+    barcode_max_long_edge: int = 1280  # Pixels; image is downscaled before barcode detection
+    
+    # Local OpenFoodFacts Catalog (populated by `python -m app.services.catalog.ingest`)
+    catalog_enabled: bool = True  # Query the local catalog instead of OFF when it has been ingested
+    catalog_path: str = "data/catalog.db"
+    catalog_delta_url: str = "https://static.openfoodfacts.org/data/delta/"
+    
+    # Near-duplicate Label Index (reuse extractions for re-scans of the same label)
+    label_index_enabled: bool = True
+    label_index_path: str = "data/label_index.db"
+    label_index_max_distance: int = 4  # Max Hamming distance between 64-bit pHashes
+    label_index_ttl_seconds: int = 30 * 24 * 60 * 60  # 30 days
+    label_index_max_entries: int = 100000  # Least recently used labels are evicted beyond this
+    
+    # Local OCR Tier (Tesseract + rule-based parsing before the vision model; needs the tesseract binary)
+    local_ocr_enabled: bool = True
+    local_ocr_confidence_threshold: float = 0.75  # Reads scoring lower are escalated to the vision model
+    local_ocr_languages: str = "eng"  # Tesseract language codes, e.g. "eng+hin"
+    local_ocr_workers: int = 2  # Processes in the OCR pool
+    local_ocr_timeout_seconds: float = 3.0  # Per image; escalated to the vision model on timeout (added to its latency)
+    
+    # Ingredient Canonicalization (collapse label spellings/E-numbers to one ID)
+    ingredient_aliases_path: Optional[str] = None  # Extra JSON alias table, merged with the bundled one
+    ingredient_fuzzy_threshold: float = 0.85  # Min trigram Dice similarity for a fuzzy alias match
+    
+    # Keyword Vocabularies (product categories, natural foods and allergens)
+    keyword_vocabulary_dir: Optional[str] = None  # Extra <vocabulary>.json files merged with the bundled ones
+    
+    # Ingredient Profile Cache (researched profiles reused across scans)
+    ingredient_cache_enabled: bool = True
+    ingredient_cache_path: str = "data/ingredient_profiles.db"
+    ingredient_cache_ttl_seconds: int = 30 * 24 * 60 * 60  # 30 days
+    ingredient_cache_max_entries: int = 50000  # Least recently used profiles are evicted beyond this
+    
+    # Clinical Profile Cache (health profile text -> clinical profile, reused across scans)
+    clinical_profile_cache_enabled: bool = True
+    clinical_profile_cache_path: str = "data/clinical_profiles.db"
+    clinical_profile_cache_ttl_seconds: int = 7 * 24 * 60 * 60  # 7 days
+    clinical_profile_cache_max_entries: int = 10000  # Least recently used profiles are evicted beyond this
+    session_ttl_seconds: int = 30 * 24 * 60 * 60  # Sessions expire 30 days after their last use
+    
+    # Ingredient Research Enrichment (Wikipedia/OpenFoodFacts context for the research LLM call)
+    enrichment_deadline_seconds: float = 4.0  # Lookups still running after this are dropped
+    openfoodfacts_rate_limit_per_minute: int = 10  # OFF search API allowance
+    openfoodfacts_rate_limit_burst: int = 10
+    alternatives_rate_limit_wait_seconds: float = 2.0  # Alternatives search waiting longer for the OFF rate limit uses no OFF results
+    wikipedia_max_paragraphs: int = 3  # Article download stops once the intro is parsed
+    wikipedia_max_chars: int = 1000
+    
+    # Ingredient Research (LLM profiles for ingredients not in the cache)
+    research_chunk_size: int = 10  # Max ingredients per LLM call; chunks run concurrently
+    research_max_concurrency: int = 4  # Research LLM calls in flight across all requests
+    research_chunk_retries: int = 1  # Re-asks for ingredients a chunk's response missed
+    
+    # Prompt Context (compact ingredient/nutrition/alternatives text for the risk and design prompts)
+    prompt_ingredient_token_budget: int = 1500  # Lower-risk ingredients are summarized beyond this
+    
+    # Response Cache Configuration (repeat scans of the same image + profile)
+    response_cache_enabled: bool = True
+    response_cache_max_mb: int = 64
+    response_cache_ttl_seconds: int = 24 * 60 * 60  # 24 hours
+    
+    # Batch Analysis Configuration
+    batch_max_images: int = 200
+    batch_max_concurrency: int = 4  # Concurrent vision/LLM calls per batch
+    
+    # Background Job Configuration
+    job_store_path: str = "data/jobs.db"
+    job_workers: int = 2  # Size to Groq/Gemini rate limits, not HTTP concurrency
+    job_poll_interval: float = 1.0  # Seconds between queue polls when idle
+    job_max_attempts: int = 3  # Jobs interrupted this many times (e.g. crashing the process) are failed
+    job_result_ttl_seconds: int = 7 * 24 * 60 * 60  # Finished jobs are deleted after 7 days
+    
+    # URL Download Configuration
+    download_connect_timeout: float = 5.0
+    download_read_timeout: float = 10.0  # Max gap between received chunks
+    download_total_timeout: float = 30.0
+    download_max_connections: int = 20  # Concurrent downloads (share the outbound connection pool)
+    
+    # Outbound HTTP Client (shared pool for Wikipedia, OpenFoodFacts and downloads)
+    http_max_connections: int = 100
+    http_max_connections_per_host: int = 20
+    http_keepalive_timeout: float = 60.0  # Seconds an idle connection is kept for reuse
+    http_dns_cache_ttl: int = 300
+    http_connect_timeout: float = 5.0
+    http_timeout: float = 10.0  # Default total timeout per request
+    http_retries: int = 1  # Extra attempts on connection errors, timeouts and 429/5xx
+    http_retry_backoff: float = 0.2  # Seconds, doubled per attempt
+    
     # Logging Configuration
     log_level: str = "INFO"
     log_file: str = "logs/app.log"
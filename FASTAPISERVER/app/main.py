@@ -1,11 +1,19 @@
 """FastAPI main application"""
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from app.config.settings import settings
 from app.middleware.cors import add_cors_middleware
 from app.middleware.error_handler import add_exception_handlers
 from app.api.routes.health_analysis import router as health_router
+from app.api.routes.jobs import router as jobs_router, job_worker_pool, job_store
+from app.api.routes.sessions import router as sessions_router
+from app.services.health_agent.preprocessing import image_preprocessor
+from app.services.health_agent.ocr import local_label_reader
+from app.services.health_agent.products import load_product_table
+from app.services.catalog import catalog_store
+from app.utils.http_client import http_client
 from app.utils.logger import logger
 
 # Create FastAPI application
@@ -25,6 +33,8 @@ add_exception_handlers(app)
 
 # Include routers
 app.include_router(health_router)
+app.include_router(jobs_router)
+app.include_router(sessions_router)
 
 
 @app.on_event("startup")
@@ -33,12 +43,21 @@ async def startup_event():
     logger.info(f"Starting {settings.app_name} v{settings.app_version}")
     logger.info(f"Debug mode: {settings.debug}")
     logger.info(f"CORS origins: {settings.cors_origins}")
+    await asyncio.to_thread(load_product_table)
+    await http_client.start()
+    await job_worker_pool.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on application shutdown"""
     logger.info(f"Shutting down {settings.app_name}")
+    await job_worker_pool.stop()
+    job_store.close()
+    catalog_store.close()
+    await http_client.close()
+    image_preprocessor.shutdown()
+    local_label_reader.shutdown()
 
 
 @app.get("/", tags=["root"])
@@ -1,12 +1,28 @@
 """Pydantic models module"""
 
-from .requests import HealthAnalysisRequest, URLAnalysisRequest
-from .responses import HealthAnalysisResponse, ErrorResponse, IngredientProfileResponse
+from .requests import HealthAnalysisRequest, URLAnalysisRequest, SessionCreateRequest, AnalysisMode
+from .responses import (
+    HealthAnalysisResponse,
+    ErrorResponse,
+    IngredientProfileResponse,
+    BatchItemResult,
+    BatchAnalysisResponse,
+    JobCreatedResponse,
+    JobStatusResponse,
+    SessionResponse,
+)
 
 __all__ = [
     "HealthAnalysisRequest",
     "URLAnalysisRequest",
+    "SessionCreateRequest",
+    "AnalysisMode",
     "HealthAnalysisResponse",
     "ErrorResponse",
     "IngredientProfileResponse",
+    "BatchItemResult",
+    "BatchAnalysisResponse",
+    "JobCreatedResponse",
+    "JobStatusResponse",
+    "SessionResponse",
 ]
@@ -1,7 +1,10 @@
 """Request models for API endpoints"""
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
+
+# full: separate risk analysis and narrative LLM calls; fast: one combined call
+AnalysisMode = Literal["full", "fast"]
 
 
 class HealthAnalysisRequest(BaseModel):
@@ -29,11 +32,19 @@ class URLAnalysisRequest(BaseModel):
         description="Public URL of the food label image",
         example="https://example.com/food-label.jpg"
     )
-    user_health_profile: str = Field(
-        ...,
-        description="User's health conditions, concerns, or dietary restrictions",
+    user_health_profile: Optional[str] = Field(
+        None,
+        description="User's health conditions, concerns, or dietary restrictions (omit when session_id is given)",
         example="I have diabetes and avoid high sugar products"
     )
+    session_id: Optional[str] = Field(
+        None,
+        description="Session from POST /api/v1/sessions; reuses its precomputed clinical profile"
+    )
+    mode: AnalysisMode = Field(
+        "full",
+        description="'fast' produces the risk analysis and the insight in one LLM call (lower latency)"
+    )
     
     class Config:
         json_schema_extra = {
@@ -42,3 +53,13 @@ class URLAnalysisRequest(BaseModel):
                 "user_health_profile": "I am managing cardiovascular health and avoid synthetic dyes."
             }
         }
+
+
+class SessionCreateRequest(BaseModel):
+    """Request model for creating a session bound to a clinical profile"""
+    
+    user_health_profile: str = Field(
+        ...,
+        description="User's health conditions, concerns, or dietary restrictions",
+        example="I have diabetes and avoid high sugar products"
+    )
@@ -35,6 +35,41 @@ class HealthAnalysisResponse(BaseModel):
         None,
         description="Hex color for Quick Decision section (green=#22C55E, yellow=#EAB308, red=#EF4444)"
     )
+    node_timings: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Wall time in milliseconds of each workflow node"
+    )
+    
+    @classmethod
+    def from_workflow_result(cls, result: Dict[str, Any]) -> "HealthAnalysisResponse":
+        """Build a response from the final health copilot workflow state"""
+        
+        # Convert ingredient knowledge base to response models
+        ingredient_profiles = []
+        for item in result.get("ingredient_knowledge_base", []):
+            # Handle both dict and Pydantic model
+            item_dict = item.model_dump() if isinstance(item, BaseModel) else item
+            
+            ingredient_profiles.append(IngredientProfileResponse(
+                name=item_dict.get("name", "Unknown"),
+                manufacturing=item_dict.get("manufacturing", "Unknown"),
+                regulatory_gap=item_dict.get("regulatory_gap", "No data"),
+                health_risks=item_dict.get("health_risks", "No data"),
+                nova_score=item_dict.get("nova_score", 3)
+            ))
+        
+        return cls(
+            success=True,
+            brand_name=result.get("brand_name", "Unknown"),
+            ingredients_list=result.get("ingredients_list", []),
+            user_clinical_profile=result.get("user_clinical_profile", ""),
+            ingredient_knowledge_base=ingredient_profiles,
+            clinical_risk_analysis=result.get("clinical_risk_analysis", ""),
+            product_alternatives=result.get("product_alternatives", []),
+            final_conversational_insight=result.get("final_conversational_insight", ""),
+            decision_color=result.get("decision_color", "#EAB308"),  # Default yellow
+            node_timings=result.get("node_timings") or {}
+        )
     
     class Config:
         json_schema_extra = {
@@ -59,6 +94,53 @@ class HealthAnalysisResponse(BaseModel):
         }
 
 
+class BatchItemResult(BaseModel):
+    """Result for a single image in a batch analysis"""
+    
+    filename: str = Field(..., description="Original filename of the uploaded image")
+    success: bool = Field(..., description="Whether this image was analyzed successfully")
+    analysis: Optional[HealthAnalysisResponse] = Field(None, description="Analysis result if successful")
+    error: Optional[str] = Field(None, description="Error message if the analysis failed")
+
+
+class BatchAnalysisResponse(BaseModel):
+    """Batch health analysis response"""
+    
+    success: bool = Field(..., description="Whether the batch was processed")
+    total_images: int = Field(..., description="Number of images received")
+    unique_ingredients: int = Field(..., description="Distinct ingredients researched across all images")
+    user_clinical_profile: str = Field(..., description="User's health profile analysis (shared by all results)")
+    results: List[BatchItemResult] = Field(..., description="Per-image results in upload order")
+
+
+class JobCreatedResponse(BaseModel):
+    """Response for a newly queued background job"""
+    
+    job_id: str = Field(..., description="Job identifier to poll")
+    status: str = Field(..., description="Initial job status (queued)")
+
+
+class JobStatusResponse(BaseModel):
+    """Background job status and progress"""
+    
+    job_id: str = Field(..., description="Job identifier")
+    status: str = Field(..., description="queued, running, completed or failed")
+    stages_completed: List[str] = Field(..., description="Workflow stages finished so far")
+    total_stages: int = Field(..., description="Number of workflow stages")
+    created_at: str = Field(..., description="Job creation time")
+    updated_at: str = Field(..., description="Last status change")
+    result: Optional[HealthAnalysisResponse] = Field(None, description="Analysis result once completed")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+
+
+class SessionResponse(BaseModel):
+    """Session bound to a precomputed clinical profile"""
+    
+    session_id: str = Field(..., description="Pass to the analyze endpoints instead of user_health_profile")
+    user_clinical_profile: str = Field(..., description="User's health profile analysis")
+    expires_at: str = Field(..., description="Expiry time if the session is not used again")
+
+
 class ErrorResponse(BaseModel):
     """Error response model"""
     
@@ -0,0 +1,5 @@
+"""Local OpenFoodFacts catalog service module"""
+
+from .store import CatalogStore, catalog_store
+
+__all__ = ["CatalogStore", "catalog_store"]
@@ -0,0 +1,104 @@
+"""
+Ingest and refresh the local OpenFoodFacts catalog.
+
+Usage (from FASTAPISERVER/):
+    python -m app.services.catalog.ingest import <export.jsonl.gz|export.csv.gz> [--country en:india]
+    python -m app.services.catalog.ingest refresh [--country en:india]
+    python -m app.services.catalog.ingest stats
+
+`import` loads a full OFF export (JSONL or CSV/TSV, optionally gzipped).
+`refresh` applies OFF's daily delta exports that haven't been applied yet,
+so the catalog stays current without re-importing the full dump.
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from typing import Iterable, Iterator, List, Optional
+import requests
+from app.config.settings import settings
+from app.utils.logger import logger
+from .openfoodfacts import iter_products
+from .store import CatalogStore, catalog_store
+
+BATCH_SIZE = 5000
+APPLIED_DELTAS_KEY = "applied_deltas"
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_file(store: CatalogStore, path: str, country: Optional[str] = None) -> int:
+    """Upsert every product of an OFF export file; returns the number written"""
+    start_time = time.time()
+    written = 0
+    for batch in _batches(iter_products(path), BATCH_SIZE):
+        written += store.upsert_products(batch, country=country)
+        logger.info(f"Catalog import: {written} products written...")
+    logger.info(f"Imported {written} products from {path} in {time.time() - start_time:.1f} seconds")
+    return written
+
+
+def refresh(store: CatalogStore, country: Optional[str] = None) -> int:
+    """Download and apply OFF delta exports not applied yet; returns the number of products written"""
+    base_url = settings.catalog_delta_url.rstrip("/") + "/"
+    index = requests.get(base_url + "index.txt", timeout=30)
+    index.raise_for_status()
+    available = sorted(name.strip() for name in index.text.splitlines() if name.strip())
+
+    applied = set(filter(None, (store.get_meta(APPLIED_DELTAS_KEY) or "").split("\n")))
+    pending = [name for name in available if name not in applied]
+    logger.info(f"Catalog refresh: {len(pending)} of {len(available)} delta files pending")
+
+    written = 0
+    for name in pending:
+        suffix = ".json.gz" if name.endswith(".json.gz") else os.path.splitext(name)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            with requests.get(base_url + name, stream=True, timeout=60) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    tmp.write(chunk)
+        try:
+            written += import_file(store, tmp.name, country=country)
+        finally:
+            os.remove(tmp.name)
+
+        # Record each file as soon as it's applied so an interrupted refresh resumes
+        applied.add(name)
+        store.set_meta(APPLIED_DELTAS_KEY, "\n".join(sorted(applied)))
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local OpenFoodFacts catalog")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import a full OFF JSONL/CSV export")
+    import_parser.add_argument("path", help="Path to the export (.jsonl, .csv, optionally .gz)")
+    import_parser.add_argument("--country", help="Only keep products sold in this country tag (e.g. en:india)")
+
+    refresh_parser = subparsers.add_parser("refresh", help="Apply new OFF delta exports")
+    refresh_parser.add_argument("--country", help="Only keep products sold in this country tag (e.g. en:india)")
+
+    subparsers.add_parser("stats", help="Show catalog size")
+
+    args = parser.parse_args()
+    if args.command == "import":
+        import_file(catalog_store, args.path, country=args.country)
+    elif args.command == "refresh":
+        refresh(catalog_store, country=args.country)
+    print(catalog_store.stats())
+    catalog_store.close()
+
+
+if __name__ == "__main__":
+    main()
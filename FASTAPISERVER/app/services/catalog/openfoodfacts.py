@@ -0,0 +1,141 @@
+"""Parsing helpers for OpenFoodFacts JSONL/CSV exports"""
+
+import csv
+import gzip
+import json
+import re
+import sys
+from typing import Any, Dict, Iterator, List, Optional
+
+# OpenFoodFacts nutriment key -> (NutritionFacts field, multiplier)
+NUTRIMENT_FIELDS = {
+    "energy-kcal": ("calories", 1),
+    "fat": ("total_fat_g", 1),
+    "saturated-fat": ("saturated_fat_g", 1),
+    "sodium": ("sodium_mg", 1000),
+    "carbohydrates": ("carbohydrates_g", 1),
+    "fiber": ("fiber_g", 1),
+    "sugars": ("sugars_g", 1),
+    "proteins": ("protein_g", 1),
+}
+INTEGER_FIELDS = {"calories", "sodium_mg"}
+
+
+def split_ingredients_text(text: str) -> List[str]:
+    """Split an OFF ingredients_text on top-level commas/semicolons (not inside brackets)"""
+    ingredients = []
+    depth = 0
+    current = []
+    for char in text:
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth = max(0, depth - 1)
+        if char in ",;" and depth == 0:
+            ingredients.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    ingredients.append("".join(current))
+
+    cleaned = []
+    for ingredient in ingredients:
+        ingredient = re.sub(r"[_*]", "", ingredient).strip(" .\n\t")
+        if ingredient:
+            cleaned.append(ingredient)
+    return cleaned
+
+
+def normalize_barcode(code: str) -> str:
+    """Canonical key for EAN/UPC codes (UPC-A is stored as its EAN-13 form)"""
+    code = code.strip()
+    return code.zfill(13) if code.isdigit() and len(code) == 12 else code
+
+
+def parse_tags(value: Any) -> List[str]:
+    """Tag list from a JSONL array or a comma-separated CSV column"""
+    if isinstance(value, list):
+        return [str(tag) for tag in value if tag]
+    if isinstance(value, str) and value:
+        return [tag.strip() for tag in value.split(",") if tag.strip()]
+    return []
+
+
+def parse_number(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_nutriments(product: Dict[str, Any]) -> Dict[str, float]:
+    """Per-100g and per-serving values of the nutriments we report"""
+    # JSONL exports nest nutriments; CSV exports flatten them into columns
+    nutriments = product.get("nutriments")
+    if not isinstance(nutriments, dict):
+        nutriments = product
+    values = {}
+    for off_key in NUTRIMENT_FIELDS:
+        for basis in ("_100g", "_serving"):
+            value = parse_number(nutriments.get(f"{off_key}{basis}"))
+            if value is not None:
+                values[f"{off_key}{basis}"] = value
+    return values
+
+
+def nutrition_facts(nutriments: Dict[str, Any], serving_size: Optional[str]) -> Optional[Dict[str, Any]]:
+    """NutritionFacts-shaped dict: per-serving values when the product has them, otherwise per 100g"""
+    basis = "_serving" if any(parse_number(nutriments.get(f"{key}_serving")) is not None for key in NUTRIMENT_FIELDS) else "_100g"
+    nutrition = {"serving_size": serving_size if basis == "_serving" and serving_size else "100g"}
+    for off_key, (field, multiplier) in NUTRIMENT_FIELDS.items():
+        value = parse_number(nutriments.get(f"{off_key}{basis}"))
+        if value is not None:
+            value *= multiplier
+            nutrition[field] = round(value) if field in INTEGER_FIELDS else round(value, 2)
+    return nutrition if len(nutrition) > 1 else None
+
+
+def ingredients_text(product: Dict[str, Any]) -> str:
+    return product.get("ingredients_text_en") or product.get("ingredients_text") or ""
+
+
+def label_record(product: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convert one OFF product (JSONL object, CSV row or catalog row) into a
+    LabelExtraction-shaped dict, or None if it has no barcode or no ingredient list
+    """
+    code = str(product.get("code") or "").strip()
+    text = ingredients_text(product)
+    ingredients = split_ingredients_text(text) if text else []
+    if not code or not ingredients:
+        return None
+
+    brand = (product.get("brands") or "").split(",")[0].strip() or product.get("product_name") or "Unknown"
+    return {
+        "code": normalize_barcode(code),
+        "brand": brand,
+        "ingredients": ingredients,
+        "nutrition": nutrition_facts(extract_nutriments(product), product.get("serving_size")),
+    }
+
+
+def iter_products(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield raw products from an OFF JSONL or CSV/TSV export (optionally gzipped)"""
+    name = path[:-3] if path.endswith(".gz") else path
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as file:
+        if name.endswith((".jsonl", ".json")):
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+        else:
+            # The full OFF CSV export is tab-separated with very long fields
+            csv.field_size_limit(sys.maxsize)
+            delimiter = "\t" if "\t" in file.readline() else ","
+            file.seek(0)
+            yield from csv.DictReader(file, delimiter=delimiter)
@@ -0,0 +1,333 @@
+"""SQLite-backed local OpenFoodFacts catalog"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+from app.config.settings import settings
+from app.utils.logger import logger
+from .openfoodfacts import extract_nutriments, ingredients_text, normalize_barcode, parse_number, parse_tags
+
+# Recent search results kept in memory (common words match many products, so ranking them is the slow query)
+SEARCH_CACHE_SIZE = 4096
+
+# Sort keys for products without a grade/group, so they come after graded ones
+UNKNOWN_GRADE = "z"
+UNKNOWN_NOVA = 9
+
+PRODUCT_COLUMNS = (
+    "code", "product_name", "brands", "categories_tags", "nutriscore_grade", "nova_group",
+    "ingredients_text", "allergens_tags", "labels_tags", "serving_size", "nutriments",
+)
+SELECT_PRODUCT = ", ".join(f"p.{column}" for column in PRODUCT_COLUMNS)
+
+
+def category_key(category: str) -> str:
+    """'en:Potato Crisps' / 'potato-crisps' -> 'potato-crisps'"""
+    category = category.strip().lower()
+    if ":" in category:
+        category = category.split(":", 1)[1]
+    return re.sub(r"[\s_]+", "-", category)
+
+
+def brand_key(brands: str) -> str:
+    """Case/whitespace-insensitive key of a product's first brand"""
+    return " ".join(brands.split(",")[0].lower().split())
+
+
+def fts_query(text: str, any_term: bool = False) -> Optional[str]:
+    """FTS5 query matching all (or any) words of free text, with each word quoted"""
+    terms = re.findall(r"\w+", text.lower())
+    if not terms:
+        return None
+    return (" OR " if any_term else " ").join(f'"{term}"' for term in terms)
+
+
+class CatalogStore:
+    """
+    Local copy of the OpenFoodFacts product database for offline lookups.
+
+    Products are indexed by barcode (primary key), brand, and category with
+    Nutri-Score/NOVA order (so "best products in a category" is an index
+    range scan), plus a full-text index over name, brand and categories
+    standing in for OFF's search endpoint. The server only reads; ingestion
+    and refresh run from the CLI in app.services.catalog.ingest, which WAL
+    mode allows while the server is running. Methods are synchronous (a
+    full-text search on a common word can take tens of ms to rank) - call
+    them via asyncio.to_thread from async code.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._ready = False
+        self._search_cache: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS products (
+                code TEXT PRIMARY KEY,
+                product_name TEXT NOT NULL DEFAULT '',
+                brands TEXT NOT NULL DEFAULT '',
+                brand_key TEXT NOT NULL DEFAULT '',
+                categories_tags TEXT NOT NULL DEFAULT '[]',
+                nutriscore_grade TEXT,
+                nova_group INTEGER,
+                ingredients_text TEXT NOT NULL DEFAULT '',
+                allergens_tags TEXT NOT NULL DEFAULT '[]',
+                labels_tags TEXT NOT NULL DEFAULT '[]',
+                serving_size TEXT,
+                nutriments TEXT NOT NULL DEFAULT '{}',
+                last_modified_t INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_products_brand ON products (brand_key);
+            CREATE INDEX IF NOT EXISTS idx_products_grade ON products (nutriscore_grade, nova_group);
+            CREATE TABLE IF NOT EXISTS product_categories (
+                category TEXT NOT NULL,
+                nutriscore_grade TEXT NOT NULL,
+                nova_group INTEGER NOT NULL,
+                code TEXT NOT NULL,
+                PRIMARY KEY (category, nutriscore_grade, nova_group, code)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_product_categories_code ON product_categories (code);
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(product_name, brands, categories);
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+
+    def is_ready(self) -> bool:
+        """Whether the catalog has been ingested (checked until it has)"""
+        if not self._ready:
+            with self._lock:
+                self._ready = self._conn.execute("SELECT EXISTS (SELECT 1 FROM products)").fetchone()[0] == 1
+        return self._ready
+
+    @staticmethod
+    def _product(row: sqlite3.Row) -> Dict[str, Any]:
+        """Catalog row -> dict shaped like an OFF API product (missing values omitted)"""
+        product = {
+            "code": row["code"],
+            "product_name": row["product_name"],
+            "brands": row["brands"],
+            "categories_tags": json.loads(row["categories_tags"]),
+            "ingredients_text": row["ingredients_text"],
+            "allergens_tags": json.loads(row["allergens_tags"]),
+            "labels_tags": json.loads(row["labels_tags"]),
+            "nutriments": json.loads(row["nutriments"]),
+        }
+        if row["nutriscore_grade"]:
+            product["nutriscore_grade"] = row["nutriscore_grade"]
+        if row["nova_group"] is not None:
+            product["nova_group"] = row["nova_group"]
+        if row["serving_size"]:
+            product["serving_size"] = row["serving_size"]
+        return product
+
+    def get_by_barcode(self, code: str) -> Optional[Dict[str, Any]]:
+        """Product with this EAN/UPC code, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {SELECT_PRODUCT} FROM products p WHERE p.code = ?", (normalize_barcode(code),)
+            ).fetchone()
+        return self._product(row) if row else None
+
+    def get_by_brand(self, brand: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Products whose first brand matches exactly (case-insensitive)"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {SELECT_PRODUCT} FROM products p WHERE p.brand_key = ? LIMIT ?", (brand_key(brand), limit)
+            ).fetchall()
+        return [self._product(row) for row in rows]
+
+    def search(self, text: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        Best full-text matches for free text (like OFF's search_terms):
+        all words must match, falling back to any word. Results are shared
+        between callers - treat them as read-only.
+        """
+        key = (" ".join(text.lower().split()), limit)
+        with self._lock:
+            if key in self._search_cache:
+                self._search_cache.move_to_end(key)
+                return self._search_cache[key]
+
+        results = []
+        for any_term in (False, True):
+            query = fts_query(text, any_term)
+            if query is None:
+                break
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {SELECT_PRODUCT} FROM products_fts f JOIN products p ON p.rowid = f.rowid "
+                    "WHERE products_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                    (query, limit),
+                ).fetchall()
+            if rows:
+                results = [self._product(row) for row in rows]
+                break
+
+        with self._lock:
+            self._search_cache[key] = results
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return results
+
+    def search_many(self, texts: Iterable[str], limit: int = 1) -> Dict[str, List[Dict[str, Any]]]:
+        """search() for each text, so a whole ingredient list costs one thread hop"""
+        return {text: self.search(text, limit) for text in texts}
+
+    def products_in_category(
+        self,
+        category: str,
+        limit: int = 50,
+        nutriscore_grades: Optional[Iterable[str]] = None,
+        max_nova_group: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Named, branded products in a category, best Nutri-Score/NOVA first"""
+        clauses = ["c.category = ?", "p.product_name != ''", "p.brands != ''"]
+        params: List[Any] = [category_key(category)]
+        if nutriscore_grades:
+            grades = [grade.lower() for grade in nutriscore_grades]
+            clauses.append(f"c.nutriscore_grade IN ({', '.join('?' * len(grades))})")
+            params.extend(grades)
+        if max_nova_group is not None:
+            clauses.append("c.nova_group <= ?")
+            params.append(max_nova_group)
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {SELECT_PRODUCT} FROM product_categories c JOIN products p ON p.code = c.code "
+                f"WHERE {' AND '.join(clauses)} "
+                "ORDER BY c.nutriscore_grade, c.nova_group LIMIT ?",
+                params,
+            ).fetchall()
+        return [self._product(row) for row in rows]
+
+    def upsert_products(self, products: Iterable[Dict[str, Any]], country: Optional[str] = None) -> int:
+        """
+        Insert or update raw OFF products (JSONL objects or CSV rows) in one
+        transaction. A stored product is only replaced by a version with an
+        equal or newer last_modified_t. Returns the number of products written.
+        """
+        written = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for raw in products:
+                    if self._upsert(raw, country):
+                        written += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return written
+
+    def _upsert(self, raw: Dict[str, Any], country: Optional[str]) -> bool:
+        code = normalize_barcode(str(raw.get("code") or ""))
+        if not code:
+            return False
+        if country and country not in parse_tags(raw.get("countries_tags")):
+            return False
+
+        last_modified = int(parse_number(raw.get("last_modified_t")) or 0)
+        existing = self._conn.execute(
+            "SELECT rowid, last_modified_t FROM products WHERE code = ?", (code,)
+        ).fetchone()
+        if existing is not None and existing["last_modified_t"] > last_modified:
+            return False
+
+        categories = parse_tags(raw.get("categories_tags"))
+        grade = (raw.get("nutriscore_grade") or "").lower()
+        grade = grade if grade in ("a", "b", "c", "d", "e") else None
+        nova = parse_number(raw.get("nova_group"))
+        nova = int(nova) if nova is not None else None
+        values = (
+            raw.get("product_name") or "",
+            raw.get("brands") or "",
+            brand_key(raw.get("brands") or ""),
+            json.dumps(categories),
+            grade,
+            nova,
+            ingredients_text(raw),
+            json.dumps(parse_tags(raw.get("allergens_tags"))),
+            json.dumps(parse_tags(raw.get("labels_tags"))),
+            raw.get("serving_size") or None,
+            json.dumps(extract_nutriments(raw)),
+            last_modified,
+        )
+
+        if existing is None:
+            rowid = self._conn.execute(
+                "INSERT INTO products (product_name, brands, brand_key, categories_tags, nutriscore_grade, "
+                "nova_group, ingredients_text, allergens_tags, labels_tags, serving_size, nutriments, "
+                "last_modified_t, code) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values + (code,),
+            ).lastrowid
+        else:
+            rowid = existing["rowid"]
+            self._conn.execute(
+                "UPDATE products SET product_name = ?, brands = ?, brand_key = ?, categories_tags = ?, "
+                "nutriscore_grade = ?, nova_group = ?, ingredients_text = ?, allergens_tags = ?, "
+                "labels_tags = ?, serving_size = ?, nutriments = ?, last_modified_t = ? WHERE rowid = ?",
+                values + (rowid,),
+            )
+            self._conn.execute("DELETE FROM product_categories WHERE code = ?", (code,))
+            self._conn.execute("DELETE FROM products_fts WHERE rowid = ?", (rowid,))
+
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO product_categories (category, nutriscore_grade, nova_group, code) VALUES (?, ?, ?, ?)",
+            [
+                (category_key(category), grade or UNKNOWN_GRADE, nova if nova is not None else UNKNOWN_NOVA, code)
+                for category in categories
+            ],
+        )
+        self._conn.execute(
+            "INSERT INTO products_fts (rowid, product_name, brands, categories) VALUES (?, ?, ?, ?)",
+            (rowid, values[0], values[1], " ".join(category_key(c).replace("-", " ") for c in categories)),
+        )
+        return True
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO catalog_meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Product and category counts"""
+        with self._lock:
+            products = self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            categories = self._conn.execute("SELECT COUNT(DISTINCT category) FROM product_categories").fetchone()[0]
+        return {"products": products, "categories": categories}
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+        logger.info("Catalog store closed")
+
+
+# Global catalog store instance (populated by `python -m app.services.catalog.ingest`)
+catalog_store = CatalogStore(settings.catalog_path)
@@ -1,6 +1,7 @@
 """Health Agent service module"""
 
-from .workflow import build_health_copilot
+from .workflow import build_health_copilot, WORKFLOW_STAGES, FAST_WORKFLOW_STAGES
 from .state import HealthCoPilotState
+from .batch import BatchAnalyzer
 
-__all__ = ["build_health_copilot", "HealthCoPilotState"]
+__all__ = ["build_health_copilot", "WORKFLOW_STAGES", "FAST_WORKFLOW_STAGES", "HealthCoPilotState", "BatchAnalyzer"]
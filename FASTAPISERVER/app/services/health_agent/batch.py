@@ -0,0 +1,143 @@
+import asyncio
+from typing import List, Dict, Any, Optional
+from .nodes import AgentNodes
+from .tools import IngredientProfile
+from .canonicalizer import canonicalizer
+from app.utils.logger import logger
+
+
+class BatchAnalyzer:
+    """
+    Analyze many food labels for one user with shared work de-duplicated:
+    the clinical profile is computed once and ingredient research runs once
+    over the union of all extracted ingredient lists.
+
+    Takes the shared AgentNodes, so batches draw on the same research
+    concurrency limit as interactive scans.
+    """
+
+    def __init__(self, nodes: AgentNodes, max_concurrency: int = 4):
+        self.nodes = nodes
+        self.tools = nodes.tools
+        self.max_concurrency = max(1, max_concurrency)
+
+    @staticmethod
+    def _ingredient_key(ingredient: str) -> str:
+        """Canonical ingredient ID used to de-duplicate ingredients across labels"""
+        return canonicalizer.key(ingredient)
+
+    def _union_ingredients(self, extractions: List[Dict[str, Any]]) -> List[str]:
+        """Ordered union of all ingredient lists (first spelling seen wins)"""
+        unique = {}
+        for extraction in extractions:
+            for ingredient in extraction["ingredients_list"]:
+                key = self._ingredient_key(ingredient)
+                if key and key not in unique:
+                    unique[key] = ingredient
+        return list(unique.values())
+
+    async def _analyze_product(
+        self,
+        extraction: Dict[str, Any],
+        shared: Dict[str, Any],
+        knowledge_by_key: Dict[str, IngredientProfile],
+        mode: str = "full",
+    ) -> Dict[str, Any]:
+        """Run the per-product stages (alternatives, risk analysis, narrative) on shared research"""
+        state = {**shared, **extraction}
+        state["ingredient_knowledge_base"] = [
+            knowledge_by_key[key]
+            for key in (self._ingredient_key(ing) for ing in extraction["ingredients_list"])
+            if key in knowledge_by_key
+        ]
+        if mode == "fast":
+            # One call writes the risk analysis and the narrative, and needs the alternatives for it
+            state.update(await self.nodes.alternatives_node(state))
+            state.update(await self.nodes.risk_and_design_node(state))
+            return state
+
+        # Alternatives only need the brand, so look them up while the risks are analyzed
+        alternatives, analysis = await asyncio.gather(
+            self.nodes.alternatives_node(state),
+            self.nodes.risk_analyzer_node(state)
+        )
+        state.update(alternatives)
+        state.update(analysis)
+        state.update(await self.nodes.conversational_designer_node(state))
+        return state
+
+    async def run(
+        self,
+        image_inputs: List[Dict[str, Any]],
+        user_raw_health: str,
+        user_clinical_profile: Optional[str] = None,
+        mode: str = "full",
+    ) -> Dict[str, Any]:
+        """
+        Analyze all images for one user.
+
+        Each image input is {"image_bytes": ...} or {"image_path": ...}.
+        A precomputed user_clinical_profile (from a session) skips profiling;
+        mode="fast" writes each risk analysis and narrative in one LLM call.
+
+        Returns a dict with the shared `user_clinical_profile`, the number of
+        `unique_ingredients` researched, and `states`: one final workflow state
+        per image in input order (None where the analysis failed).
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start_time = __import__('time').time()
+
+        async def bounded(coro):
+            async with semaphore:
+                return await coro
+
+        # Clinical profile only depends on the user, so compute it once alongside extraction
+        profile_task = asyncio.create_task(
+            self.nodes.health_profiler_node({
+                "user_raw_health": user_raw_health,
+                "user_clinical_profile": user_clinical_profile
+            })
+        )
+
+        try:
+            extractions = await asyncio.gather(
+                *(bounded(self.nodes.extractor_node(image_input)) for image_input in image_inputs)
+            )
+            logger.info(f"Batch extracted {len(extractions)} labels in {__import__('time').time() - start_time:.2f} seconds")
+
+            # Research every distinct ingredient exactly once
+            unique_ingredients = self._union_ingredients(extractions)
+            total_ingredients = sum(len(e["ingredients_list"]) for e in extractions)
+            logger.info(f"Batch researching {len(unique_ingredients)} unique ingredients (from {total_ingredients} total)")
+
+            knowledge = await self.tools.fetch_clinical_evidence_batch(unique_ingredients)
+            knowledge_by_key = {
+                self._ingredient_key(ing): profile
+                for ing, profile in zip(unique_ingredients, knowledge)
+            }
+
+            shared = {"user_raw_health": user_raw_health, **(await profile_task)}
+        finally:
+            # Don't leave profiling running if extraction or research failed
+            if not profile_task.done():
+                profile_task.cancel()
+
+        results = await asyncio.gather(
+            *(bounded(self._analyze_product(extraction, shared, knowledge_by_key, mode)) for extraction in extractions),
+            return_exceptions=True
+        )
+
+        states = []
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                logger.error(f"Batch analysis failed for image {index}: {result}")
+                states.append(None)
+            else:
+                states.append(result)
+
+        logger.info(f"Batch analysis of {len(image_inputs)} images completed in {__import__('time').time() - start_time:.2f} seconds")
+        return {
+            "user_clinical_profile": shared.get("user_clinical_profile", ""),
+            "unique_ingredients": len(unique_ingredients),
+            "states": states
+        }
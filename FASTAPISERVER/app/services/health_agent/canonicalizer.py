@@ -0,0 +1,288 @@
+"""Ingredient name canonicalization (E/INS numbers, synonyms, fuzzy matches)"""
+
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from app.config.settings import settings
+from app.utils.logger import logger
+
+DEFAULT_ALIASES_PATH = os.path.join(os.path.dirname(__file__), "data", "ingredient_aliases.json")
+
+# "E330", "e-330", "INS 330", "E 150d", "INS 500(ii)" -> "e330", "e150d", "e500ii"
+E_NUMBER_RE = re.compile(r"\b(?:e|ins)\s*[-.]?\s*(\d{3,4})\s*([a-h])?\s*(?:\(\s*([iv]+)\s*\))?(?![a-z0-9])")
+E_CODE_RE = re.compile(r"^e\d{3,4}[a-h]?(?:[iv]+)?$")
+# Additive codes after a functional class, with or without the E/INS prefix: "Emulsifiers (322, e471)", "Raising agent 500(ii)"
+CLASS_CODE_RE = re.compile(r"(?<![a-z0-9])e?(\d{3,4})([a-h])?(?:\(([iv]+)\)|([iv]+))?(?![a-z0-9])")
+PERCENT_RE = re.compile(r"\d+(?:[.,]\d+)?\s*%")
+PARENS_RE = re.compile(r"[(\[]([^()\[\]]*)[)\]]")
+
+
+# Functional classes and other umbrella terms: never fuzzy-matched, and a label entry that
+# names specific additives ("Colours (E102, E110)") resolves to those, not to the class
+GENERIC_IDS = frozenset({
+    "emulsifier", "stabilizer", "thickener", "acidity-regulator", "antioxidant", "preservative", "colour",
+    "flavour-enhancer", "raising-agent", "anticaking-agent", "humectant", "sweetener", "vitamins", "minerals",
+    "spices-and-condiments"
+})
+
+
+class CanonicalIngredient(NamedTuple):
+    """Canonical ID (stable cache/research key) and display name of an ingredient"""
+    id: str
+    name: str
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII text with E/INS numbers unified and percentages and punctuation dropped (brackets and commas kept)"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    text = PERCENT_RE.sub(" ", text)
+    text = E_NUMBER_RE.sub(lambda m: f" e{m[1]}{m[2] or ''}{m[3] or ''} ", text)
+    text = re.sub(r"[^a-z0-9()\[\],]+", " ", text)
+    return " ".join(text.split())
+
+
+def flatten(text: str) -> str:
+    """Normalized text with brackets and commas removed too"""
+    return " ".join(re.sub(r"[()\[\],]", " ", text).split())
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def tokens_match(query: str, alias: str) -> bool:
+    """
+    Same number of words, each a near-exact spelling of the alias word: exact
+    below 5 letters, one edit below 9, two edits beyond ("suqar" is sugar,
+    but "vitamin b1" is not "vitamin b6" and "onion" is not "onion powder")
+    """
+    query_tokens, alias_tokens = query.split(), alias.split()
+    return len(query_tokens) == len(alias_tokens) and all(
+        edit_distance(q, a) <= (0 if len(a) < 5 else 1 if len(a) < 9 else 2)
+        for q, a in zip(query_tokens, alias_tokens)
+    )
+
+
+class IngredientCanonicalizer:
+    """
+    Map raw label strings ("SUGAR (sucrose)", "INS 330", "Citric Acid (E330)")
+    to canonical ingredient IDs.
+
+    Resolution order against the exact alias table: a single E/INS number
+    anywhere in the string, the whole normalized string, a single bracketed
+    ingredient ("Edible vegetable oil (palmolein)" is palm oil), then the
+    string without bracketed parts; then a trigram (Dice) fuzzy match of the
+    string without brackets, accepted only if every word matches too
+    (tokens_match) and never to a functional class or other umbrella term.
+    Bracketed comma lists are sub-ingredients of a compound ("Milk chocolate
+    (sugar, ...)") and are not used. A functional class followed by additive
+    codes, with or without the E/INS prefix ("Emulsifiers (322, 471)"),
+    resolves to those additives: one code is that additive, several get a
+    combined ID, so the class alone never stands in for them. Unknown
+    ingredients get an ID derived from the normalized text without brackets,
+    so spelling variants still collapse. Results are memoized, so repeated
+    strings cost one dict lookup.
+    """
+
+    def __init__(self, fuzzy_threshold: float = 0.85, memo_size: int = 50000):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.memo_size = memo_size
+        self._aliases: Dict[str, CanonicalIngredient] = {}
+        self._alias_keys: List[str] = []
+        self._alias_grams: List[frozenset] = []
+        self._trigram_index: Dict[str, List[int]] = {}
+        self._known_ids: set = set()
+        self._memo: "OrderedDict[str, CanonicalIngredient]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.memo_hits = 0
+        self.exact = 0
+        self.fuzzy = 0
+        self.unknown = 0
+
+    def add(self, name: str, aliases: Iterable[str] = ()):
+        """Register a canonical ingredient under its name and aliases"""
+        canonical = CanonicalIngredient(slugify(name), name)
+        self._known_ids.add(canonical.id)
+        for alias in (name, *aliases):
+            key = flatten(normalize(alias))
+            if not key or key in self._aliases:
+                continue
+            self._aliases[key] = canonical
+            # E-numbers are only matched exactly; fuzzy matching them would confuse e.g. e330/e331
+            if not E_CODE_RE.match(key) and canonical.id not in GENERIC_IDS:
+                position = len(self._alias_keys)
+                grams = frozenset(trigrams(key))
+                self._alias_keys.append(key)
+                self._alias_grams.append(grams)
+                for gram in grams:
+                    self._trigram_index.setdefault(gram, []).append(position)
+        self._memo.clear()
+
+    def load(self, path: str) -> int:
+        """Add entries from a JSON list of {"name": ..., "aliases": [...]}; returns the entry count"""
+        with open(path, encoding="utf-8") as file:
+            entries = json.load(file)
+        for entry in entries:
+            self.add(entry["name"], entry.get("aliases", ()))
+        return len(entries)
+
+    def _exact(self, key: str) -> Optional[CanonicalIngredient]:
+        match = self._aliases.get(key)
+        if match is None and E_CODE_RE.match(key):
+            # Fall back from a sub-numbered code (e500ii) to its group (e500)
+            match = self._aliases.get(re.sub(r"[iv]+$", "", key))
+        return match
+
+    def _fuzzy(self, key: str) -> Optional[CanonicalIngredient]:
+        """Best alias with trigram Dice similarity >= fuzzy_threshold (prefix-filtered)"""
+        grams = trigrams(key)
+        size = len(grams)
+        threshold = self.fuzzy_threshold
+        # Dice >= t needs at least this many shared trigrams, so every match must
+        # contain one of the (size - min_overlap + 1) rarest query trigrams
+        min_overlap = math.ceil(size * threshold / (2 - threshold))
+        rarest = sorted(grams, key=lambda gram: len(self._trigram_index.get(gram, ())))
+        candidates = set()
+        for gram in rarest[:size - min_overlap + 1]:
+            candidates.update(self._trigram_index.get(gram, ()))
+
+        # Dice >= t is only possible when the other set's size is within these bounds
+        low = size * threshold / (2 - threshold)
+        high = size * (2 - threshold) / threshold
+        best, best_score = None, threshold
+        for position in candidates:
+            other = self._alias_grams[position]
+            if not low <= len(other) <= high:
+                continue
+            score = 2 * len(grams & other) / (size + len(other))
+            if score >= best_score and tokens_match(key, self._alias_keys[position]):
+                best, best_score = position, score
+        return self._aliases[self._alias_keys[best]] if best is not None else None
+
+    def _functional_class(self, normalized: str) -> Optional[CanonicalIngredient]:
+        """The functional class a label entry starts with ("emulsifiers (322, 471)" -> Emulsifier), if any"""
+        head = re.split(r"[(\[]", normalized, maxsplit=1)[0]
+        match = self._aliases.get(flatten(CLASS_CODE_RE.sub(" ", head)))
+        return match if match is not None and match.id in GENERIC_IDS else None
+
+    def _additives(self, functional_class: CanonicalIngredient, normalized: str) -> Optional[CanonicalIngredient]:
+        """The additives named by codes after a functional class; None if there are no codes"""
+        codes = list(dict.fromkeys(
+            f"e{m[1]}{m[2] or ''}{m[3] or m[4] or ''}" for m in CLASS_CODE_RE.finditer(normalized)
+        ))
+        if not codes:
+            return None
+        additives = [
+            (code, self._exact(code) or CanonicalIngredient(code, f"{functional_class.name} (E{code[1:]})"))
+            for code in codes
+        ]
+        if len(additives) == 1:
+            return additives[0][1]
+        # Codes stay in the name, so the name canonicalizes back to the same ID
+        return CanonicalIngredient(
+            "+".join(additive.id for _, additive in additives),
+            f"{functional_class.name} ({', '.join(f'E{code[1:]} {additive.name}' for code, additive in additives)})"
+        )
+
+    def _resolve(self, raw: str) -> CanonicalIngredient:
+        normalized = normalize(raw)
+        functional_class = self._functional_class(normalized)
+        if functional_class is not None:
+            additives = self._additives(functional_class, normalized)
+            if additives is not None:
+                self.exact += 1
+                return additives
+
+        key = flatten(normalized)
+        base = flatten(PARENS_RE.sub(" ", normalized))
+        inner = [flatten(part) for part in PARENS_RE.findall(normalized) if "," not in part]
+
+        codes = {token for token in key.split() if E_CODE_RE.match(token)}
+        candidates = list(codes) if len(codes) == 1 else []
+        candidates += [key, *inner, base]
+        for candidate in candidates:
+            match = self._exact(candidate) if candidate else None
+            if match is not None:
+                self.exact += 1
+                return match
+
+        if len(base) >= 4:
+            match = self._fuzzy(base)
+            if match is not None:
+                self.fuzzy += 1
+                return match
+
+        self.unknown += 1
+        display = re.sub(r"[*†‡_]+", "", PERCENT_RE.sub("", raw))
+        display = " ".join(display.split()).strip(" .,:;-") or raw.strip()
+        return CanonicalIngredient(slugify(base or key) or slugify(raw), display)
+
+    def canonicalize(self, raw: str) -> CanonicalIngredient:
+        """Canonical ID and name for a raw ingredient string"""
+        with self._lock:
+            self.lookups += 1
+            cached = self._memo.get(raw)
+            if cached is not None:
+                self.memo_hits += 1
+                self._memo.move_to_end(raw)
+                return cached
+
+            result = self._resolve(raw)
+            self._memo[raw] = result
+            if len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+            return result
+
+    def key(self, raw: str) -> str:
+        """Canonical ID only (cache/research key)"""
+        return self.canonicalize(raw).id
+
+    def is_known(self, raw: str) -> bool:
+        """Whether the string resolves to an ingredient in the alias table"""
+        return all(part in self._known_ids for part in self.canonicalize(raw).id.split("+"))
+
+    def stats(self) -> Dict[str, float]:
+        """Alias table size and how lookups were resolved, for metrics"""
+        return {
+            "aliases": len(self._aliases),
+            "lookups": self.lookups,
+            "memo_hits": self.memo_hits,
+            "exact": self.exact,
+            "fuzzy": self.fuzzy,
+            "unknown": self.unknown
+        }
+
+
+def build_canonicalizer() -> IngredientCanonicalizer:
+    """Canonicalizer loaded with the bundled alias table plus INGREDIENT_ALIASES_PATH, if set"""
+    canonicalizer = IngredientCanonicalizer(fuzzy_threshold=settings.ingredient_fuzzy_threshold)
+    count = canonicalizer.load(DEFAULT_ALIASES_PATH)
+    if settings.ingredient_aliases_path:
+        count += canonicalizer.load(settings.ingredient_aliases_path)
+    logger.info(f"Loaded {count} canonical ingredients ({canonicalizer.stats()['aliases']} aliases)")
+    return canonicalizer
+
+
+# Global canonicalizer instance
+canonicalizer = build_canonicalizer()
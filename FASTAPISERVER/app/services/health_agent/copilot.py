@@ -0,0 +1,20 @@
+"""Shared health copilot instances used by the API routes and background workers"""
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+from app.config.settings import settings
+from .nodes import AgentNodes
+from .workflow import build_health_copilot
+
+# Initialize LLM
+llm = ChatGoogleGenerativeAI(
+    model=settings.gemini_model,
+    temperature=settings.gemini_temperature,
+    google_api_key=settings.google_api_key
+)
+
+# Workflow nodes (also used directly, e.g. to profile a new session)
+agent_nodes = AgentNodes(llm)
+
+# Build health copilot workflows (full: separate risk analysis and narrative calls; fast: one call)
+health_copilot = build_health_copilot(llm, agent_nodes)
+fast_health_copilot = build_health_copilot(llm, agent_nodes, mode="fast")
@@ -0,0 +1,126 @@
+"""Persistent cache of researched ingredient profiles"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable
+from app.config.settings import settings
+from app.utils.logger import logger
+
+
+class IngredientProfileCache:
+    """
+    SQLite-backed map from canonical ingredient ID to its IngredientProfile (stored as JSON).
+
+    Entries expire ttl_seconds after they were researched; when more than
+    max_entries are stored, the least recently used are evicted. Lookups
+    are batched so a whole ingredient list costs one query.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ingredient_profiles (
+                key TEXT PRIMARY KEY,
+                profile TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ingredient_profiles_created ON ingredient_profiles (created_at);
+            CREATE INDEX IF NOT EXISTS idx_ingredient_profiles_used ON ingredient_profiles (last_used_at);
+            """
+        )
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM ingredient_profiles").fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Return {key: profile JSON} for the keys that are cached and not expired"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, profile FROM ingredient_profiles "
+                f"WHERE key IN ({', '.join('?' * len(keys))}) AND created_at > ?",
+                (*keys, now - self.ttl_seconds),
+            ).fetchall()
+            found = dict(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE ingredient_profiles SET last_used_at = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+            self.lookups += len(keys)
+            self.hits += len(found)
+        return found
+
+    def set_many(self, profiles: Dict[str, str]):
+        """Store {key: profile JSON}, then drop expired and least recently used entries"""
+        if not profiles:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO ingredient_profiles (key, profile, created_at, last_used_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET profile = excluded.profile, "
+                "created_at = excluded.created_at, last_used_at = excluded.last_used_at",
+                [(key, profile, now, now) for key, profile in profiles.items()],
+            )
+            self._conn.execute(
+                "DELETE FROM ingredient_profiles WHERE created_at <= ?", (now - self.ttl_seconds,)
+            )
+            entries = self._conn.execute("SELECT COUNT(*) FROM ingredient_profiles").fetchone()[0]
+            if entries > self.max_entries:
+                evicted = self._conn.execute(
+                    "DELETE FROM ingredient_profiles WHERE key IN ("
+                    "SELECT key FROM ingredient_profiles ORDER BY last_used_at LIMIT ?)",
+                    (entries - self.max_entries,),
+                ).rowcount
+                self.evictions += evicted
+                entries -= evicted
+                logger.info(f"Evicted {evicted} least recently used ingredient profiles")
+            self._conn.commit()
+            self._entries = entries
+
+    def clear(self):
+        """Drop every cached profile"""
+        with self._lock:
+            self._conn.execute("DELETE FROM ingredient_profiles")
+            self._conn.commit()
+            self._entries = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Hit ratio and size for metrics"""
+        return {
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+
+# Global ingredient profile cache instance
+ingredient_cache = IngredientProfileCache(
+    settings.ingredient_cache_path,
+    ttl_seconds=settings.ingredient_cache_ttl_seconds,
+    max_entries=settings.ingredient_cache_max_entries
+)
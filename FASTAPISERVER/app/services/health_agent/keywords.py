@@ -0,0 +1,176 @@
+"""Keyword vocabularies (product categories, natural foods, allergens) matched in one pass"""
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+from app.config.settings import settings
+from app.utils.logger import logger
+
+DEFAULT_VOCABULARY_DIR = os.path.join(os.path.dirname(__file__), "data", "keywords")
+
+
+class KeywordMatch(NamedTuple):
+    """A vocabulary term found in a text (offsets are into the normalized text)"""
+    label: str
+    term: str
+    start: int
+    end: int
+
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII with punctuation collapsed to single spaces ("Lay's Ready-to-Eat" -> "lay s ready to eat")"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a vocabulary of labelled terms.
+
+    Terms and texts are normalized the same way, and a term only matches on
+    word boundaries ("nuts" matches "mixed nuts", not "doughnuts"; "roll" not
+    "rolled oats"). All matches are found in one pass over the text, however
+    many terms there are. Labels keep the vocabulary order, which best()
+    uses as priority.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._labels: List[str] = []
+        self._rank: Dict[str, int] = {}
+        self._terms: Dict[str, str] = {}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._term_at: Dict[int, str] = {}
+        self._outputs: List[List[str]] = [[]]
+        self._built = True
+        self._lock = threading.Lock()
+        self.build_ms = 0.0
+        self.scans = 0
+        self.matches = 0
+
+    def add(self, label: str, terms: Iterable[str]):
+        """Register terms under a label; matching rebuilds the automaton if needed"""
+        if label not in self._rank:
+            self._rank[label] = len(self._labels)
+            self._labels.append(label)
+        for term in terms:
+            key = normalize(term)
+            if not key or key in self._terms:
+                continue
+            self._terms[key] = label
+            state = 0
+            for char in key:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._outputs.append([])
+                state = next_state
+            self._term_at[state] = key
+        self._built = False
+
+    def load(self, path: str) -> int:
+        """Add entries from a JSON list of {"label": ..., "terms": [...]}; returns the entry count"""
+        with open(path, encoding="utf-8") as file:
+            entries = json.load(file)
+        for entry in entries:
+            self.add(entry["label"], entry["terms"])
+        return len(entries)
+
+    def build(self) -> "KeywordMatcher":
+        """Compute failure links (breadth first) so matching never backtracks"""
+        start = time.perf_counter()
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            self._outputs[state] = [self._term_at[state]] if state in self._term_at else []
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # Terms ending at the fallback state also end here ("dark chocolate" also ends "chocolate")
+                own = [self._term_at[next_state]] if next_state in self._term_at else []
+                self._outputs[next_state] = own + self._outputs[self._fail[next_state]]
+        self._built = True
+        self.build_ms = round((time.perf_counter() - start) * 1000, 2)
+        return self
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Every vocabulary term in text, on word boundaries, in order of position"""
+        if not self._built:
+            self.build()
+        text = normalize(text or "")
+        found = []
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state] and (end == len(text) or text[end] == " "):
+                for term in outputs[state]:
+                    start = end - len(term)
+                    if start == 0 or text[start - 1] == " ":
+                        found.append(KeywordMatch(self._terms[term], term, start, end))
+        found.sort(key=lambda match: (match.start, -match.end))
+        with self._lock:
+            self.scans += 1
+            self.matches += len(found)
+        return found
+
+    def labels(self, *texts: str) -> Set[str]:
+        """Labels of all terms found in any of the texts"""
+        return {match.label for text in texts for match in self.find_all(text)}
+
+    def contains(self, *texts: str) -> bool:
+        """Whether any term occurs in any of the texts"""
+        return any(self.find_all(text) for text in texts)
+
+    def best(self, text: str) -> Optional[str]:
+        """Label found in text that comes first in the vocabulary (None if nothing matches)"""
+        labels = self.labels(text)
+        return min(labels, key=self._rank.__getitem__) if labels else None
+
+    def stats(self) -> Dict[str, float]:
+        """Vocabulary size and scan counters for metrics"""
+        return {
+            "labels": len(self._labels),
+            "terms": len(self._terms),
+            "states": len(self._goto),
+            "build_ms": self.build_ms,
+            "scans": self.scans,
+            "matches": self.matches
+        }
+
+
+def build_matcher(vocabulary: str) -> KeywordMatcher:
+    """Matcher for data/keywords/<vocabulary>.json plus the same file in KEYWORD_VOCABULARY_DIR, if present"""
+    matcher = KeywordMatcher(vocabulary)
+    count = matcher.load(os.path.join(DEFAULT_VOCABULARY_DIR, f"{vocabulary}.json"))
+    if settings.keyword_vocabulary_dir:
+        extra_path = os.path.join(settings.keyword_vocabulary_dir, f"{vocabulary}.json")
+        if os.path.exists(extra_path):
+            count += matcher.load(extra_path)
+    matcher.build()
+    stats = matcher.stats()
+    logger.info(f"Built '{vocabulary}' keyword matcher: {count} labels, {stats['terms']} terms in {stats['build_ms']} ms")
+    return matcher
+
+
+# Global keyword matchers (built once at startup)
+category_matcher = build_matcher("product_categories")
+natural_food_matcher = build_matcher("natural_foods")
+allergen_matcher = build_matcher("allergens")
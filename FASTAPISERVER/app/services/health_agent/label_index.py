@@ -0,0 +1,197 @@
+"""Near-duplicate label index keyed by perceptual image hashes"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import settings
+from app.utils.logger import logger
+
+HASH_BITS = 64
+
+
+def _to_signed(value: int) -> int:
+    """Map an unsigned 64-bit hash onto SQLite's signed INTEGER range"""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+class LabelHashIndex:
+    """
+    Persistent map from label pHash to a previous LabelExtraction (stored as JSON).
+
+    Lookups use multi-index hashing: the 64-bit hash is split into
+    max_distance + 1 disjoint segments, so by pigeonhole any hash within
+    max_distance bits matches the query exactly on at least one segment.
+    Each segment has its own exact-match table, so a lookup only verifies
+    the few candidates sharing a segment instead of scanning every entry.
+    Extraction records stay in SQLite and are loaded only on a hit.
+
+    Entries expire ttl_seconds after they were stored; when more than
+    max_entries are stored, the least recently used are evicted.
+    """
+
+    def __init__(self, db_path: str, max_distance: int, ttl_seconds: int, max_entries: int):
+        self.max_distance = max(0, max_distance)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._segments = self._segment_layout(self.max_distance + 1)
+        self._tables: List[Dict[int, List[int]]] = [defaultdict(list) for _ in self._segments]
+        self._hashes: Dict[int, int] = {}  # Row id -> unsigned pHash
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS label_hashes (
+                id INTEGER PRIMARY KEY,
+                phash INTEGER NOT NULL,
+                extraction TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_label_hashes_created ON label_hashes (created_at);
+            CREATE INDEX IF NOT EXISTS idx_label_hashes_used ON label_hashes (last_used_at);
+            """
+        )
+        self._load()
+
+    @staticmethod
+    def _segment_layout(num_segments: int) -> List[Tuple[int, int]]:
+        """(shift, mask) for each of num_segments near-equal bit ranges of the hash"""
+        layout = []
+        shift = 0
+        for i in range(num_segments):
+            width = HASH_BITS // num_segments + (1 if i < HASH_BITS % num_segments else 0)
+            layout.append((shift, (1 << width) - 1))
+            shift += width
+        return layout
+
+    def _load(self):
+        start_time = time.perf_counter()
+        self._evict(time.time())
+        for row_id, phash in self._conn.execute("SELECT id, phash FROM label_hashes"):
+            self._insert(row_id, _to_unsigned(phash))
+        logger.info(f"Loaded {len(self._hashes)} label hashes in {time.perf_counter() - start_time:.2f} seconds")
+
+    def _insert(self, row_id: int, phash: int):
+        self._hashes[row_id] = phash
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            table[(phash >> shift) & mask].append(row_id)
+
+    def _remove(self, row_id: int):
+        phash = self._hashes.pop(row_id, None)
+        if phash is None:
+            return
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            segment = (phash >> shift) & mask
+            table[segment].remove(row_id)
+            if not table[segment]:
+                del table[segment]
+
+    def _within(self, phash: int) -> List[Tuple[int, int]]:
+        """(distance, row id) of every stored hash within max_distance, closest first"""
+        matches = {}
+        for table, (shift, mask) in zip(self._tables, self._segments):
+            for row_id in table.get((phash >> shift) & mask, ()):
+                if row_id not in matches:
+                    matches[row_id] = (self._hashes[row_id] ^ phash).bit_count()
+        return sorted((distance, row_id) for row_id, distance in matches.items() if distance <= self.max_distance)
+
+    def _evict(self, now: float):
+        """Drop expired entries, then the least recently used beyond max_entries (lock held or during init)"""
+        expired = [row_id for (row_id,) in self._conn.execute(
+            "SELECT id FROM label_hashes WHERE created_at <= ?", (now - self.ttl_seconds,)
+        )]
+        entries = self._conn.execute("SELECT COUNT(*) FROM label_hashes").fetchone()[0] - len(expired)
+        evicted = []
+        if entries > self.max_entries:
+            evicted = [row_id for (row_id,) in self._conn.execute(
+                "SELECT id FROM label_hashes WHERE created_at > ? ORDER BY last_used_at, id LIMIT ?",
+                (now - self.ttl_seconds, entries - self.max_entries),
+            )]
+            self.evictions += len(evicted)
+            logger.info(f"Evicted {len(evicted)} least recently used label hashes")
+        if expired or evicted:
+            self._conn.executemany("DELETE FROM label_hashes WHERE id = ?", [(row_id,) for row_id in expired + evicted])
+            self._conn.commit()
+            for row_id in expired + evicted:
+                self._remove(row_id)
+
+    def lookup(self, phash: int) -> Optional[str]:
+        """Return the stored extraction JSON for the closest unexpired near-duplicate label, if any"""
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            matches = self._within(phash)
+            if not matches:
+                return None
+            distances = {row_id: distance for distance, row_id in matches}
+            rows = self._conn.execute(
+                f"SELECT id, extraction FROM label_hashes "
+                f"WHERE id IN ({', '.join('?' * len(distances))}) AND created_at > ?",
+                (*distances, now - self.ttl_seconds),
+            ).fetchall()
+            if not rows:
+                return None
+            row_id, extraction = min(rows, key=lambda row: distances[row[0]])
+            self._conn.execute("UPDATE label_hashes SET last_used_at = ? WHERE id = ?", (now, row_id))
+            self._conn.commit()
+            self.hits += 1
+
+        logger.info(f"Label index hit at Hamming distance {distances[row_id]}")
+        return extraction
+
+    def add(self, phash: int, extraction_json: str):
+        """Remember an extraction (serialized LabelExtraction) for this label hash"""
+        now = time.time()
+        with self._lock:
+            exact = next((row_id for distance, row_id in self._within(phash) if distance == 0), None)
+            if exact is not None:
+                self._conn.execute(
+                    "UPDATE label_hashes SET extraction = ?, created_at = ?, last_used_at = ? WHERE id = ?",
+                    (extraction_json, now, now, exact),
+                )
+                self._conn.commit()
+                return
+
+            cursor = self._conn.execute(
+                "INSERT INTO label_hashes (phash, extraction, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+                (_to_signed(phash), extraction_json, now, now),
+            )
+            self._conn.commit()
+            self._insert(cursor.lastrowid, phash)
+            self._evict(now)
+
+    def stats(self) -> Dict[str, float]:
+        """Lookup/hit counters and index size for metrics"""
+        return {
+            "entries": len(self._hashes),
+            "max_entries": self.max_entries,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "evictions": self.evictions,
+            "max_distance": self.max_distance
+        }
+
+
+# Global label index instance
+label_index = LabelHashIndex(
+    settings.label_index_path,
+    max_distance=settings.label_index_max_distance,
+    ttl_seconds=settings.label_index_ttl_seconds,
+    max_entries=settings.label_index_max_entries
+)
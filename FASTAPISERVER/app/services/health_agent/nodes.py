@@ -1,15 +1,38 @@
+import asyncio
+from pydantic import BaseModel, Field
 from .state import HealthCoPilotState
 from .tools import ProHealthTools
+from .prompt_context import prompt_context
+from .keywords import natural_food_matcher
+from .profile_store import clinical_profile_store
+from app.config.settings import settings
 from langchain_google_genai import ChatGoogleGenerativeAI
 from app.utils.logger import logger
 
+# Risk analysis instructions (own call in full mode, part of the single call in fast mode)
+RISK_ANALYSIS_TASK = """1. Identify direct conflicts between user health and ingredient manufacturing.
+        2. Highlight 'Regulatory Gaps' (e.g., banned in EU but user is consuming it).
+        3. Quantify uncertainty if scientific data is conflicting."""
+
+
+class RiskAndInsight(BaseModel):
+    """Fast mode output: risk analysis and conversational insight from one call"""
+    clinical_risk_analysis: str = Field(description="Risk analysis of the product for this user")
+    final_conversational_insight: str = Field(description="The complete 6-section response including COLOR_CODE")
+
+
 class AgentNodes:
     def __init__(self, llm: ChatGoogleGenerativeAI):
         self.llm = llm
         self.tools = ProHealthTools(llm)
-
-    def extractor_node(self, state: HealthCoPilotState):
-        data = self.tools.extract_label_data(state["image_path"])
+        self.risk_and_insight_llm = llm.with_structured_output(RiskAndInsight)
+
+    async def extractor_node(self, state: HealthCoPilotState):
+        # Prefer the in-memory image; fall back to a file on disk
+        image = state.get("image_bytes")
+        if image is None:
+            image = state["image_path"]
+        data = await self.tools.extract_label_data(image)
         nutrition_dict = data.nutrition.dict() if data.nutrition else None
         return {
             "brand_name": data.brand,
@@ -17,19 +40,32 @@ class AgentNodes:
             "nutrition_facts": nutrition_dict
         }
 
-    def health_profiler_node(self, state: HealthCoPilotState):
+    async def health_profiler_node(self, state: HealthCoPilotState):
+        # Sessions carry a precomputed profile; otherwise reuse one generated for the same profile text
+        if state.get("user_clinical_profile"):
+            return {"user_clinical_profile": state["user_clinical_profile"]}
+        if settings.clinical_profile_cache_enabled:
+            cached = await asyncio.to_thread(clinical_profile_store.get, state["user_raw_health"])
+            if cached:
+                logger.info("Clinical profile served from cache")
+                return {"user_clinical_profile": cached}
+
         prompt = f"""
         SYSTEM: Clinical Health Profiler.
         INPUT: {state['user_raw_health']}
         TASK: Convert user symptoms or diseases into precise bio-chemical triggers (e.g., 'Hypertension' -> 'Sodium/Vasoconstrictors').
         """
-        res = self.llm.invoke(prompt)
+        res = await self.llm.ainvoke(prompt)
+        if settings.clinical_profile_cache_enabled and res.content:
+            await asyncio.to_thread(clinical_profile_store.set, state["user_raw_health"], res.content)
         return {"user_clinical_profile": res.content}
 
-    def researcher_node(self, state: HealthCoPilotState):
-        # Batch analyze all ingredients in a single AI call (optimized!)
-        knowledge = self.tools.fetch_clinical_evidence_batch(state["ingredients_list"])
-        
+    async def researcher_node(self, state: HealthCoPilotState):
+        # Research all ingredients (cached profiles reused, the rest in concurrent AI calls)
+        knowledge = await self.tools.fetch_clinical_evidence_batch(state["ingredients_list"])
+        return {"ingredient_knowledge_base": knowledge}
+
+    async def alternatives_node(self, state: HealthCoPilotState):
         # Parse user profile for alternatives filtering
         # user_raw_health is a string like "Allergies: Peanuts, Gluten. Dietary preferences: Vegan"
         user_profile_dict = {}
@@ -48,25 +84,24 @@ class AgentNodes:
                 user_profile_dict["diet"] = "vegetarian"
         
         
-        alternatives = self.tools.find_better_alternatives(
+        alternatives = await self.tools.find_better_alternatives(
             state["brand_name"], 
             state["ingredients_list"],
             user_health=state["user_raw_health"],  # Pass raw health string for OpenFoodFacts
             category=None  # Will be auto-detected from OpenFoodFacts
         )
-        return {"ingredient_knowledge_base": knowledge, "product_alternatives": alternatives}
+        return {"product_alternatives": alternatives}
 
-    def risk_analyzer_node(self, state: HealthCoPilotState):
+    async def risk_analyzer_node(self, state: HealthCoPilotState):
         prompt = f"""
         SYSTEM: Clinical Reasoning Engine.
         USER: {state['user_clinical_profile']}
-        PRODUCT DATA: {state['ingredient_knowledge_base']}
+        PRODUCT DATA:
+        {prompt_context.ingredient_table(state['ingredient_knowledge_base'], label='Risk prompt ingredient')}
         TASK: Conduct a risk analysis.
-        1. Identify direct conflicts between user health and ingredient manufacturing.
-        2. Highlight 'Regulatory Gaps' (e.g., banned in EU but user is consuming it).
-        3. Quantify uncertainty if scientific data is conflicting.
+        {RISK_ANALYSIS_TASK}
         """
-        res = self.llm.invoke(prompt)
+        res = await self.llm.ainvoke(prompt)
         return {"clinical_risk_analysis": res.content}
 
     def _has_nutrition_data(self, nutrition: dict) -> bool:
@@ -82,11 +117,42 @@ class AgentNodes:
                     return True
         return False
 
-    def conversational_designer_node(self, state: HealthCoPilotState):
+    async def conversational_designer_node(self, state: HealthCoPilotState):
+        prompt = self._design_prompt(state, state['clinical_risk_analysis'][:500])
+        res = await self.llm.ainvoke(prompt)
+        return self._insight_result(res.content)
+
+    async def risk_and_design_node(self, state: HealthCoPilotState):
+        # Fast mode: one structured call writes the risk analysis and the narrative built on it
+        risk_note = "(not written yet - write it first as clinical_risk_analysis, see SINGLE-PASS OUTPUT below)"
+        prompt = self._design_prompt(state, risk_note) + f"""
+
+**SINGLE-PASS OUTPUT – RETURN BOTH FIELDS:**
+1. clinical_risk_analysis: Act as a clinical reasoning engine for the User Health Profile and Ingredient Details above and conduct a risk analysis.
+{RISK_ANALYSIS_TASK}
+2. final_conversational_insight: The complete response described above (all 6 sections plus **COLOR_CODE:**), consistent with your clinical_risk_analysis."""
+        
+        try:
+            result = await self.risk_and_insight_llm.ainvoke(prompt)
+        except Exception as e:
+            # Output that fails to parse or validate raises; treat it like an empty result
+            logger.warning(f"Single-pass analysis failed: {e!r}")
+            result = None
+        if result is None or not result.final_conversational_insight:
+            # Unparseable structured output: fall back to the two full-mode calls
+            logger.warning("Single-pass analysis returned no insight; falling back to separate calls")
+            analysis = await self.risk_analyzer_node(state)
+            return {**analysis, **(await self.conversational_designer_node({**state, **analysis}))}
+        return {
+            "clinical_risk_analysis": result.clinical_risk_analysis,
+            **self._insight_result(result.final_conversational_insight)
+        }
+
+    def _design_prompt(self, state: HealthCoPilotState, risks: str) -> str:
+        """Prompt for the conversational insight; risks is the (abridged) risk analysis"""
         # Extract key info for enriched, contextual response
         brand = state['brand_name']
         ingredients = state['ingredients_list']  # All ingredients for full context
-        risks = state['clinical_risk_analysis']
         alts = state['product_alternatives']
         profile = state['user_clinical_profile']
         ingredient_kb = state['ingredient_knowledge_base']  # All ingredient analysis
@@ -97,18 +163,8 @@ class AgentNodes:
         
         # Format nutrition data with validation status
         if has_real_nutrition:
-            nutrition_info = f"""**EXTRACTED FROM LABEL - USE THESE EXACT VALUES:**
-- Serving Size: {nutrition.get('serving_size', 'per serving')}
-- Calories/Energy: {nutrition.get('calories', 0)} kcal per serving
-- Total Fat: {nutrition.get('total_fat_g', 0)}g
-- Saturated Fat: {nutrition.get('saturated_fat_g', 0)}g  
-- Sodium: {nutrition.get('sodium_mg', 0)}mg
-- Carbohydrates: {nutrition.get('carbohydrates_g', 0)}g
-- Fiber: {nutrition.get('fiber_g', 0)}g
-- Sugars: {nutrition.get('sugars_g', 0)}g
-- Protein: {nutrition.get('protein_g', 0)}g
-- Potassium: {nutrition.get('potassium_mg', 'not listed')}mg
-- Iron: {nutrition.get('iron_mg', 'not listed')}mg
+            nutrition_info = f"""**EXTRACTED FROM LABEL - USE THESE EXACT VALUES (per serving; values not listed were not on the label):**
+{prompt_context.nutrition(nutrition)}
 
 ⚠️ IMPORTANT: These values were extracted from the label. YOU MUST USE THEM."""
         else:
@@ -118,11 +174,8 @@ The OCR system could not read nutrition facts from this image.
 - Do NOT estimate or guess nutrition values
 - If discussing nutrition, say "The label's nutrition facts weren't readable in the image\""""
         
-        # Detect if product is a natural whole food
-        natural_food_keywords = ['date', 'dates', 'fruit', 'fruits', 'nuts', 'almonds', 'cashews', 
-                                  'raisins', 'dried', 'fresh', 'honey', 'jaggery', 'makhana', 'foxnuts']
-        is_natural_food = any(keyword in brand.lower() or keyword in ' '.join(ingredients).lower() 
-                              for keyword in natural_food_keywords)
+        # Detect if product is a natural whole food (vocabulary in data/keywords/natural_foods.json)
+        is_natural_food = natural_food_matcher.contains(brand, *ingredients)
         
         product_type_hint = ""
         if is_natural_food:
@@ -145,9 +198,11 @@ Product: {brand}
 Key Ingredients: {', '.join(ingredients)}
 NUTRITION FACTS: {nutrition_info}
 User Health Profile: {profile}
-Risk Analysis: {risks[:500]}
-Ingredient Details: {ingredient_kb}
-Available Alternatives: {alts}
+Risk Analysis: {risks}
+Ingredient Details:
+{prompt_context.ingredient_table(ingredient_kb, label='Design prompt ingredient')}
+Available Alternatives:
+{prompt_context.alternatives(alts)}
 {product_type_hint}
 
 **ANTI-JARGON RULES (CRITICAL):**
@@ -302,11 +357,11 @@ REMINDER: You MUST include ALL 6 sections with these EXACT headers:
 4. **Tradeoffs:**
 5. **What I'm Unsure About:**
 6. **Better Options:**"""
-        
-        res = self.llm.invoke(prompt)
-        
+        return prompt
+
+    def _insight_result(self, response_text: str) -> dict:
+        """State update for a generated insight: the text plus its decision color"""
         # DEBUG LOGGING - Check if all sections are present
-        response_text = res.content
         logger.info("="*80)
         logger.info("GEMINI RESPONSE - FULL TEXT:")
         logger.info(response_text)
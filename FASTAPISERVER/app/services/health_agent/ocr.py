@@ -0,0 +1,333 @@
+"""Local label OCR (Tesseract) with rule-based parsing, tried before the vision model"""
+
+import asyncio
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+import numpy as np
+from app.config.settings import settings
+from app.utils.logger import logger
+from .canonicalizer import canonicalizer
+from .preprocessing import unpack_ocr_page
+
+try:
+    import pytesseract
+except ImportError:  # Optional: without it every extraction goes to the vision model
+    pytesseract = None
+
+INGREDIENTS_RE = re.compile(r"\bingred[il1]ents?\b\s*[:;.\-]?\s*", re.IGNORECASE)
+# Headings that end the ingredient list when it has no closing full stop
+SECTION_END_RE = re.compile(
+    r"\b(?:nutrition(?:al)?\s+(?:information|facts|value)|allergen|allergy advice|contains\s*:|may contain|"
+    r"manufactured|marketed|packed by|best before|use by|storage|store in|net (?:wt|weight|quantity)|"
+    r"mfd|customer care|fssai|directions)\b",
+    re.IGNORECASE
+)
+NUTRITION_RE = re.compile(r"\bnutrition(?:al)?\b|\bkcal\b", re.IGNORECASE)
+PERCENT_RE = re.compile(r"\(?\s*\d+(?:[.,]\d+)?\s*%\s*\)?")
+NUMBER_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(kcal|kj|mg|g)?\b", re.IGNORECASE)
+SERVING_RE = re.compile(r"serving\s+size\s*[:\-]?\s*([^\n]{1,30})", re.IGNORECASE)
+# (field, label pattern, unit the field is stored in); earlier patterns win for one label
+NUTRITION_LINES = [
+    ("calories", re.compile(r"\b(?:energy|calories)\b", re.IGNORECASE), "kcal"),
+    ("saturated_fat_g", re.compile(r"\bsaturated\b", re.IGNORECASE), "g"),
+    (None, re.compile(r"\btrans\b|\bunsaturated\b", re.IGNORECASE), None),
+    ("total_fat_g", re.compile(r"\bfat\b", re.IGNORECASE), "g"),
+    ("sodium_mg", re.compile(r"\bsodium\b", re.IGNORECASE), "mg"),
+    ("fiber_g", re.compile(r"\bfib(?:re|er)\b", re.IGNORECASE), "g"),
+    ("sugars_g", re.compile(r"\bsugars?\b", re.IGNORECASE), "g"),
+    ("carbohydrates_g", re.compile(r"\bcarbohydrates?\b|\bcarbs\b", re.IGNORECASE), "g"),
+    ("protein_g", re.compile(r"\bproteins?\b", re.IGNORECASE), "g"),
+]
+
+
+class OcrLine(NamedTuple):
+    """A line of OCR text with its mean word confidence (0-1) and median word height in pixels"""
+    text: str
+    confidence: float
+    height: float
+
+
+class LocalExtraction(NamedTuple):
+    """Label fields parsed from OCR text and how much to trust them (0-1)"""
+    brand: Optional[str]
+    ingredients: List[str]
+    nutrition: Optional[Dict[str, Any]]
+    confidence: float
+
+
+def read_label_lines(page: np.ndarray, languages: str, timeout: float) -> List[OcrLine]:
+    """
+    OCR a binarized label page (see preprocessing.binarize_for_ocr) with
+    Tesseract, returning its text lines. Runs in a worker process.
+    """
+    binary = unpack_ocr_page(page)
+    words = pytesseract.image_to_data(
+        binary, lang=languages, config="--psm 3", output_type=pytesseract.Output.DICT, timeout=timeout
+    )
+    lines: Dict[tuple, list] = {}
+    for i, text in enumerate(words["text"]):
+        confidence = float(words["conf"][i])
+        if text.strip() and confidence >= 0:
+            key = (words["block_num"][i], words["par_num"][i], words["line_num"][i])
+            lines.setdefault(key, []).append((text.strip(), confidence, words["height"][i]))
+    return [
+        OcrLine(
+            " ".join(text for text, _, _ in line),
+            statistics.fmean(confidence for _, confidence, _ in line) / 100,
+            statistics.median(height for _, _, height in line)
+        )
+        for _, line in sorted(lines.items())
+    ]
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas/semicolons outside brackets ("Chocolate (sugar, cocoa), salt" is two items)"""
+    items, depth, current = [], 0, []
+    for char in text:
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth = max(0, depth - 1)
+        if char in ",;" and depth == 0:
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    items.append("".join(current))
+    return items
+
+
+def parse_ingredients(text: str) -> Optional[List[str]]:
+    """Ingredient list after the "Ingredients:" heading (None when there is no heading)"""
+    match = INGREDIENTS_RE.search(text)
+    if match is None:
+        return None
+
+    section = text[match.end():]
+    end = SECTION_END_RE.search(section)
+    if end:
+        section = section[:end.start()]
+    # The list ends at the first full stop outside brackets that is not a decimal point
+    depth = 0
+    for i, char in enumerate(section):
+        depth += (char in "([{") - (char in ")]}" and depth > 0)
+        if char == "." and depth == 0 and not (section[i - 1:i].isdigit() and section[i + 1:i + 2].isdigit()):
+            section = section[:i]
+            break
+    section = re.sub(r"-\n(?=[a-z])", "", section)  # Words hyphenated across lines
+    section = " ".join(section.split())
+
+    ingredients = []
+    for item in _split_top_level(section):
+        item = PERCENT_RE.sub(" ", item)
+        item = re.sub(r"^\s*(?:and|&)\s+", "", " ".join(item.split())).strip(" .:*-")
+        if 2 <= len(item) <= 80 and re.search(r"[a-zA-Z]{2}", item):
+            ingredients.append(item)
+    return ingredients
+
+
+def _nutrition_labels(line: str) -> List[tuple]:
+    """
+    (field, unit, value text) for each nutrient label on a line. Label words
+    with no number between them form one label ("Saturated Fat"), named by
+    the earliest matching pattern; its values run up to the next label, so
+    "Carbohydrate 20g of which sugars 5g" yields both nutrients.
+    """
+    matches = sorted(
+        (match.start(), match.end(), priority)
+        for priority, (_, pattern, _) in enumerate(NUTRITION_LINES)
+        for match in pattern.finditer(line)
+    )
+    groups: List[list] = []  # [start, end, priority]
+    for start, end, priority in matches:
+        if groups and not re.search(r"\d", line[groups[-1][1]:start]):
+            groups[-1][1] = max(groups[-1][1], end)
+            groups[-1][2] = min(groups[-1][2], priority)
+        else:
+            groups.append([start, end, priority])
+
+    labels = []
+    for i, (_, end, priority) in enumerate(groups):
+        field, _, unit = NUTRITION_LINES[priority]
+        next_start = groups[i + 1][0] if i + 1 < len(groups) else len(line)
+        labels.append((field, unit, line[end:next_start]))
+    return labels
+
+
+def parse_nutrition(text: str) -> Optional[Dict[str, Any]]:
+    """Nutrition facts from table lines ("Sodium 170mg"); first value per nutrient (per serving/100g as printed)"""
+    nutrition: Dict[str, Any] = {}
+    for line in text.splitlines():
+        for field, unit, value_text in _nutrition_labels(line):
+            if field is None or field in nutrition:
+                continue
+            values = [(float(number.replace(",", ".")), (found_unit or "").lower())
+                      for number, found_unit in NUMBER_RE.findall(value_text)]
+            if field == "calories":
+                kcal = [value for value, found_unit in values if found_unit == "kcal"]
+                kj = [value for value, found_unit in values if found_unit == "kj"]
+                value = kcal[0] if kcal else (kj[0] / 4.184 if kj else (values[0][0] if values else None))
+                if value is not None:
+                    nutrition[field] = round(value)
+            elif values:
+                value, found_unit = values[0]
+                if unit == "mg" and found_unit == "g":
+                    value *= 1000
+                elif unit == "g" and found_unit == "mg":
+                    value /= 1000
+                nutrition[field] = round(value) if unit == "mg" else value
+
+    serving = SERVING_RE.search(text)
+    if serving:
+        nutrition["serving_size"] = serving[1].strip(" :.")
+    return nutrition or None
+
+
+def parse_brand(lines: List[OcrLine]) -> Optional[str]:
+    """Tallest mostly-alphabetic line above the ingredient list (brand names are printed largest)"""
+    candidates = []
+    for line in lines:
+        if INGREDIENTS_RE.search(line.text):
+            break
+        letters = sum(char.isalpha() for char in line.text)
+        if letters >= 3 and letters / len(line.text.replace(" ", "")) >= 0.7 and not NUTRITION_RE.search(line.text):
+            candidates.append(line)
+    if not candidates:
+        return None
+    return max(candidates, key=lambda line: line.height).text.strip(" .:-")
+
+
+def score_extraction(lines: List[OcrLine], text: str, brand: Optional[str],
+                     ingredients: Optional[List[str]], nutrition: Optional[Dict[str, Any]]) -> float:
+    """
+    Confidence (0-1) that the rule-based read is as good as the vision model's.
+
+    No brand (alternatives and catalog lookups are keyed on it), no ingredient
+    heading or fewer than two ingredients scores 0. Otherwise: 50% Tesseract
+    word confidence, 40% share of ingredients the canonicalizer recognizes
+    (OCR garbage does not resolve), 10% nutrition table parsed when one is
+    visible.
+    """
+    if not brand or not ingredients or len(ingredients) < 2:
+        return 0.0
+    characters = sum(len(line.text) for line in lines)
+    ocr = sum(line.confidence * len(line.text) for line in lines) / characters if characters else 0.0
+    known = sum(canonicalizer.is_known(ingredient) for ingredient in ingredients) / len(ingredients)
+    nutrition_ok = not NUTRITION_RE.search(text) or len(nutrition or {}) >= 3
+    return round(0.5 * ocr + 0.4 * known + 0.1 * nutrition_ok, 3)
+
+
+def parse_label(lines: List[OcrLine]) -> LocalExtraction:
+    """Brand, ingredients and nutrition from OCR lines, with a confidence score"""
+    text = "\n".join(line.text for line in lines)
+    brand = parse_brand(lines)
+    ingredients = parse_ingredients(text)
+    nutrition = parse_nutrition(text)
+    confidence = score_extraction(lines, text, brand, ingredients, nutrition)
+    return LocalExtraction(brand, ingredients or [], nutrition, confidence)
+
+
+class LocalLabelReader:
+    """
+    First extraction tier: Tesseract OCR in a process pool plus deterministic
+    parsing. The caller escalates to the vision model when the confidence is
+    below its threshold, or when pytesseract / the tesseract binary is not
+    installed (checked once).
+    """
+
+    def __init__(self, max_workers: int, languages: str, timeout: float):
+        self.max_workers = max_workers
+        self.languages = languages
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._available: Optional[bool] = None
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.accepted = 0
+        self.failures = 0
+        self.total_confidence = 0.0
+        self.total_ms = 0.0
+
+    def available(self) -> bool:
+        """Whether pytesseract and the tesseract binary are installed"""
+        if self._available is None:
+            try:
+                version = pytesseract.get_tesseract_version() if pytesseract is not None else None
+            except Exception:
+                version = None
+            self._available = version is not None
+            if self._available:
+                logger.info(f"Local OCR tier enabled (Tesseract {version})")
+            else:
+                logger.warning("pytesseract/tesseract not installed; all label extractions use the vision model")
+        return self._available
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    async def read(self, page: np.ndarray) -> Optional[LocalExtraction]:
+        """OCR and parse a binarized label page (PreparedImage.ocr_page); None if OCR failed"""
+        start_time = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            lines = await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), read_label_lines, page, self.languages, self.timeout),
+                timeout=self.timeout + 1
+            )
+            extraction = parse_label(lines)
+        except Exception as e:
+            logger.warning(f"Local OCR failed: {e!r}")
+            with self._lock:
+                self.failures += 1
+            return None
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        with self._lock:
+            self.reads += 1
+            self.total_confidence += extraction.confidence
+            self.total_ms += elapsed_ms
+        logger.info(
+            f"Local OCR read {len(extraction.ingredients)} ingredients "
+            f"(confidence {extraction.confidence:.2f}) in {elapsed_ms:.0f} ms"
+        )
+        return extraction
+
+    def record_accepted(self):
+        """Count a read that was used instead of the vision model"""
+        with self._lock:
+            self.accepted += 1
+
+    def stats(self) -> Dict[str, float]:
+        """How many extractions stayed local, for metrics"""
+        return {
+            "available": bool(self._available),
+            "reads": self.reads,
+            "accepted": self.accepted,
+            "escalated": self.reads - self.accepted + self.failures,
+            "failures": self.failures,
+            "acceptance_ratio": round(self.accepted / (self.reads + self.failures), 4) if self.reads + self.failures else 0.0,
+            "avg_confidence": round(self.total_confidence / self.reads, 3) if self.reads else 0.0,
+            "avg_ms": round(self.total_ms / self.reads, 1) if self.reads else 0.0
+        }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Global local label reader instance
+local_label_reader = LocalLabelReader(
+    max_workers=settings.local_ocr_workers,
+    languages=settings.local_ocr_languages,
+    timeout=settings.local_ocr_timeout_seconds
+)
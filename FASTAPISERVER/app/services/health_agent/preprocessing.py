@@ -0,0 +1,222 @@
+"""Image preprocessing before the vision model call"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, NamedTuple, Optional, Tuple
+import cv2
+import numpy as np
+from app.config.settings import settings
+from app.utils.logger import logger
+
+
+class PreparedImage(NamedTuple):
+    """Image bytes to send to the vision model plus what was read from the same decode"""
+    data: bytes
+    phash: Optional[int] = None
+    barcodes: Tuple[str, ...] = ()
+    ocr_page: Optional[np.ndarray] = None  # Binarized page for local OCR, ink bits packed 8 per byte
+
+
+def decode_image(data: bytes) -> Optional[np.ndarray]:
+    """Decode image bytes to a BGR array (EXIF orientation applied), or None if undecodable"""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def compute_phash(image: np.ndarray) -> int:
+    """64-bit DCT perceptual hash (pHash) of a decoded image"""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low_freq = cv2.dct(small)[:8, :8].flatten()
+    # Median excludes the DC term so overall brightness doesn't dominate
+    bits = low_freq > np.median(low_freq[1:])
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def detect_barcodes(image: np.ndarray, max_long_edge: int) -> Tuple[str, ...]:
+    """Decode EAN/UPC barcodes from a decoded image (downscaled first for speed)"""
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape[:2]
+    scale = max_long_edge / max(height, width)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    ok, decoded, types, _ = cv2.barcode.BarcodeDetector().detectAndDecodeWithType(gray)
+    if not ok:
+        return ()
+    return tuple(
+        code for code, kind in zip(decoded, types)
+        if code and code.isdigit() and kind.startswith(("EAN", "UPC"))
+    )
+
+
+def binarize_for_ocr(image: np.ndarray) -> np.ndarray:
+    """
+    Black-on-white page for Tesseract, with ink pixels packed 8 per byte
+    (cheap to pass between processes; unpack with unpack_ocr_page).
+
+    Small photos are upscaled (Tesseract wants text ~20-30 px high), noise is
+    removed with a median blur, and Otsu thresholding binarizes the image
+    (inverted for light text on dark packaging).
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape[:2]
+    scale = min(3.0, 2000 / max(height, width))
+    if abs(scale - 1.0) > 0.1:
+        interpolation = cv2.INTER_CUBIC if scale > 1 else cv2.INTER_AREA
+        gray = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=interpolation)
+    gray = cv2.medianBlur(gray, 3)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if binary.mean() < 127:
+        binary = cv2.bitwise_not(binary)
+    return np.packbits(binary == 0, axis=1)
+
+
+def unpack_ocr_page(page: np.ndarray) -> np.ndarray:
+    """Packed ink bits -> black-on-white uint8 image (width padded to a multiple of 8 with white)"""
+    return np.where(np.unpackbits(page, axis=1).astype(bool), 0, 255).astype(np.uint8)
+
+
+def preprocess_image(
+    data: bytes,
+    max_long_edge: int,
+    jpeg_quality: int,
+    grayscale: bool = False,
+    normalize_contrast: bool = False,
+    reencode: bool = True,
+    compute_hash: bool = False,
+    barcode_max_long_edge: int = 0,
+    ocr_page: bool = False,
+) -> PreparedImage:
+    """
+    Decode, orient and downscale an image, then re-encode it as JPEG.
+
+    Runs in a worker process (pure function, picklable arguments). The pHash,
+    barcodes and binarized OCR page are read from the same decode when
+    requested (barcode scanning is on when barcode_max_long_edge > 0). The
+    original bytes are returned when reencode is off, the image can't be
+    decoded, or re-encoding would not make an unmodified JPEG any smaller.
+    """
+    image = decode_image(data)
+    if image is None:
+        return PreparedImage(data)
+
+    phash = compute_phash(image) if compute_hash else None
+    barcodes = detect_barcodes(image, barcode_max_long_edge) if barcode_max_long_edge > 0 else ()
+    page = binarize_for_ocr(image) if ocr_page else None
+    if not reencode:
+        return PreparedImage(data, phash, barcodes, page)
+
+    height, width = image.shape[:2]
+    scale = max_long_edge / max(height, width)
+    resized = scale < 1.0
+    if resized:
+        image = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    if grayscale or normalize_contrast:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if normalize_contrast:
+            image = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(image)
+
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    if not ok:
+        return PreparedImage(data, phash, barcodes, page)
+
+    encoded = encoded.tobytes()
+    is_jpeg = data[:3] == b"\xff\xd8\xff"
+    if is_jpeg and not resized and not (grayscale or normalize_contrast) and len(encoded) >= len(data):
+        return PreparedImage(data, phash, barcodes, page)
+    return PreparedImage(encoded, phash, barcodes, page)
+
+
+class ImagePreprocessor:
+    """
+    Shrink label photos before they are base64-encoded for the vision model.
+
+    Decoding/resizing/encoding is CPU-bound, so it runs in a process pool to
+    keep it off the event loop and out of the GIL.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.images = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.total_ms = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    async def prepare(
+        self,
+        data: bytes,
+        compute_hash: bool = False,
+        scan_barcodes: bool = False,
+        ocr_page: bool = False
+    ) -> PreparedImage:
+        """
+        Return the preprocessed image bytes (original bytes if disabled or on failure)
+        and, when requested, its perceptual hash, barcodes and OCR page from the same decode
+        """
+        if not settings.image_preprocess_enabled and not compute_hash and not scan_barcodes and not ocr_page:
+            return PreparedImage(data)
+
+        start_time = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            prepared = await loop.run_in_executor(
+                self._get_executor(),
+                preprocess_image,
+                bytes(data),
+                settings.image_max_long_edge,
+                settings.image_jpeg_quality,
+                settings.image_grayscale,
+                settings.image_normalize_contrast,
+                settings.image_preprocess_enabled,
+                compute_hash,
+                settings.barcode_max_long_edge if scan_barcodes else 0,
+                ocr_page,
+            )
+        except Exception as e:
+            logger.warning(f"Image preprocessing failed, sending original: {e}")
+            return PreparedImage(data)
+
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.images += 1
+        self.bytes_in += len(data)
+        self.bytes_out += len(prepared.data)
+        self.total_ms += elapsed_ms
+
+        saved = len(data) - len(prepared.data)
+        logger.info(
+            f"Preprocessed image: {len(data)} -> {len(prepared.data)} bytes "
+            f"({saved / len(data):.0%} saved) in {elapsed_ms:.0f} ms"
+        )
+        return prepared
+
+    def stats(self) -> Dict[str, float]:
+        """Bytes saved and preprocessing time for metrics"""
+        return {
+            "images": self.images,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "avg_ms": round(self.total_ms / self.images, 1) if self.images else 0.0
+        }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Global image preprocessor instance
+image_preprocessor = ImagePreprocessor(max_workers=settings.image_preprocess_workers)
@@ -0,0 +1,106 @@
+"""Local product table for resolving scanned barcodes without the vision model"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from app.config.settings import settings
+from app.services.catalog import catalog_store
+from app.services.catalog.openfoodfacts import iter_products, label_record, normalize_barcode
+from app.utils.logger import logger
+
+
+class ProductTable:
+    """
+    In-memory barcode -> product map loaded from an OpenFoodFacts export,
+    backed by the local catalog store for codes not in memory.
+
+    Records are kept as compact JSON strings (brand, ingredients, nutrition)
+    so a regional export of a few hundred thousand products stays small.
+    Also counts how often the barcode fast path resolves a scan.
+    """
+
+    def __init__(self):
+        self._products: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.barcodes_detected = 0
+        self.hits = 0
+        self.hit_ms = 0.0
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def is_ready(self) -> bool:
+        """Whether any barcode source (loaded table or catalog) is available"""
+        return len(self._products) > 0 or (settings.catalog_enabled and catalog_store.is_ready())
+
+    def load(self, path: str) -> int:
+        """Load (or reload) the table from an OFF export file; returns the product count"""
+        start_time = time.perf_counter()
+        products = {}
+        for raw in iter_products(path):
+            record = label_record(raw)
+            if record is not None:
+                products[record.pop("code")] = json.dumps(record, separators=(",", ":"))
+
+        with self._lock:
+            self._products = products
+        logger.info(f"Loaded {len(products)} products from {path} in {time.perf_counter() - start_time:.2f} seconds")
+        return len(products)
+
+    def lookup(self, codes: Iterable[str]) -> Optional[Dict[str, Any]]:
+        """Return the first product matching any of the scanned codes"""
+        codes = list(codes)
+        with self._lock:
+            self.scans += 1
+            if codes:
+                self.barcodes_detected += 1
+            for code in codes:
+                record = self._products.get(normalize_barcode(code))
+                if record is not None:
+                    self.hits += 1
+                    return json.loads(record)
+
+        if settings.catalog_enabled and catalog_store.is_ready():
+            for code in codes:
+                product = catalog_store.get_by_barcode(code)
+                record = label_record(product) if product else None
+                if record is not None:
+                    record.pop("code")
+                    with self._lock:
+                        self.hits += 1
+                    return record
+        return None
+
+    def record_hit_latency(self, elapsed_ms: float):
+        """Add the end-to-end time of a scan resolved by barcode"""
+        with self._lock:
+            self.hit_ms += elapsed_ms
+
+    def stats(self) -> Dict[str, float]:
+        """Fast-path hit rate and latency for metrics"""
+        return {
+            "products": len(self._products),
+            "scans": self.scans,
+            "barcodes_detected": self.barcodes_detected,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.scans, 4) if self.scans else 0.0,
+            "avg_hit_ms": round(self.hit_ms / self.hits, 1) if self.hits else 0.0
+        }
+
+
+# Global product table instance (loaded at startup when PRODUCT_TABLE_PATH is set)
+product_table = ProductTable()
+
+
+def load_product_table():
+    """Load the configured OFF export into the global product table, if any"""
+    path = settings.product_table_path
+    if not path:
+        return
+    if not os.path.exists(path):
+        logger.warning(f"Product table not found at {path}; barcodes are resolved from the catalog only")
+        return
+    product_table.load(path)
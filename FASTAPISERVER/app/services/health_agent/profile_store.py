@@ -0,0 +1,160 @@
+"""Persistent clinical profiles and analysis sessions"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+from app.config.settings import settings
+from app.utils.hashing import canonical_health_profile, sha256_bytes
+from app.utils.logger import logger
+
+
+class ClinicalProfileStore:
+    """
+    SQLite-backed cache of health profile text -> user_clinical_profile, plus sessions.
+
+    Profiles are keyed by the canonical profile string (case, whitespace and
+    condition order ignored), expire ttl_seconds after they were generated, and
+    the least recently used are evicted beyond max_entries. A session binds a
+    profile and its clinical profile to an ID that /analyze calls can pass
+    instead of the profile text; sessions expire session_ttl_seconds after
+    their last use.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: int, max_entries: int, session_ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.session_ttl_seconds = session_ttl_seconds
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS clinical_profiles (
+                key TEXT PRIMARY KEY,
+                profile TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_clinical_profiles_used ON clinical_profiles (last_used_at);
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                user_raw_health TEXT NOT NULL,
+                user_clinical_profile TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_used ON sessions (last_used_at);
+            """
+        )
+
+    @staticmethod
+    def profile_key(user_raw_health: str) -> str:
+        return sha256_bytes(canonical_health_profile(user_raw_health).encode("utf-8"))
+
+    def get(self, user_raw_health: str) -> Optional[str]:
+        """Cached clinical profile for a health profile text, if fresh"""
+        now = time.time()
+        key = self.profile_key(user_raw_health)
+        with self._lock:
+            self.lookups += 1
+            row = self._conn.execute(
+                "SELECT profile FROM clinical_profiles WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE clinical_profiles SET last_used_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return row["profile"]
+
+    def set(self, user_raw_health: str, profile: str):
+        """Store a clinical profile, then drop expired and least recently used entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO clinical_profiles (key, profile, created_at, last_used_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET profile = excluded.profile, "
+                "created_at = excluded.created_at, last_used_at = excluded.last_used_at",
+                (self.profile_key(user_raw_health), profile, now, now),
+            )
+            self._conn.execute("DELETE FROM clinical_profiles WHERE created_at <= ?", (now - self.ttl_seconds,))
+            entries = self._conn.execute("SELECT COUNT(*) FROM clinical_profiles").fetchone()[0]
+            if entries > self.max_entries:
+                evicted = self._conn.execute(
+                    "DELETE FROM clinical_profiles WHERE key IN ("
+                    "SELECT key FROM clinical_profiles ORDER BY last_used_at LIMIT ?)",
+                    (entries - self.max_entries,),
+                ).rowcount
+                self.evictions += evicted
+                logger.info(f"Evicted {evicted} least recently used clinical profiles")
+            self._conn.commit()
+
+    def create_session(self, user_raw_health: str, user_clinical_profile: str) -> Dict[str, Any]:
+        """Create a session bound to a computed clinical profile"""
+        now = time.time()
+        session = {
+            "id": uuid.uuid4().hex,
+            "user_raw_health": user_raw_health,
+            "user_clinical_profile": user_clinical_profile,
+            "created_at": now,
+            "last_used_at": now,
+        }
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE last_used_at <= ?", (now - self.session_ttl_seconds,))
+            self._conn.execute(
+                "INSERT INTO sessions (id, user_raw_health, user_clinical_profile, created_at, last_used_at) "
+                "VALUES (:id, :user_raw_health, :user_clinical_profile, :created_at, :last_used_at)",
+                session,
+            )
+            self._conn.commit()
+        return session
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session by ID (None if unknown or expired); extends its lifetime"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM sessions WHERE id = ? AND last_used_at > ?",
+                (session_id, now - self.session_ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE sessions SET last_used_at = ? WHERE id = ?", (now, session_id))
+            self._conn.commit()
+        return {**dict(row), "last_used_at": now}
+
+    def stats(self) -> Dict[str, float]:
+        """Hit ratio and size for metrics"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM clinical_profiles").fetchone()[0]
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {
+            "entries": entries,
+            "sessions": sessions,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "evictions": self.evictions
+        }
+
+
+# Global clinical profile store instance
+clinical_profile_store = ClinicalProfileStore(
+    settings.clinical_profile_cache_path,
+    ttl_seconds=settings.clinical_profile_cache_ttl_seconds,
+    max_entries=settings.clinical_profile_cache_max_entries,
+    session_ttl_seconds=settings.session_ttl_seconds
+)
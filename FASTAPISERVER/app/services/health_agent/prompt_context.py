@@ -0,0 +1,164 @@
+"""Compact, token-budgeted rendering of workflow state for LLM prompts"""
+
+import math
+import re
+import threading
+from typing import Any, Dict, List, Optional
+from app.config.settings import settings
+from app.utils.logger import logger
+
+# Profile values that carry no information for the risk/design prompts
+UNINFORMATIVE = {
+    "", "unknown", "no data", "none", "n/a",
+    "no major regulatory restrictions identified", "data unavailable due to api error",
+}
+ALTERNATIVE_RE = re.compile(r"^(.*?)\s*\(Why it's better:\s*(.*?)\)\s*$")
+NUTRITION_FIELDS = [
+    ("calories", "kcal", ""),
+    ("total_fat_g", "fat", "g"),
+    ("saturated_fat_g", "sat fat", "g"),
+    ("sodium_mg", "sodium", "mg"),
+    ("carbohydrates_g", "carbs", "g"),
+    ("sugars_g", "sugars", "g"),
+    ("fiber_g", "fiber", "g"),
+    ("protein_g", "protein", "g"),
+]
+
+
+def count_tokens(text: str) -> int:
+    """Approximate Gemini token count (~4 characters per token)"""
+    return math.ceil(len(text) / 4)
+
+
+def _field(profile: Any, name: str) -> Any:
+    return profile.get(name) if isinstance(profile, dict) else getattr(profile, name, None)
+
+
+def _cell(value: Any) -> str:
+    text = " ".join(str(value or "").replace("|", "/").split())
+    return "-" if text.lower().rstrip(".") in UNINFORMATIVE else text
+
+
+class PromptContextBuilder:
+    """
+    Render the ingredient knowledge base, nutrition facts and alternatives as
+    compact text for the risk and design prompts.
+
+    Ingredients become one table row each (field names once, in the header;
+    empty/default values as "-"; identical profiles merged). When the table
+    exceeds the token budget, low-risk ingredients (NOVA 1-2, no regulatory
+    flag) are collapsed into a single name list first, then long cells are
+    shortened, then the remaining rows are collapsed from the lowest NOVA score
+    up. Tokens saved against the raw repr are counted.
+    """
+
+    def __init__(self, token_budget: int, cell_chars: int = 160):
+        self.token_budget = token_budget
+        self.cell_chars = cell_chars
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.summarized = 0
+
+    def _record(self, label: str, raw: str, rendered: str, summarized: int = 0):
+        before, after = count_tokens(raw), count_tokens(rendered)
+        with self._lock:
+            self.renders += 1
+            self.tokens_before += before
+            self.tokens_after += after
+            self.summarized += summarized
+        logger.info(
+            f"{label} context: {before} -> {after} tokens ({before - after} saved"
+            + (f", {summarized} ingredient rows summarized)" if summarized else ")")
+        )
+
+    def ingredient_table(self, knowledge_base: List[Any], label: str = "Ingredient") -> str:
+        """Ingredient profiles as a compact table within the token budget"""
+        rows: Dict[tuple, List[str]] = {}
+        for profile in knowledge_base or []:
+            cells = (
+                str(_field(profile, "nova_score") or "-"),
+                _cell(_field(profile, "manufacturing")),
+                _cell(_field(profile, "regulatory_gap")),
+                _cell(_field(profile, "health_risks")),
+            )
+            names = rows.setdefault(cells, [])
+            name = _cell(_field(profile, "name"))
+            if name not in names:
+                names.append(name)
+
+        entries = [("; ".join(names), cells) for cells, names in rows.items()]
+        nova = [int(cells[0]) if cells[0].isdigit() else 3 for _, cells in entries]
+        by_risk = sorted(range(len(entries)), key=lambda i: (nova[i], entries[i][1][2] != "-"))
+        low_risk = [i for i in by_risk if nova[i] <= 2 and entries[i][1][2] == "-"]
+
+        # Over budget: summarize low-risk ingredients, then shorten cells, then summarize by risk
+        summarized = set()
+        cell_chars = None
+        text = self._render_table(entries, summarized, cell_chars)
+        steps = [("summarize", i) for i in low_risk]
+        steps += [("clip", self.cell_chars), ("clip", self.cell_chars // 2)]
+        steps += [("summarize", i) for i in by_risk if i not in low_risk]
+        for action, value in steps:
+            if count_tokens(text) <= self.token_budget:
+                break
+            if action == "summarize":
+                summarized.add(value)
+            else:
+                cell_chars = value
+            text = self._render_table(entries, summarized, cell_chars)
+
+        self._record(label, str(knowledge_base), text, len(summarized))
+        return text
+
+    @staticmethod
+    def _render_table(entries: List[tuple], summarized: set, cell_chars: Optional[int]) -> str:
+        def clip(text: str) -> str:
+            return text if cell_chars is None or len(text) <= cell_chars else text[:cell_chars - 1].rstrip() + "…"
+
+        lines = ["ingredient | NOVA | manufacturing | regulatory gaps | health risks"]
+        for i, (names, cells) in enumerate(entries):
+            if i not in summarized:
+                lines.append(" | ".join([names, cells[0], *map(clip, cells[1:])]))
+        if summarized:
+            low_risk = "; ".join(entries[i][0] for i in sorted(summarized))
+            lines.append(f"Summarized (lower risk, details omitted): {low_risk}")
+        return "\n".join(lines)
+
+    def nutrition(self, nutrition: Optional[Dict[str, Any]]) -> str:
+        """Nutrition facts on one line, per serving, omitting values not on the label"""
+        if not nutrition:
+            return "not available"
+        parts = [f"serving {nutrition['serving_size']}"] if nutrition.get("serving_size") else []
+        parts += [
+            f"{label} {value:g}{unit}" for key, label, unit in NUTRITION_FIELDS
+            if isinstance((value := nutrition.get(key)), (int, float))
+        ]
+        text = ", ".join(parts) or "not available"
+        self._record("Nutrition", str(nutrition), text)
+        return text
+
+    def alternatives(self, alternatives: List[str]) -> str:
+        """Deduplicated alternatives, one per line as 'name: why it's better'"""
+        lines = []
+        for alternative in dict.fromkeys(alternatives or []):
+            match = ALTERNATIVE_RE.match(alternative)
+            lines.append(f"- {match[1]}: {match[2]}" if match else f"- {alternative}")
+        text = "\n".join(lines) or "none found"
+        self._record("Alternatives", str(alternatives), text)
+        return text
+
+    def stats(self) -> Dict[str, float]:
+        """Token savings for metrics"""
+        return {
+            "renders": self.renders,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_before - self.tokens_after,
+            "rows_summarized": self.summarized
+        }
+
+
+# Global prompt context builder instance
+prompt_context = PromptContextBuilder(token_budget=settings.prompt_ingredient_token_budget)
@@ -1,7 +1,14 @@
-from typing import TypedDict, List, Dict, Any, Optional
+from typing import Annotated, TypedDict, List, Dict, Any, Optional, Union
+
+
+def merge_timings(left: Optional[Dict[str, float]], right: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """Reducer for node_timings: parallel nodes each contribute their own entry"""
+    return {**(left or {}), **(right or {})}
+
 
 class HealthCoPilotState(TypedDict):
-    image_path: str
+    image_bytes: Optional[Union[bytes, memoryview]]  # In-memory image (preferred)
+    image_path: Optional[str]  # On-disk image, used when no image_bytes are given
     user_raw_health: str
     brand_name: str
     ingredients_list: List[str]
@@ -12,4 +19,5 @@ class HealthCoPilotState(TypedDict):
     product_alternatives: List[str]
     final_conversational_insight: str
     decision_color: Optional[str]  # Hex color for Quick Decision (green/yellow/red)
+    node_timings: Annotated[Dict[str, float], merge_timings]  # Milliseconds per workflow node
 
@@ -1,17 +1,26 @@
 import os
-import cv2
 import json
 import base64
 import asyncio
-import aiohttp
-import requests
-from bs4 import BeautifulSoup
-from typing import List, Optional
+from typing import List, Optional, Union
+import numpy as np
 from pydantic import BaseModel, Field
 from langchain_google_genai import ChatGoogleGenerativeAI
-from groq import Groq
+from groq import AsyncGroq
 from app.config.settings import settings
+from app.utils.http_client import http_client
+from app.utils.rate_limit import openfoodfacts_rate_limiter
 from app.utils.logger import logger
+from app.utils.json_repair import json_repair_parser
+from .preprocessing import image_preprocessor
+from .label_index import label_index
+from .ocr import local_label_reader
+from .ingredient_cache import ingredient_cache
+from .canonicalizer import canonicalizer
+from .keywords import category_matcher, allergen_matcher
+from .wikipedia import wikipedia_fetcher
+from .products import product_table
+from app.services.catalog import catalog_store
 
 
 class NutritionFacts(BaseModel):
@@ -63,28 +72,115 @@ class ProHealthTools:
         self.llm = llm  # Store base LLM for batch analysis
         self.label_llm = llm.with_structured_output(LabelExtraction)
         self.profile_llm = llm.with_structured_output(IngredientProfile)
-        # Initialize Groq client for vision (FREE & FAST!)
-        self.groq_client = Groq(api_key=settings.groq_api_key)
+        # Initialize async Groq client for vision (FREE & FAST!)
+        self.groq_client = AsyncGroq(api_key=settings.groq_api_key)
+        # Caps concurrent research LLM calls across requests
+        self._research_slots = asyncio.Semaphore(settings.research_max_concurrency)
 
-    def extract_label_data(self, image_path: str) -> LabelExtraction:
-        """Extract brand, ingredients AND nutrition facts from food label using Groq Llama 4 Scout Vision"""
+    @staticmethod
+    async def _load_image_bytes(image: Union[bytes, memoryview, str]) -> bytes:
+        """Return image bytes from in-memory data or, for a path, read from disk off the event loop"""
+        if isinstance(image, str):
+            def read_file():
+                with open(image, "rb") as image_file:
+                    return image_file.read()
+            return await asyncio.to_thread(read_file)
+        return image
+
+    async def extract_label_data(self, image: Union[bytes, memoryview, str]) -> LabelExtraction:
+        """
+        Extract brand, ingredients AND nutrition facts from food label using Groq Llama 4 Scout Vision
+        
+        `image` is the raw image bytes (or memoryview), or a path to the image on disk.
+        A visible barcode found in the local product table, or a re-scan of a label
+        already seen (near-duplicate perceptual hash), skips the vision model. So
+        does a local Tesseract read whose parse scores at least
+        LOCAL_OCR_CONFIDENCE_THRESHOLD; lower-scoring reads are escalated.
+        """
         try:
-            # Read and encode image to base64
-            with open(image_path, "rb") as image_file:
-                image_data = base64.b64encode(image_file.read()).decode('utf-8')
-            
-            logger.info(f"Processing image with Groq Llama 4 Scout Vision: {image_path}")
+            start_time = __import__('time').time()
+            scan_barcodes = settings.barcode_fast_path_enabled and product_table.is_ready()
+            local_ocr = settings.local_ocr_enabled and local_label_reader.available()
+            
+            # Downscale/re-encode, hash, scan barcodes and binarize for OCR in one decode (process pool)
+            image_bytes = await self._load_image_bytes(image)
+            prepared = await image_preprocessor.prepare(
+                image_bytes,
+                compute_hash=settings.label_index_enabled,
+                scan_barcodes=scan_barcodes,
+                ocr_page=local_ocr
+            )
             
-            # Create vision prompt for Llama 4 Scout (UPDATED TO EXTRACT NUTRITION FACTS)
-            response = self.groq_client.chat.completions.create(
-                model="meta-llama/llama-4-scout-17b-16e-instruct",  # Current Groq vision model
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": """Look at this food label image CAREFULLY - scan ALL parts of the package including:
+            if scan_barcodes:
+                product = await asyncio.to_thread(product_table.lookup, prepared.barcodes)
+                if product is not None:
+                    extraction = LabelExtraction(**product)
+                    elapsed = __import__('time').time() - start_time
+                    product_table.record_hit_latency(elapsed * 1000)
+                    logger.info(f"Barcode {prepared.barcodes[0]} resolved in {elapsed:.2f} seconds - Brand: {extraction.brand}, Ingredients: {len(extraction.ingredients)}")
+                    return extraction
+            
+            if prepared.phash is not None:
+                cached = await asyncio.to_thread(label_index.lookup, prepared.phash)
+                if cached is not None:
+                    extraction = LabelExtraction.model_validate_json(cached)
+                    logger.info(f"Reused stored extraction - Brand: {extraction.brand}, Ingredients: {len(extraction.ingredients)}")
+                    return extraction
+            
+            extraction = await self._extract_locally(prepared.ocr_page) if prepared.ocr_page is not None else None
+            if extraction is not None:
+                return extraction
+            extraction = await self._extract_with_vision(prepared.data)
+            
+            # Only remember useful vision extractions so a bad read isn't replayed for every re-scan
+            if prepared.phash is not None and extraction.ingredients:
+                await asyncio.to_thread(label_index.add, prepared.phash, extraction.model_dump_json())
+            
+            return extraction
+        
+        except Exception as e:
+            logger.error(f"Error extracting label data with Groq Llama Vision: {e}")
+            logger.error(f"Error type: {type(e).__name__}")
+            logger.error(f"Error details: {str(e)}")
+            import traceback
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            return LabelExtraction(brand="Unknown", ingredients=[], nutrition=None)
+
+    async def _extract_locally(self, ocr_page: np.ndarray) -> Optional[LabelExtraction]:
+        """Tesseract + rule-based parse of the binarized page; None to escalate to the vision model"""
+        local = await local_label_reader.read(ocr_page)
+        if local is None:
+            return None
+        if local.confidence < settings.local_ocr_confidence_threshold:
+            logger.info(f"Local OCR confidence {local.confidence:.2f} below {settings.local_ocr_confidence_threshold}, escalating to vision model")
+            return None
+        
+        local_label_reader.record_accepted()
+        extraction = LabelExtraction(
+            brand=local.brand,
+            ingredients=local.ingredients,
+            nutrition=NutritionFacts(**local.nutrition) if local.nutrition else None
+        )
+        logger.info(f"Local OCR extraction accepted - Brand: {extraction.brand}, Ingredients: {len(extraction.ingredients)}")
+        return extraction
+
+    async def _extract_with_vision(self, image_bytes: bytes) -> LabelExtraction:
+        """Run the Groq vision model on (preprocessed) image bytes and parse its JSON answer"""
+        image_data = base64.b64encode(image_bytes).decode('utf-8')
+        
+        logger.info(f"Processing image with Groq Llama 4 Scout Vision ({len(image_bytes)} bytes)")
+        vision_start = __import__('time').time()
+        
+        # Create vision prompt for Llama 4 Scout (UPDATED TO EXTRACT NUTRITION FACTS)
+        response = await self.groq_client.chat.completions.create(
+            model="meta-llama/llama-4-scout-17b-16e-instruct",  # Current Groq vision model
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": """Look at this food label image CAREFULLY - scan ALL parts of the package including:
 - Left side
 - Right side  
 - Back panel
@@ -139,149 +235,206 @@ CRITICAL:
 - Only use null/0 if data is truly NOT visible anywhere on the label
 - Extract actual numbers from the table, don't estimate
 - Look carefully at ALL parts of the package image"""
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_data}"
-                                }
+                        },
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/jpeg;base64,{image_data}"
                             }
-                        ]
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=2048
-            )
-            
-            # Debug: Log the full response
-            logger.info(f"Groq API Response Object: {response}")
-            
-            extracted_text = response.choices[0].message.content.strip()
-            logger.info(f"Groq Vision raw response text: {extracted_text}")
-            
-            # Parse the JSON response - IMPROVED PARSING
-            # Handle case where Groq adds explanatory text before the JSON
-            if "```" in extracted_text:
-                logger.info("Detected code block, extracting JSON...")
-                # Find the JSON block - it's between ``` markers
-                parts = extracted_text.split("```")
-                if len(parts) >= 2:
-                    # Get the content between first ``` pair
-                    json_block = parts[1]
-                    # Remove language identifier if present
-                    if json_block.strip().startswith("json"):
-                        json_block = json_block.strip()[4:]
-                    extracted_text = json_block.strip()
-                    logger.info(f"Extracted JSON from code block: {extracted_text[:200]}...")
+                        }
+                    ]
+                }
+            ],
+            temperature=0.1,
+            max_tokens=2048
+        )
+        
+        logger.info(f"Groq vision call completed in {__import__('time').time() - vision_start:.2f} seconds")
+        
+        # Debug: Log the full response
+        logger.info(f"Groq API Response Object: {response}")
+        
+        extracted_text = response.choices[0].message.content.strip()
+        logger.info(f"Groq Vision raw response text: {extracted_text}")
+        
+        # Parse locally (code fences, surrounding prose and common defects are repaired)
+        try:
+            data = json_repair_parser.parse(extracted_text, source="vision", expect=dict)
             
-            # Try to parse JSON directly
-            try:
-                logger.info("Attempting to parse JSON response...")
-                data = json.loads(extracted_text)
-                logger.info(f"Successfully parsed JSON: {data}")
-                
-                brand = data.get("brand", "Unknown")
-                ingredients = data.get("ingredients", [])
-                nutrition_data = data.get("nutrition")
-                
-                # Parse nutrition facts if present
-                nutrition = None
-                if nutrition_data:
-                    try:
-                        nutrition = NutritionFacts(**nutrition_data)
-                        logger.info(f"Extracted nutrition: {nutrition.calories} cal, {nutrition.total_fat_g}g fat, {nutrition.protein_g}g protein")
-                    except Exception as e:
-                        logger.warning(f"Failed to parse nutrition data: {e}")
-                
-                logger.info(f"Extracted - Brand: {brand}, Ingredients: {len(ingredients)}, Has Nutrition: {nutrition is not None}")
-                
-                return LabelExtraction(
-                    brand=brand,
-                    ingredients=ingredients,
-                    nutrition=nutrition
-                )
-            except json.JSONDecodeError as json_err:
-                # Fallback: use structured output to parse the text
-                logger.warning(f"JSON parsing failed: {json_err}")
-                logger.warning(f"Failed text was: {extracted_text}")
-                logger.info("Using Gemini structured output as fallback...")
-                
-                parse_prompt = f"""
-                Extract brand, ingredients, and nutrition facts from this text:
-                {extracted_text}
-                """
-                result = self.label_llm.invoke(parse_prompt)
-                logger.info(f"Fallback extraction result: Brand={result.brand}, Ingredients={len(result.ingredients)}")
-                return result
+            brand = data.get("brand") or "Unknown"
+            ingredients = data.get("ingredients") or []
+            nutrition_data = data.get("nutrition")
             
-        except Exception as e:
-            logger.error(f"Error extracting label data with Groq Llama Vision: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Error details: {str(e)}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return LabelExtraction(brand="Unknown", ingredients=[], nutrition=None)
+            # Parse nutrition facts if present
+            nutrition = None
+            if isinstance(nutrition_data, dict):
+                try:
+                    nutrition = NutritionFacts(**nutrition_data)
+                    logger.info(f"Extracted nutrition: {nutrition.calories} cal, {nutrition.total_fat_g}g fat, {nutrition.protein_g}g protein")
+                except Exception as e:
+                    logger.warning(f"Failed to parse nutrition data: {e}")
+            
+            extraction = LabelExtraction(brand=brand, ingredients=ingredients, nutrition=nutrition)
+            logger.info(f"Extracted - Brand: {brand}, Ingredients: {len(ingredients)}, Has Nutrition: {nutrition is not None}")
+            return extraction
+        except ValueError as parse_err:
+            # Fallback: use structured output to parse the text
+            logger.warning(f"JSON parsing failed: {parse_err}")
+            logger.warning(f"Failed text was: {extracted_text}")
+            logger.info("Using Gemini structured output as fallback...")
+            json_repair_parser.record_fallback("vision")
+            
+            parse_prompt = f"""
+            Extract brand, ingredients, and nutrition facts from this text:
+            {extracted_text}
+            """
+            result = await self.label_llm.ainvoke(parse_prompt)
+            logger.info(f"Fallback extraction result: Brand={result.brand}, Ingredients={len(result.ingredients)}")
+            return result
 
-    def fetch_clinical_evidence(self, ingredient: str) -> IngredientProfile:
+    async def fetch_clinical_evidence(self, ingredient: str) -> IngredientProfile:
         """Fetch clinical evidence and health information for an ingredient (legacy single-ingredient method)"""
         # This method is kept for backwards compatibility but not used in the main workflow
-        return self.fetch_clinical_evidence_batch([ingredient])[0]
+        return (await self.fetch_clinical_evidence_batch([ingredient]))[0]
 
-    async def _fetch_wikipedia_async(self, session: aiohttp.ClientSession, ingredient: str) -> tuple[str, str]:
+    async def _fetch_wikipedia_async(self, ingredient: str) -> tuple[str, str]:
         """Async fetch Wikipedia data for a single ingredient"""
         try:
-            wiki_url = f"https://en.wikipedia.org/wiki/{ingredient.replace(' ', '_')}"
-            async with session.get(wiki_url, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                html = await response.text()
-                soup = BeautifulSoup(html, "lxml")
-                wiki_text = " ".join(p.text for p in soup.select("p")[:3])
-                logger.debug(f"Fetched Wikipedia data for {ingredient}")
-                return ingredient, wiki_text
+            wiki_text = await wikipedia_fetcher.fetch_intro(ingredient, timeout=5)
+            logger.debug(f"Fetched Wikipedia data for {ingredient}")
+            return ingredient, wiki_text
         except Exception as e:
             logger.debug(f"Could not fetch Wikipedia data for {ingredient}: {e}")
             return ingredient, ""
     
-    async def _fetch_all_wikipedia_async(self, ingredients: List[str]) -> dict[str, str]:
-        """Fetch Wikipedia data for all ingredients in parallel"""
-        async with aiohttp.ClientSession() as session:
-            tasks = [self._fetch_wikipedia_async(session, ing) for ing in ingredients]
-            results = await asyncio.gather(*tasks)
-            return {ing: text for ing, text in results}
-
-    def fetch_clinical_evidence_batch(self, ingredients: List[str]) -> List[IngredientProfile]:
-        """Fetch clinical evidence for multiple ingredients in a single AI call (optimized)"""
+    @staticmethod
+    def _catalog_ready() -> bool:
+        """Whether OpenFoodFacts lookups can be served by the local catalog"""
+        return settings.catalog_enabled and catalog_store.is_ready()
+
+    async def _search_openfoodfacts(self, params: dict, timeout: float, max_wait: Optional[float] = None) -> dict:
+        """
+        Query the live OpenFoodFacts search API, waiting for its rate limit
+        (at most max_wait seconds, else asyncio.TimeoutError)
+        """
+        await asyncio.wait_for(openfoodfacts_rate_limiter.acquire(), timeout=max_wait)
+        search_url = "https://world.openfoodfacts.org/cgi/search.pl"
+        return await http_client.get_json(search_url, params=params, timeout=timeout)
+
+    async def _fetch_openfoodfacts_async(self, ingredient: str) -> dict:
+        """Async fetch the top OpenFoodFacts search hit for a single ingredient"""
+        try:
+            params = {"search_terms": ingredient, "json": 1}
+            data = await self._search_openfoodfacts(params, timeout=5)
+            logger.debug(f"Fetched OpenFoodFacts data for {ingredient}")
+            return (data.get("products") or [{}])[0]
+        except Exception as e:
+            logger.debug(f"Could not fetch OpenFoodFacts data for {ingredient}: {e}")
+            return {}
+
+    async def _fetch_enrichment_async(self, ingredients: List[str]) -> tuple[dict, dict]:
+        """
+        Fetch Wikipedia and OpenFoodFacts context for all ingredients concurrently.
+        Returns (wikipedia_data, off_results). Lookups still running after
+        settings.enrichment_deadline_seconds are cancelled, so a slow or
+        rate-limited upstream only costs its missing context, never the LLM call.
+        """
+        wiki_tasks = {asyncio.ensure_future(self._fetch_wikipedia_async(ing)): ing for ing in ingredients}
+        off_tasks = {}
+        catalog_task = None
+        if self._catalog_ready():
+            # Local catalog: no need to fan out, but keep the searches off the event loop
+            catalog_task = asyncio.ensure_future(asyncio.to_thread(catalog_store.search_many, ingredients))
+        else:
+            off_tasks = {asyncio.ensure_future(self._fetch_openfoodfacts_async(ing)): ing for ing in ingredients}
+        
+        done, pending = await asyncio.wait(
+            [*wiki_tasks, *off_tasks, *filter(None, [catalog_task])],
+            timeout=settings.enrichment_deadline_seconds
+        )
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.info(f"Dropped {len(pending)} enrichment lookups still running after {settings.enrichment_deadline_seconds}s")
+        
+        wikipedia_data = dict(task.result() for task in done if task in wiki_tasks)
+        off_results = {off_tasks[task]: task.result() for task in done if task in off_tasks}
+        if catalog_task in done:
+            off_results = {ing: next(iter(products), {}) for ing, products in catalog_task.result().items()}
+        return wikipedia_data, off_results
+
+    async def fetch_clinical_evidence_batch(self, ingredients: List[str]) -> List[IngredientProfile]:
+        """
+        Fetch clinical evidence for multiple ingredients, in input order.
+        
+        Ingredients are canonicalized first, so spelling variants share one profile.
+        Profiles already in the persistent ingredient cache are reused; only the
+        remaining (unseen or expired) ingredients are researched, in a single AI call.
+        """
         if not ingredients:
             return []
         
-        # Process all ingredients (no limit)
-        logger.info(f"Batch analyzing {len(ingredients)} ingredients in single AI call")
+        # Collapse label spellings ("SUGAR (sucrose)", "INS 330") to canonical ingredients
+        canonical = [canonicalizer.canonicalize(ing) for ing in ingredients]
+        keys = [c.id for c in canonical]
+        cached = {}
+        if settings.ingredient_cache_enabled:
+            stored = await asyncio.to_thread(ingredient_cache.get_many, keys)
+            cached = {key: IngredientProfile.model_validate_json(profile) for key, profile in stored.items()}
+        
+        # Research each missing ingredient once, under its canonical name
+        misses = {}
+        for c in canonical:
+            if c.id not in cached and c.id not in misses:
+                misses[c.id] = c.name
+        logger.info(f"Ingredient cache: {len(cached)} hits, {len(misses)} to research")
+        
+        researched = {}
+        if misses:
+            profiles = await self._research_ingredients(list(misses.values()))
+            researched = {key: profile for key, profile in zip(misses, profiles) if profile is not None}
+            if settings.ingredient_cache_enabled and researched:
+                await asyncio.to_thread(
+                    ingredient_cache.set_many,
+                    {key: profile.model_dump_json() for key, profile in researched.items()}
+                )
+        
+        results = []
+        for ing, key in zip(ingredients, keys):
+            profile = cached.get(key) or researched.get(key)
+            results.append(profile if profile is not None else IngredientProfile(
+                name=ing,
+                manufacturing="Unknown",
+                regulatory_gap="No major regulatory restrictions identified",
+                health_risks="Data unavailable due to API error",
+                nova_score=3
+            ))
+        return results
+
+    async def _research_ingredients(self, ingredients: List[str]) -> List[Optional[IngredientProfile]]:
+        """
+        Research ingredients with the LLM, enriched with Wikipedia/OpenFoodFacts.
         
-        # Fetch Wikipedia data for ALL ingredients in PARALLEL (async)
-        logger.info(f"Fetching Wikipedia data for {len(ingredients)} ingredients in parallel...")
+        Long lists are split into balanced chunks of at most settings.research_chunk_size
+        that are researched concurrently, so latency follows the slowest chunk rather
+        than the list length. Profiles are matched back to ingredients by name; the
+        ingredients a chunk did not return are retried (up to settings.research_chunk_retries).
+        Returns one entry per ingredient, None where no usable profile came back.
+        """
+        # Fetch Wikipedia and OpenFoodFacts data for ALL ingredients in PARALLEL (async, deadline-bound)
+        logger.info(f"Fetching Wikipedia/OpenFoodFacts data for {len(ingredients)} ingredients in parallel...")
         start_time = __import__('time').time()
         
-        # Run async Wikipedia fetching in separate thread to avoid event loop conflict
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(asyncio.run, self._fetch_all_wikipedia_async(ingredients))
-            wikipedia_data = future.result()
+        wikipedia_data, off_results = await self._fetch_enrichment_async(ingredients)
         
         fetch_time = __import__('time').time() - start_time
-        logger.info(f"Wikipedia parallel fetch completed in {fetch_time:.2f} seconds")
+        logger.info(f"Enrichment fetch completed in {fetch_time:.2f} seconds")
         
         # Gather contexts with Wikipedia data
-        ingredient_contexts = []
+        contexts = {}
         for ing in ingredients:
             wiki_text = wikipedia_data.get(ing, "")
-            off_data = {}
-            
-            # Try to fetch OpenFoodFacts data (sequential, but fast)
-            try:
-                off_url = f"https://world.openfoodfacts.org/cgi/search.pl?search_terms={ing}&json=1"
-                off_data = requests.get(off_url, timeout=5).json().get("products", [{}])[0]
-                logger.debug(f"Fetched OpenFoodFacts data for {ing}")
-            except Exception as e:
-                logger.debug(f"Could not fetch OpenFoodFacts data for {ing}: {e}")
+            off_data = off_results.get(ing, {})
             
             # Build context string for this ingredient
             context = f"- {ing}"
@@ -290,139 +443,129 @@ CRITICAL:
             if off_data:
                 context += f"\n  OpenFoodFacts: {json.dumps(off_data)[:100]}..."
             
-            ingredient_contexts.append(context)
+            contexts[ing] = context
         
-        # Single batch prompt for all ingredients with enriched context
+        # Balanced chunks: 23 ingredients with a chunk size of 10 -> 8, 8, 7
+        chunk_count = -(-len(ingredients) // max(1, settings.research_chunk_size))
+        chunks = [ingredients[i::chunk_count] for i in range(chunk_count)]
+        logger.info(f"Researching {len(ingredients)} ingredients in {chunk_count} concurrent AI call(s)")
+        
+        start_time = __import__('time').time()
+        results = await asyncio.gather(*(self._research_chunk(chunk, contexts) for chunk in chunks))
+        profiles = {}
+        for chunk_profiles in results:
+            profiles.update(chunk_profiles)
+        
+        logger.info(
+            f"Researched {len(profiles)}/{len(ingredients)} ingredients in "
+            f"{__import__('time').time() - start_time:.2f} seconds"
+        )
+        return [profiles.get(ing) for ing in ingredients]
+
+    async def _research_chunk(self, ingredients: List[str], contexts: dict) -> dict:
+        """Research one chunk, retrying only the ingredients missing from the response; returns {ingredient: profile}"""
+        profiles = {}
+        pending = list(ingredients)
+        for attempt in range(settings.research_chunk_retries + 1):
+            if attempt:
+                logger.info(f"Retrying research for {len(pending)} ingredient(s): {', '.join(pending)}")
+            async with self._research_slots:
+                profiles.update(await self._research_call(pending, contexts))
+            pending = [ing for ing in pending if ing not in profiles]
+            if not pending:
+                break
+        return profiles
+
+    async def _research_call(self, ingredients: List[str], contexts: dict) -> dict:
+        """One research LLM call; returns {ingredient: profile} for the profiles that parsed and matched an ingredient"""
         prompt = f"""You are a clinical nutrition and food safety researcher. Analyze the following ingredients and return a JSON array of ingredient profiles.
 
 INGREDIENTS TO ANALYZE (with available scientific context):
-{chr(10).join(ingredient_contexts)}
+{chr(10).join(contexts[ing] for ing in ingredients)}
 
 For EACH ingredient, provide:
-1. name: Standardized ingredient name
-2. manufacturing: Production origin (natural/synthetic/fermented/ultra-processed)
-3. regulatory_gap: Regulatory differences or bans across regions (research and determine actual status)
-4. health_risks: Known or suspected health effects based on evidence
-5. nova_score: NOVA classification (1=minimally processed, 4=ultra-processed)
+1. ingredient: The ingredient exactly as listed above (used to match your answer)
+2. name: Standardized ingredient name
+3. manufacturing: Production origin (natural/synthetic/fermented/ultra-processed)
+4. regulatory_gap: Regulatory differences or bans across regions (research and determine actual status)
+5. health_risks: Known or suspected health effects based on evidence
+6. nova_score: NOVA classification (1=minimally processed, 4=ultra-processed)
 
 Return as a JSON array with exactly {len(ingredients)} objects, one for each ingredient listed above.
 Use the provided scientific context from Wikipedia and OpenFoodFacts, plus your knowledge of regulatory databases to assess each ingredient.
 """
         
         try:
-            # Call AI once for all ingredients
-            logger.info(f"Batch analyzing {len(ingredients)} ingredients in single AI call")
-            response = self.llm.invoke(prompt)
-            
-            # Parse JSON response
-            content = response.content.strip()
-            # Remove markdown code blocks if present
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-            
-            profiles_data = json.loads(content)
-            
-            # Convert to IngredientProfile objects
-            profiles = []
-            for i, data in enumerate(profiles_data):
-                try:
-                    profiles.append(IngredientProfile(
-                        name=data.get("name", ingredients[i]),
-                        manufacturing=data.get("manufacturing", "Unknown"),
-                        regulatory_gap=data.get("regulatory_gap", "No data"),
-                        health_risks=data.get("health_risks", "No data"),
-                        nova_score=data.get("nova_score", 3)
-                    ))
-                except Exception as e:
-                    logger.warning(f"Error parsing profile for ingredient {i}: {e}")
-                    # Fallback profile
-                    profiles.append(IngredientProfile(
-                        name=ingredients[i],
-                        manufacturing="Unknown",
-                        regulatory_gap="No major regulatory restrictions identified",
-                        health_risks="Data unavailable",
-                        nova_score=3
-                    ))
-            
-            logger.info(f"Successfully analyzed {len(profiles)} ingredients in batch")
-            return profiles
-            
+            response = await self.llm.ainvoke(prompt)
         except Exception as e:
             logger.error(f"Error in batch ingredient analysis: {e}")
-            # Return default profiles for all ingredients
-            return [
-                IngredientProfile(
-                    name=ing,
-                    manufacturing="Unknown",
-                    regulatory_gap="No major regulatory restrictions identified",
-                    health_risks="Data unavailable due to API error",
-                    nova_score=3
+            return {}
+        
+        # A truncated or slightly malformed array keeps its complete profiles; the rest are re-asked
+        try:
+            profiles_data = json_repair_parser.parse(response.content, source="research", expect=list)
+        except ValueError as e:
+            logger.error(f"Could not parse batch ingredient analysis: {e}")
+            return {}
+        
+        # Match profiles to ingredients by name (echoed ingredient, else the standardized name)
+        by_key = {canonicalizer.key(ing): ing for ing in ingredients}
+        profiles = {}
+        for data in profiles_data if isinstance(profiles_data, list) else []:
+            if not isinstance(data, dict):
+                continue
+            ing = None
+            for field in ("ingredient", "name"):
+                if isinstance(data.get(field), str):
+                    ing = by_key.get(canonicalizer.key(data[field]))
+                    if ing is not None:
+                        break
+            if ing is None or ing in profiles:
+                logger.warning(f"Research result did not match a requested ingredient: {data.get('ingredient') or data.get('name')}")
+                continue
+            try:
+                profiles[ing] = IngredientProfile(
+                    name=data.get("name", ing),
+                    manufacturing=data.get("manufacturing", "Unknown"),
+                    regulatory_gap=data.get("regulatory_gap", "No data"),
+                    health_risks=data.get("health_risks", "No data"),
+                    nova_score=data.get("nova_score", 3)
                 )
-                for ing in ingredients
-            ]
+            except Exception as e:
+                logger.warning(f"Error parsing profile for ingredient {ing}: {e}")
+        return profiles
 
-    def get_product_category(self, brand_name: str, ingredients: List[str]) -> tuple:
+    async def get_product_category(self, brand_name: str, ingredients: List[str]) -> tuple:
         """
         Extract product category using Hybrid A+C approach.
-        Returns: (category, method) where method is 'keyword', 'api', or 'fallback'
+        Returns: (category, method) where method is 'keyword', 'catalog', 'api', or 'fallback'
         """
-        # CATEGORY DICTIONARY - Core 20 categories covering 90% of products
-        CATEGORY_KEYWORDS = {
-            # Snacks
-            'chips': ['chips', 'crisps', 'nachos', 'tortilla'],
-            'crackers': ['crackers', 'biscuits', 'wafer'],
-            'popcorn': ['popcorn', 'corn puffs'],
-            'pretzels': ['pretzels', 'twist'],
-            
-            # Sweets
-            'cookies': ['cookies', 'cookie', 'oreo', 'bourbon'],
-            'chocolate': ['chocolate', 'cocoa', 'dark chocolate', 'milk chocolate'],
-            'candy': ['candy', 'gummies', 'lollipop', 'toffee'],
-            
-            # Instant Meals
-            'noodles': ['noodles', 'ramen', 'instant noodles', 'maggi', 'pasta'],
-            'ready meals': ['ready to eat', 'instant meal', 'meal kit'],
-            
-            # Beverages
-            'juice': ['juice', 'nectar', 'fruit drink'],
-            'soda': ['cola', 'soda', 'fizzy', 'soft drink', 'pepsi', 'coke'],
-            'energy drinks': ['energy drink', 'red bull', 'monster'],
-            
-            # Dairy
-            'yogurt': ['yogurt', 'yoghurt', 'curd', 'dahi'],
-            'milk': ['milk', 'dairy milk'],
-            'cheese': ['cheese', 'cheddar', 'mozzarella'],
-            
-            # Bakery
-            'bread': ['bread', 'loaf', 'bun', 'roll'],
-            'cakes': ['cake', 'muffin', 'pastry', 'cupcake'],
-            
-            # Others
-            'cereal': ['cereal', 'cornflakes', 'oats', 'granola'],
-            'ice cream': ['ice cream', 'gelato', 'frozen dessert'],
-            'sauce': ['sauce', 'ketchup', 'mayo', 'dressing']
-        }
+        # STEP 1: Fast keyword matching (Primary - 90% of cases); vocabulary in data/keywords/product_categories.json
+        category = category_matcher.best(brand_name)
+        if category:
+            logger.info(f"Category '{category}' detected via keyword matching")
+            return category, 'keyword'
         
-        # STEP 1: Fast keyword matching (Primary - 90% of cases)
-        brand_lower = brand_name.lower()
-        for category, keywords in CATEGORY_KEYWORDS.items():
-            if any(keyword in brand_lower for keyword in keywords):
-                logger.info(f"Category '{category}' detected via keyword matching")
-                return category, 'keyword'
+        # STEP 2: OpenFoodFacts (Fallback - 10% of edge cases), local catalog first
+        if self._catalog_ready():
+            products = await asyncio.to_thread(catalog_store.search, brand_name)
+            categories = products[0]["categories_tags"] if products else []
+            if categories:
+                category_tag = categories[-1].replace("en:", "").replace("-", " ")
+                logger.info(f"Category '{category_tag}' detected via local catalog")
+                return category_tag, 'catalog'
+            logger.warning(f"Could not detect category for '{brand_name}', using generic 'snacks'")
+            return 'snacks', 'fallback'
         
-        # STEP 2: OpenFoodFacts API (Fallback - 10% of edge cases)
         try:
             # Search for this product on OpenFoodFacts to get its category
-            search_url = "https://world.openfoodfacts.org/cgi/search.pl"
             params = {
                 "search_terms": brand_name,
                 "page_size": 1,
                 "json": 1
             }
-            response = requests.get(search_url, params=params, timeout=1)  # Fast timeout for category detection
-            data = response.json()
+            # Fast timeout for category detection (including any wait for the rate limit)
+            data = await asyncio.wait_for(self._search_openfoodfacts(params, timeout=1), timeout=1)
             
             if data.get("products"):
                 product = data["products"][0]
@@ -440,45 +583,73 @@ Use the provided scientific context from Wikipedia and OpenFoodFacts, plus your
         logger.warning(f"Could not detect category for '{brand_name}', using generic 'snacks'")
         return 'snacks', 'fallback'
 
-    def find_better_alternatives(self, brand: str, ingredients: List[str], user_health: str, category: str = None) -> List[str]:
-        """Find healthier alternatives using OpenFoodFacts API (fast, real products)"""
+    async def _fetch_category_products_async(self, brand: str, category: Optional[str]) -> tuple:
+        """
+        Fetch candidate products for alternatives from the live OpenFoodFacts API.
+        Returns (products, category); products is None when the category search fails
+        or the rate limit would hold it longer than settings.alternatives_rate_limit_wait_seconds.
+        """
+        # If no category provided, detect it from OpenFoodFacts
+        if not category:
+            logger.info("Category not provided, detecting via OpenFoodFacts...")
+            params = {"search_terms": brand, "json": 1, "page_size": 1}
+            try:
+                products = (await self._search_openfoodfacts(
+                    params, timeout=5, max_wait=settings.alternatives_rate_limit_wait_seconds
+                )).get("products", [])
+                if products:
+                    category = products[0].get("categories_tags", ["snacks"])[0].replace("en:", "")
+                    logger.info(f"Category '{category}' detected via OpenFoodFacts API")
+            except asyncio.TimeoutError:
+                logger.warning("OpenFoodFacts rate limit busy, using fallback alternatives")
+                return None, category or "snacks"
+            except Exception as e:
+                logger.debug(f"OpenFoodFacts category lookup failed: {e}")
+        
+        if not category:
+            category = "snacks"  # Default fallback
+        
+        # Search OpenFoodFacts INDIA for better alternatives in same category
+        search_url = f"https://in.openfoodfacts.org/category/{category}.json"
+        params = {
+            "page_size": 50,  # Get more to filter
+            "json": 1,
+            "fields": "product_name,brands,nutriscore_grade,nova_group,ingredients_text,allergens_tags,labels_tags"
+        }
+        
+        try:
+            products = (await http_client.get_json(search_url, params=params, timeout=10)).get("products", [])
+        except Exception as e:
+            logger.warning(f"OpenFoodFacts search failed: {e}")
+            return None, category
+        
+        return products, category
+
+    async def find_better_alternatives(self, brand: str, ingredients: List[str], user_health: str, category: str = None) -> List[str]:
+        """Find healthier alternatives using OpenFoodFacts data (local catalog or live API, real products)"""
         try:
-            logger.info(f"Finding alternatives for {brand} using OpenFoodFacts API...")
             start_time = __import__('time').time()
             
-            # If no category provided, detect it from OpenFoodFacts
-            if not category:
-                logger.info("Category not provided, detecting via OpenFoodFacts...")
-                search_url = f"https://world.openfoodfacts.org/cgi/search.pl?search_terms={brand}&json=1&page_size=1"
-                response = requests.get(search_url, timeout=5)
-                if response.ok:
-                    products = response.json().get("products", [])
-                    if products:
-                        category = products[0].get("categories_tags", ["snacks"])[0].replace("en:", "")
-                        logger.info(f"Category '{category}' detected via OpenFoodFacts API")
-            
-            if not category:
-                category = "snacks"  # Default fallback
+            if self._catalog_ready():
+                logger.info(f"Finding alternatives for {brand} using local catalog...")
+                if not category:
+                    matches = await asyncio.to_thread(catalog_store.search, brand)
+                    if matches and matches[0]["categories_tags"]:
+                        category = matches[0]["categories_tags"][0].replace("en:", "")
+                        logger.info(f"Category '{category}' detected via local catalog")
+                category = category or "snacks"
+                products = await asyncio.to_thread(catalog_store.products_in_category, category, limit=50)
+            else:
+                logger.info(f"Finding alternatives for {brand} using OpenFoodFacts API...")
+                products, category = await self._fetch_category_products_async(brand, category)
+                if products is None:
+                    return self._get_fallback_alternatives(category)
             
             # Parse user health constraints
             is_vegan = "vegan" in user_health.lower()
             is_vegetarian = is_vegan or "vegetarian" in user_health.lower()
-            has_gluten_allergy = "gluten" in user_health.lower()
-            
-            # Search OpenFoodFacts INDIA for better alternatives in same category
-            search_url = f"https://in.openfoodfacts.org/category/{category}.json"
-            params = {
-                "page_size": 50,  # Get more to filter
-                "json": 1,
-                "fields": "product_name,brands,nutriscore_grade,nova_group,ingredients_text,allergens_tags,labels_tags"
-            }
-            
-            response = requests.get(search_url, params=params, timeout=10)
-            if not response.ok:
-                logger.warning(f"OpenFoodFacts search failed: {response.status_code}")
-                return self._get_fallback_alternatives(category)
+            user_allergens = allergen_matcher.labels(user_health)
             
-            products = response.json().get("products", [])
             logger.info(f"Found {len(products)} products in category '{category}'")
             
             # Filter and score products
@@ -497,8 +668,8 @@ Use the provided scientific context from Wikipedia and OpenFoodFacts, plus your
                 allergens = product.get("allergens_tags", [])
                 labels = product.get("labels_tags", [])
                 
-                # Skip if has gluten and user is allergic
-                if has_gluten_allergy and any("gluten" in a for a in allergens):
+                # Skip if it contains an allergen the user mentioned ("en:sesame-seeds" matches sesame)
+                if user_allergens and user_allergens & allergen_matcher.labels(" ".join(allergens)):
                     continue
                 
                 # Filter by diet
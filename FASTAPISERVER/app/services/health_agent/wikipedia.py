@@ -0,0 +1,212 @@
+"""Streaming extraction of Wikipedia article intros for ingredient research"""
+
+import re
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import quote
+from lxml import etree
+from app.config.settings import settings
+from app.utils.http_client import http_client
+from app.utils.logger import logger
+
+CITATION_RE = re.compile(r"\s*\[(?:\d+|[a-z]|note \d+|citation needed)\]")
+DISAMBIGUATION_RE = re.compile(r"\bmay (?:also )?(?:refer|stand) to:?$")
+PAGE_NAME_RE = re.compile(r'"wgPageName":"([^"]*)"')
+REDIRECTED_FROM_RE = re.compile(r'"wgRedirectedFrom":"([^"]*)"')
+# Inline markup whose text is not prose ([1] citation markers, [edit] links, TemplateStyles)
+SKIP_CLASSES = ("reference", "mw-editsection", "noprint")
+
+
+class WikipediaIntroParser:
+    """
+    Incremental parser that collects the lead paragraphs of a Wikipedia article.
+
+    Feed it the response body chunk by chunk; feed() returns True once
+    max_paragraphs paragraphs or max_chars characters of prose have been
+    collected (or the page turned out to be a disambiguation page), so the
+    caller can stop downloading. Only paragraphs inside the article body and
+    outside tables (infoboxes) count. The page name and the redirect source
+    are read from the page config script in <head>.
+    """
+
+    def __init__(self, max_paragraphs: int, max_chars: int):
+        self.max_paragraphs = max_paragraphs
+        self.max_chars = max_chars
+        self.paragraphs = []
+        self.chars = 0
+        self.page_name: Optional[str] = None
+        self.redirected_from: Optional[str] = None
+        self.disambiguation = False
+        self.done = False
+        self._in_content = False
+        self._table_depth = 0
+        self._pending = b""
+        self._parser = etree.HTMLPullParser(events=("start", "end"))
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.paragraphs)
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse the next chunk of the body; returns True when nothing more is needed"""
+        if not self.done:
+            # libxml2's push parser loses the rest of the document when a chunk
+            # ends inside a </script> or </style> tag, so only feed up to a '>'
+            data = self._pending + chunk
+            cut = data.rfind(b">") + 1
+            self._pending = data[cut:]
+            if cut:
+                self._parser.feed(data[:cut])
+                self._handle_events()
+        return self.done
+
+    def close(self):
+        """Finish parsing (when the whole body was read)"""
+        if not self.done:
+            try:
+                if self._pending:
+                    self._parser.feed(self._pending)
+                self._parser.close()
+            except etree.LxmlError:
+                pass
+            self._handle_events()
+
+    def _handle_events(self):
+        for event, element in self._parser.read_events():
+            if self.done:
+                return
+            tag = element.tag if isinstance(element.tag, str) else ""
+            if event == "start":
+                if tag == "table":
+                    self._table_depth += 1
+                elif element.get("id") == "mw-content-text":
+                    self._in_content = True
+                continue
+
+            if tag == "table":
+                self._table_depth -= 1
+                element.clear(keep_tail=True)
+            elif tag == "script":
+                self._read_page_config(element.text or "")
+                element.clear(keep_tail=True)
+            elif tag == "p" and self._in_content and self._table_depth == 0:
+                self._add_paragraph(element)
+                element.clear(keep_tail=True)
+
+    def _read_page_config(self, script: str):
+        if "wgPageName" not in script:
+            return
+        match = PAGE_NAME_RE.search(script)
+        if match:
+            self.page_name = match[1].replace("_", " ")
+        match = REDIRECTED_FROM_RE.search(script)
+        if match:
+            self.redirected_from = match[1].replace("_", " ")
+        if '"Disambiguation pages"' in script or '"All disambiguation pages"' in script:
+            self.disambiguation = True
+            self.done = True
+
+    def _add_paragraph(self, paragraph):
+        text = CITATION_RE.sub("", " ".join(self._prose(paragraph).split()))
+        if not text:
+            return
+        if not self.paragraphs and DISAMBIGUATION_RE.search(text):
+            # "Foo may refer to:" - a list of meanings, not a definition
+            self.disambiguation = True
+            self.done = True
+            return
+        self.paragraphs.append(text)
+        self.chars += len(text)
+        if len(self.paragraphs) >= self.max_paragraphs or self.chars >= self.max_chars:
+            self.done = True
+
+    def _prose(self, element) -> str:
+        """Text of an element, skipping citation markers, edit links and styles"""
+        parts = [element.text or ""]
+        for child in element:
+            classes = child.get("class") or ""
+            if isinstance(child.tag, str) and child.tag not in ("style", "script") \
+                    and not any(skip in classes for skip in SKIP_CLASSES):
+                parts.append(self._prose(child))
+            parts.append(child.tail or "")
+        return "".join(parts)
+
+
+class WikipediaFetcher:
+    """
+    Fetch the lead paragraphs of an English Wikipedia article over the shared
+    HTTP client, streaming the body and stopping as soon as the intro is parsed.
+
+    HTTP redirects are followed; wiki redirects (E330 -> Citric acid) are served
+    as the target article and logged. Disambiguation pages return no text.
+    Stopping mid-body closes that connection instead of returning it to the
+    pool, which is cheaper than reading the rest of a long article.
+    """
+
+    BASE_URL = "https://en.wikipedia.org/wiki/"
+    CHUNK_SIZE = 8 * 1024
+
+    def __init__(self, max_paragraphs: int, max_chars: int):
+        self.max_paragraphs = max_paragraphs
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.early_stops = 0
+        self.redirects = 0
+        self.disambiguations = 0
+        self.bytes_read = 0
+        self.parse_seconds = 0.0
+
+    async def fetch_intro(self, title: str, timeout: float = 5) -> str:
+        """Lead paragraphs of the article for title ("" for disambiguation pages); raises on HTTP failure"""
+        url = self.BASE_URL + quote(title.strip().replace(" ", "_"))
+
+        async def read(response) -> WikipediaIntroParser:
+            parser = WikipediaIntroParser(self.max_paragraphs, self.max_chars)
+            bytes_read = 0
+            parse_seconds = 0.0
+            stopped_early = False
+            async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                bytes_read += len(chunk)
+                start = time.thread_time()
+                stopped_early = parser.feed(chunk)
+                parse_seconds += time.thread_time() - start
+                if stopped_early:
+                    break
+            if not stopped_early:
+                parser.close()
+            with self._lock:
+                self.fetches += 1
+                self.early_stops += stopped_early
+                self.redirects += bool(parser.redirected_from or response.history)
+                self.disambiguations += parser.disambiguation
+                self.bytes_read += bytes_read
+                self.parse_seconds += parse_seconds
+            return parser
+
+        parser = await http_client.get_with(url, read, timeout=timeout)
+        if parser.redirected_from:
+            logger.debug(f"Wikipedia redirected '{parser.redirected_from}' to '{parser.page_name}'")
+        if parser.disambiguation:
+            logger.debug(f"Wikipedia page for '{title}' is a disambiguation page; skipping")
+            return ""
+        return parser.text
+
+    def stats(self) -> Dict[str, float]:
+        """Bytes read and parse CPU per article for metrics"""
+        return {
+            "fetches": self.fetches,
+            "early_stops": self.early_stops,
+            "redirects": self.redirects,
+            "disambiguations": self.disambiguations,
+            "avg_kb_read": round(self.bytes_read / 1024 / self.fetches, 1) if self.fetches else 0.0,
+            "avg_parse_ms": round(self.parse_seconds * 1000 / self.fetches, 2) if self.fetches else 0.0
+        }
+
+
+# Global Wikipedia fetcher instance
+wikipedia_fetcher = WikipediaFetcher(
+    max_paragraphs=settings.wikipedia_max_paragraphs,
+    max_chars=settings.wikipedia_max_chars
+)
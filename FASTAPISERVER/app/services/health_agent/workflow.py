@@ -1,24 +1,70 @@
-from langgraph.graph import StateGraph, END
+import time
+from typing import Optional
+from langgraph.graph import StateGraph, START, END
 from .state import HealthCoPilotState
 from .nodes import AgentNodes
 from langchain_google_genai import ChatGoogleGenerativeAI
+from app.utils.logger import logger
 
-def build_health_copilot(llm: ChatGoogleGenerativeAI):
-    """Build the health copilot workflow graph"""
-    nodes = AgentNodes(llm)
+# Node names (used for progress reporting); extract/profile and research/alternatives run in parallel
+WORKFLOW_STAGES = ["extract", "profile", "research", "alternatives", "analyze", "design"]
+
+# Fast mode merges analyze and design into one structured LLM call
+FAST_WORKFLOW_STAGES = ["extract", "profile", "research", "alternatives", "analyze_design"]
+
+
+def _timed(name: str, node):
+    """Wrap a node so its wall time is reported in state["node_timings"]"""
+    async def run(state: HealthCoPilotState):
+        start = time.perf_counter()
+        update = await node(state)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        logger.info(f"Node '{name}' finished in {elapsed_ms:.0f} ms")
+        return {**update, "node_timings": {name: elapsed_ms}}
+    return run
+
+
+def build_health_copilot(llm: ChatGoogleGenerativeAI, nodes: Optional[AgentNodes] = None, mode: str = "full"):
+    """
+    Build the health copilot workflow graph (async nodes - run with ainvoke/astream)
+
+    extract and profile start together (the profile only needs the user's
+    health text); once extraction is done, research and alternatives (which
+    only needs the brand) run in parallel. analyze joins profile + research
+    and design joins analyze + alternatives. Pass nodes to share them (and
+    their tools) with callers outside the graph.
+
+    mode="fast" replaces analyze + design with a single analyze_design node
+    that joins profile, research and alternatives and returns the risk
+    analysis and the narrative from one structured call (one LLM round trip
+    instead of two sequential ones; same final state keys).
+    """
+    nodes = nodes or AgentNodes(llm)
     workflow = StateGraph(HealthCoPilotState)
 
-    workflow.add_node("extract", nodes.extractor_node)
-    workflow.add_node("profile", nodes.health_profiler_node)
-    workflow.add_node("research", nodes.researcher_node)
-    workflow.add_node("analyze", nodes.risk_analyzer_node)
-    workflow.add_node("design", nodes.conversational_designer_node)
-
-    workflow.set_entry_point("extract")
-    workflow.add_edge("extract", "profile")
-    workflow.add_edge("profile", "research")
-    workflow.add_edge("research", "analyze")
-    workflow.add_edge("analyze", "design")
+    workflow.add_node("extract", _timed("extract", nodes.extractor_node))
+    workflow.add_node("profile", _timed("profile", nodes.health_profiler_node))
+    workflow.add_node("research", _timed("research", nodes.researcher_node))
+    workflow.add_node("alternatives", _timed("alternatives", nodes.alternatives_node))
+
+    # Fan out from the start and after extraction
+    workflow.add_edge(START, "extract")
+    workflow.add_edge(START, "profile")
+    workflow.add_edge("extract", "research")
+    workflow.add_edge("extract", "alternatives")
+
+    if mode == "fast":
+        workflow.add_node("analyze_design", _timed("analyze_design", nodes.risk_and_design_node))
+        workflow.add_edge(["profile", "research", "alternatives"], "analyze_design")
+        workflow.add_edge("analyze_design", END)
+        return workflow.compile()
+
+    workflow.add_node("analyze", _timed("analyze", nodes.risk_analyzer_node))
+    workflow.add_node("design", _timed("design", nodes.conversational_designer_node))
+
+    # Join points
+    workflow.add_edge(["profile", "research"], "analyze")
+    workflow.add_edge(["analyze", "alternatives"], "design")
     workflow.add_edge("design", END)
 
     return workflow.compile()
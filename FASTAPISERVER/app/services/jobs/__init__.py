@@ -0,0 +1,6 @@
+"""Background job service module"""
+
+from .store import JobStore, JobStatus
+from .worker import JobWorkerPool
+
+__all__ = ["JobStore", "JobStatus", "JobWorkerPool"]
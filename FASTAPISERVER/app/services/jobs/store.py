@@ -0,0 +1,176 @@
+"""SQLite-backed persistent job store"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+from app.utils.logger import logger
+
+
+class JobStatus:
+    """Job lifecycle states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobStore:
+    """
+    Durable job queue in a local SQLite database (WAL mode).
+
+    Queued jobs keep their image bytes in the database so they survive a
+    restart; the image is dropped once the job finishes, and finished jobs are
+    deleted by purge_finished. Each claim counts as an attempt, so a job that
+    keeps crashing the process is failed instead of requeued forever. All
+    methods are synchronous and short - call them via asyncio.to_thread from
+    async code.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max(1, max_attempts)
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                user_raw_health TEXT NOT NULL,
+                image BLOB,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                stages TEXT NOT NULL DEFAULT '[]',
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+            """
+        )
+        logger.info(f"Job store ready at {db_path}")
+
+    def create(self, image: bytes, user_raw_health: str) -> str:
+        """Persist a new queued job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, user_raw_health, image, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, JobStatus.QUEUED, user_raw_health, image, now, now),
+            )
+        return job_id
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running, counting an attempt, and return it (with image)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, user_raw_health, image FROM jobs "
+                    "WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (JobStatus.QUEUED,),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, stages = '[]', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (JobStatus.RUNNING, time.time(), row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return dict(row)
+
+    def add_stage(self, job_id: str, stage: str):
+        """Record a completed workflow stage for a running job"""
+        with self._lock:
+            row = self._conn.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            stages = json.loads(row["stages"])
+            stages.append(stage)
+            self._conn.execute(
+                "UPDATE jobs SET stages = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(stages), time.time(), job_id),
+            )
+
+    def complete(self, job_id: str, result_json: str):
+        """Mark a job completed with its serialized result"""
+        self._finish(job_id, JobStatus.COMPLETED, result=result_json)
+
+    def fail(self, job_id: str, error: str):
+        """Mark a job failed"""
+        self._finish(job_id, JobStatus.FAILED, error=error)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, image = NULL, updated_at = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def requeue_running(self) -> int:
+        """
+        Put jobs interrupted by a shutdown/crash back in the queue; jobs that
+        already used max_attempts are failed (they may be what crashed it)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, image = NULL, updated_at = ? WHERE status = ? AND attempts >= ?",
+                (JobStatus.FAILED, f"Interrupted {self.max_attempts} times", now, JobStatus.RUNNING, self.max_attempts),
+            )
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, stages = '[]', updated_at = ? WHERE status = ?",
+                (JobStatus.QUEUED, now, JobStatus.RUNNING),
+            )
+        return cursor.rowcount
+
+    def purge_finished(self, ttl_seconds: float) -> int:
+        """Delete completed and failed jobs last updated more than ttl_seconds ago"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (JobStatus.COMPLETED, JobStatus.FAILED, time.time() - ttl_seconds),
+            )
+        return cursor.rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job's status, progress and result (without the image)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, status, stages, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["stages"] = json.loads(job["stages"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
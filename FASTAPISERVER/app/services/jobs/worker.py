@@ -0,0 +1,107 @@
+"""In-process worker pool that drains the persistent job queue"""
+
+import asyncio
+from typing import List, Optional
+from app.models.responses import HealthAnalysisResponse
+from app.utils.logger import logger
+from .store import JobStore
+
+
+class JobWorkerPool:
+    """
+    Run queued health analyses on a fixed number of asyncio workers.
+
+    The pool size bounds how many workflows hit Groq/Gemini at once,
+    independently of how many HTTP requests are accepted. Finished jobs
+    older than result_ttl seconds are purged at start and then hourly.
+    """
+
+    CLEANUP_INTERVAL = 60 * 60
+
+    def __init__(self, store: JobStore, workflow, num_workers: int = 2, poll_interval: float = 1.0,
+                 result_ttl: float = 7 * 24 * 60 * 60):
+        self.store = store
+        self.workflow = workflow
+        self.num_workers = max(1, num_workers)
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Requeue interrupted jobs and start the workers"""
+        requeued = await asyncio.to_thread(self.store.requeue_running)
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted jobs")
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(i), name=f"job-worker-{i}")
+            for i in range(self.num_workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop(), name="job-cleanup"))
+        logger.info(f"Started {self.num_workers} job workers")
+
+    async def stop(self):
+        """Cancel the workers (running jobs are requeued on next start)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Stopped job workers")
+
+    def notify(self):
+        """Wake idle workers after a job was enqueued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _cleanup_loop(self):
+        while True:
+            try:
+                purged = await asyncio.to_thread(self.store.purge_finished, self.result_ttl)
+                if purged:
+                    logger.info(f"Purged {purged} finished jobs")
+            except Exception as e:
+                logger.warning(f"Job cleanup failed: {e}")
+            await asyncio.sleep(self.CLEANUP_INTERVAL)
+
+    async def _worker_loop(self, worker_id: int):
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logger.info(f"Worker {worker_id} running job {job['id']}")
+            await self._run_job(job)
+
+    async def _run_job(self, job: dict):
+        job_id = job["id"]
+
+        try:
+            inputs = {
+                "image_bytes": job["image"],
+                "user_raw_health": job["user_raw_health"]
+            }
+            state = dict(inputs)
+
+            # Stream node updates so per-stage progress is visible while polling
+            async for chunk in self.workflow.astream(inputs, stream_mode="updates"):
+                for node_name, update in chunk.items():
+                    state.update(update or {})
+                    await asyncio.to_thread(self.store.add_stage, job_id, node_name)
+
+            response = HealthAnalysisResponse.from_workflow_result(state)
+            await asyncio.to_thread(self.store.complete, job_id, response.model_dump_json())
+            logger.info(f"Job {job_id} completed for brand: {state.get('brand_name', 'Unknown')}")
+
+        except asyncio.CancelledError:
+            # Leave the job as running; it is requeued when the pool starts again
+            raise
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            await asyncio.to_thread(self.store.fail, job_id, str(e))
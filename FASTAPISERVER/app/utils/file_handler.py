@@ -2,22 +2,40 @@
 
 import os
 import uuid
-import shutil
+import asyncio
+import hashlib
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from fastapi import UploadFile, HTTPException, status
-import requests
+from fastapi.concurrency import run_in_threadpool
+import aiohttp
 from app.config.settings import settings
+from app.utils.http_client import http_client
 from app.utils.logger import logger
 
 
+def detect_image_extension(header: bytes) -> Optional[str]:
+    """Identify an image format from its magic bytes"""
+    
+    if header.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
 class FileHandler:
     """Handle file uploads and downloads"""
     
+    CHUNK_SIZE = 64 * 1024
+    
     def __init__(self):
         """Initialize file handler and create upload directory"""
         self.upload_dir = Path(settings.upload_dir)
         self.upload_dir.mkdir(parents=True, exist_ok=True)
+        self._download_slots = asyncio.Semaphore(settings.download_max_connections)
     
     def validate_file(self, file: UploadFile) -> bool:
         """Validate uploaded file type and size"""
@@ -32,81 +50,133 @@ class FileHandler:
         
         return True
     
-    def save_upload_file(self, file: UploadFile) -> str:
-        """Save uploaded file to disk and return the path"""
+    async def load_upload_image(self, file: UploadFile) -> Tuple[Dict[str, Any], str]:
+        """
+        Read an uploaded image for the workflow and return (image_input, sha256 digest)
+        
+        image_input is {"image_bytes": ...} so the image never touches disk; uploads
+        larger than settings.upload_spill_threshold are spilled to the upload directory
+        and returned as {"image_path": ...} instead (release with cleanup_image_input).
+        """
+        
+        # Validate file
+        self.validate_file(file)
+        
+        digest = hashlib.sha256()
+        buffer = bytearray()
+        spill_path = None
+        spill_file = None
+        total_size = 0
         
         try:
-            # Validate file
-            self.validate_file(file)
-            
-            # Generate unique filename
-            file_ext = Path(file.filename).suffix.lower()
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-            file_path = self.upload_dir / unique_filename
-            
-            # Save file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            logger.info(f"Saved uploaded file: {file_path}")
-            return str(file_path)
-            
-        except HTTPException:
-            raise
+            while chunk := await file.read(self.CHUNK_SIZE):
+                total_size += len(chunk)
+                if total_size > settings.max_file_size:
+                    raise self._too_large_error()
+                digest.update(chunk)
+                
+                if spill_file is not None:
+                    await run_in_threadpool(spill_file.write, chunk)
+                    continue
+                
+                buffer.extend(chunk)
+                if len(buffer) > settings.upload_spill_threshold:
+                    # Too large to keep in memory - spill what we have and stream the rest to disk
+                    file_ext = Path(file.filename).suffix.lower()
+                    spill_path = self.upload_dir / f"{uuid.uuid4()}{file_ext}"
+                    spill_file = await run_in_threadpool(open, spill_path, "wb")
+                    await run_in_threadpool(spill_file.write, bytes(buffer))
+                    buffer = bytearray()
+        
         except Exception as e:
-            logger.error(f"Error saving file: {e}")
+            if spill_file is not None:
+                spill_file.close()
+                self.cleanup_file(str(spill_path))
+            if isinstance(e, HTTPException):
+                raise
+            logger.error(f"Error reading uploaded file: {e}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to save file: {str(e)}"
+                detail=f"Failed to read uploaded file: {str(e)}"
             )
+        
+        if spill_file is not None:
+            spill_file.close()
+            logger.info(f"Spilled large upload to disk: {spill_path}")
+            return {"image_path": str(spill_path)}, digest.hexdigest()
+        
+        return {"image_bytes": bytes(buffer)}, digest.hexdigest()
     
-    def download_from_url(self, url: str) -> str:
-        """Download image from URL and save to disk"""
+    async def download_image(self, url: str) -> Tuple[Dict[str, Any], str]:
+        """
+        Download an image from URL into memory and return (image_input, sha256 digest)
+        
+        The body is streamed and the download aborted as soon as it exceeds
+        settings.max_file_size; the image type is verified from its magic bytes
+        rather than the server's content-type header.
+        """
+        
+        timeout = aiohttp.ClientTimeout(
+            total=settings.download_total_timeout,
+            connect=settings.download_connect_timeout,
+            sock_read=settings.download_read_timeout
+        )
         
         try:
-            # Download file
-            response = requests.get(url, timeout=10, stream=True)
-            response.raise_for_status()
+            session = await http_client.session()
             
-            # Determine file extension from content type
-            content_type = response.headers.get('content-type', '')
-            if 'image/jpeg' in content_type or 'image/jpg' in content_type:
-                file_ext = '.jpg'
-            elif 'image/png' in content_type:
-                file_ext = '.png'
-            elif 'image/webp' in content_type:
-                file_ext = '.webp'
-            else:
-                # Try to get from URL
-                file_ext = Path(url).suffix.lower()
-                if file_ext not in settings.allowed_extensions:
-                    file_ext = '.jpg'  # Default
+            async with self._download_slots, session.get(url, timeout=timeout) as response:
+                response.raise_for_status()
+                
+                # Reject early when the server announces an oversized body
+                if response.content_length and response.content_length > settings.max_file_size:
+                    raise self._too_large_error()
+                
+                digest = hashlib.sha256()
+                buffer = bytearray()
+                async for chunk in response.content.iter_chunked(self.CHUNK_SIZE):
+                    buffer.extend(chunk)
+                    if len(buffer) > settings.max_file_size:
+                        raise self._too_large_error()
+                    digest.update(chunk)
             
-            # Generate unique filename
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-            file_path = self.upload_dir / unique_filename
+            file_ext = detect_image_extension(bytes(buffer[:16]))
+            if file_ext not in settings.allowed_extensions:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"URL did not return a supported image. Allowed types: {', '.join(settings.allowed_extensions)}"
+                )
             
-            # Save file
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            logger.info(f"Downloaded {len(buffer)} byte {file_ext} image from URL")
+            return {"image_bytes": bytes(buffer)}, digest.hexdigest()
             
-            logger.info(f"Downloaded file from URL: {file_path}")
-            return str(file_path)
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error downloading file from URL: {e}")
+        except HTTPException:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Error downloading file from URL: {e!r}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to download image from URL: {str(e)}"
+                detail=f"Failed to download image from URL: {str(e) or type(e).__name__}"
             )
         except Exception as e:
-            logger.error(f"Error saving downloaded file: {e}")
+            logger.error(f"Error reading downloaded file: {e}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to save downloaded file: {str(e)}"
+                detail=f"Failed to read downloaded file: {str(e)}"
             )
     
+    def _too_large_error(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Image too large. Maximum size: {settings.max_file_size // (1024 * 1024)}MB"
+        )
+    
+    def cleanup_image_input(self, image_input: Optional[Dict[str, Any]]):
+        """Delete the spilled/downloaded file behind an image input, if any"""
+        
+        if image_input and image_input.get("image_path"):
+            self.cleanup_file(image_input["image_path"])
+    
     def cleanup_file(self, file_path: str):
         """Delete a file from disk"""
         
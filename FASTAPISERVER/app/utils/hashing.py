@@ -0,0 +1,39 @@
+"""Content hashing helpers for cache and coalescing keys"""
+
+import hashlib
+import re
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Hex SHA-256 digest of in-memory bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_health_profile(user_raw_health: str) -> str:
+    """Case- and whitespace-insensitive form of a health profile string"""
+    return " ".join(user_raw_health.lower().split())
+
+
+def canonical_health_profile(user_raw_health: str) -> str:
+    """
+    Order-insensitive form of a health profile string
+    
+    Clauses (split on . ; and newlines) are sorted, and so are the comma/"and"
+    separated conditions within each clause, keeping any "Label:" prefix in
+    front: "Diabetes, hypertension. Allergies: nuts" and
+    "allergies: NUTS.  Hypertension and diabetes" are the same profile.
+    """
+    clauses = []
+    for clause in re.split(r"[.;\n]+", normalize_health_profile(user_raw_health)):
+        label, _, items = clause.rpartition(":")
+        conditions = sorted(filter(None, (c.strip() for c in re.split(r",|\band\b|&", items))))
+        if conditions:
+            clauses.append(f"{label.strip()}: {', '.join(conditions)}" if label else ", ".join(conditions))
+    return ". ".join(sorted(clauses))
+
+
+def analysis_key(image_digest: str, user_raw_health: str, mode: str = "full") -> str:
+    """Key identifying an analysis by image content, normalized health profile and analysis mode"""
+    profile_digest = sha256_bytes(normalize_health_profile(user_raw_health).encode("utf-8"))
+    key = f"{image_digest}:{profile_digest}"
+    return key if mode == "full" else f"{key}:{mode}"
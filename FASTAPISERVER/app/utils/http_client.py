@@ -0,0 +1,137 @@
+"""Shared outbound HTTP client (Wikipedia, OpenFoodFacts, image downloads)"""
+
+import asyncio
+from typing import Any, Dict, Optional
+import aiohttp
+from app.config.settings import settings
+from app.utils.logger import logger
+
+# Transient upstream responses worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    """
+    One aiohttp session for the lifetime of the app.
+
+    The connector keeps connections alive between scans (no fresh TCP+TLS
+    handshake per Wikipedia/OpenFoodFacts request), caps connections overall
+    and per host, and caches DNS lookups. get_json/get_with apply uniform
+    timeouts and retry idempotent GETs on connection errors, timeouts and
+    429/5xx responses. Connection reuse is counted through aiohttp tracing.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.retries = 0
+        self.errors = 0
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_cache_misses += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    async def start(self):
+        """Create the session (called on app startup; also created on first use)"""
+        await self.session()
+
+    async def session(self) -> aiohttp.ClientSession:
+        """The shared session, for callers that need streaming access"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=settings.http_max_connections,
+                    limit_per_host=settings.http_max_connections_per_host,
+                    keepalive_timeout=settings.http_keepalive_timeout,
+                    ttl_dns_cache=settings.http_dns_cache_ttl,
+                    use_dns_cache=True
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=settings.http_timeout,
+                    connect=settings.http_connect_timeout
+                ),
+                headers={"User-Agent": f"{settings.app_name}/{settings.app_version}"},
+                trace_configs=[self._trace_config()]
+            )
+            logger.info("Opened shared HTTP client session")
+        return self._session
+
+    async def _get(self, url: str, params: Optional[Dict[str, Any]], timeout: Optional[float], read):
+        session = await self.session()
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        attempts = settings.http_retries + 1
+        for attempt in range(attempts):
+            try:
+                async with session.get(url, params=params, timeout=request_timeout) as response:
+                    if response.status in RETRY_STATUSES and attempt + 1 < attempts:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason or ""
+                        )
+                    response.raise_for_status()
+                    return await read(response)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRY_STATUSES
+                if not retryable or attempt + 1 >= attempts:
+                    self.errors += 1
+                    raise
+                self.retries += 1
+                logger.debug(f"Retrying GET {url} after {e!r}")
+                await asyncio.sleep(settings.http_retry_backoff * 2 ** attempt)
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """GET a JSON document (content type not enforced); raises on failure after retries"""
+        return await self._get(url, params, timeout, lambda response: response.json(content_type=None))
+
+    async def get_with(self, url: str, read, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        """GET and return await read(response), e.g. to stream the body; raises on failure after retries"""
+        return await self._get(url, params, timeout, read)
+
+    async def close(self):
+        """Close the shared session and its connection pool"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Closed shared HTTP client session")
+
+    def stats(self) -> Dict[str, float]:
+        """Connection reuse and retry counters for metrics"""
+        connections = self.connections_created + self.connections_reused
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "reuse_ratio": round(self.connections_reused / connections, 4) if connections else 0.0,
+            "dns_cache_hits": self.dns_cache_hits,
+            "dns_cache_misses": self.dns_cache_misses,
+            "retries": self.retries,
+            "errors": self.errors
+        }
+
+
+# Global shared HTTP client instance (opened on startup, closed on shutdown)
+http_client = HttpClient()
@@ -0,0 +1,183 @@
+"""Tolerant parsing of JSON embedded in LLM responses"""
+
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_decoder = json.JSONDecoder()
+LITERALS = {"true": "true", "false": "false", "null": "null", "True": "true", "False": "false", "None": "null"}
+
+
+def _extract(text: str, expect: Optional[type]) -> str:
+    """The fenced block if there is one, from the first '{' (or '[') on: prose around the JSON is dropped"""
+    fence = FENCE_RE.search(text)
+    if fence and fence[1].strip():
+        text = fence[1]
+    openers = "{" if expect is dict else "[" if expect is list else "{["
+    starts = [position for position in (text.find(opener) for opener in openers) if position >= 0]
+    return text[min(starts):] if starts else text
+
+
+def _strip_trailing_comma(out: List[str]):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _repair(text: str) -> List[str]:
+    """
+    Rewrite near-JSON as JSON in one pass; returns candidates, most complete first.
+
+    Fixes // /* */ # comments, single-quoted strings, raw newlines in strings,
+    Python literals, unquoted keys, trailing commas and mismatched closers.
+    Stops after the first complete top-level value (trailing prose ignored).
+    A truncated value is closed as-is, and also cut back to the last complete
+    element, since the unfinished one may not parse. An unfinished object in
+    an array (a record cut off mid-way) is always dropped.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    opened: List[int] = []  # Output position of each open bracket
+    # (output length, open brackets) after the last complete element
+    safe: Optional[Tuple[int, Tuple[str, ...]]] = None
+    i, n = 0, len(text)
+    while i < n:
+        char = text[i]
+        if char in "\"'":
+            quote, j, chars = char, i + 1, []
+            while j < n and text[j] != quote:
+                if text[j] == "\\" and j + 1 < n:
+                    chars.append("'" if text[j + 1] == "'" else text[j:j + 2])
+                    j += 2
+                    continue
+                chars.append({'"': '\\"', "\n": "\\n", "\t": "\\t", "\r": ""}.get(text[j], text[j]))
+                j += 1
+            if j >= n:
+                break  # Truncated inside a string
+            out.append('"' + "".join(chars) + '"')
+            i = j + 1
+            continue
+        if text.startswith("//", i) or char == "#":
+            i = text.find("\n", i) if "\n" in text[i:] else n
+            continue
+        if text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = end + 2 if end >= 0 else n
+            continue
+
+        if char in "{[":
+            stack.append("}" if char == "{" else "]")
+            opened.append(len(out))
+            out.append(char)
+        elif char in "}]":
+            if not stack:
+                break
+            _strip_trailing_comma(out)
+            out.append(stack.pop())
+            opened.pop()
+            if not stack:
+                return ["".join(out)]
+            safe = (len(out), tuple(stack))
+        elif char == ",":
+            if stack:
+                safe = (len(out), tuple(stack))
+            out.append(char)
+        elif char.isalpha() or char == "_":
+            word = WORD_RE.match(text, i)[0]
+            rest = text[i + len(word):].lstrip(" \t")
+            if word in LITERALS and not rest.startswith(":"):
+                out.append(LITERALS[word])
+            else:
+                out.append(f'"{word}"' if rest.startswith(":") else word)
+            i += len(word)
+            continue
+        else:
+            out.append(char)
+        i += 1
+
+    records = [depth for depth in range(1, len(stack)) if stack[depth] == "}" and stack[depth - 1] == "]"]
+    if records:
+        cut = out[:opened[records[0]]]
+        _strip_trailing_comma(cut)
+        return ["".join(cut) + "".join(reversed(stack[:records[0]]))]
+
+    candidates = []
+    _strip_trailing_comma(out)
+    if stack:
+        candidates.append("".join(out) + "".join(reversed(stack)))
+    if safe is not None:
+        length, open_brackets = safe
+        cut = out[:length]
+        _strip_trailing_comma(cut)
+        candidates.append("".join(cut) + "".join(reversed(open_brackets)))
+    return candidates or ["".join(out)]
+
+
+class JSONRepairParser:
+    """
+    Parses the JSON object or array in an LLM response, repairing common
+    defects locally instead of asking a model to reformat it.
+
+    Counts, per source, responses that parsed as-is, needed extraction from
+    prose/code fences, needed repair, or could not be recovered. Callers record
+    the LLM call they fall back to for the last group; each repair is an LLM
+    call avoided.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, source: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(
+                source, {"clean": 0, "extracted": 0, "repaired": 0, "failed": 0, "llm_fallbacks": 0}
+            )
+            counts[outcome] += 1
+
+    def parse(self, text: str, source: str = "default", expect: Optional[type] = None) -> Any:
+        """
+        Parse text as JSON, repairing it if needed. `expect` (dict or list)
+        selects the outermost value to look for and is enforced.
+        Raises ValueError if nothing of the expected type can be recovered.
+        """
+        text = (text or "").strip()
+        attempts = [("clean", text), ("extracted", _extract(text, expect))]
+        attempts += [("repaired", candidate) for candidate in _repair(attempts[1][1])]
+        for outcome, candidate in attempts:
+            try:
+                # Extracted JSON may still be followed by prose, which raw_decode ignores
+                value = _decoder.raw_decode(candidate)[0] if outcome == "extracted" else json.loads(candidate)
+            except ValueError:
+                continue
+            if expect is None or isinstance(value, expect):
+                self._count(source, outcome)
+                return value
+
+        self._count(source, "failed")
+        raise ValueError(f"No valid JSON {expect.__name__ if expect else 'value'} in response: {text[:200]!r}")
+
+    def record_fallback(self, source: str):
+        """Count an LLM call made because a response could not be parsed"""
+        self._count(source, "llm_fallbacks")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-source outcomes, repair rate (of responses that were not clean JSON) and LLM calls avoided"""
+        with self._lock:
+            result = {}
+            for source, counts in self._counts.items():
+                unclean = counts["extracted"] + counts["repaired"] + counts["failed"]
+                result[source] = {
+                    **counts,
+                    "repair_rate": round((counts["extracted"] + counts["repaired"]) / unclean, 4) if unclean else 0.0,
+                    "llm_calls_avoided": counts["repaired"]
+                }
+            return result
+
+
+# Global JSON repair parser instance
+json_repair_parser = JSONRepairParser()
@@ -0,0 +1,64 @@
+"""Token-bucket rate limiting for outbound API calls"""
+
+import asyncio
+import time
+from typing import Dict
+from app.config.settings import settings
+
+
+class TokenBucket:
+    """
+    Async token bucket: up to `burst` calls at once, refilled at `rate` calls per second.
+
+    acquire() waits (first come, first served) until a token is available, so
+    callers fanned out with asyncio.gather are spread to the upstream's limit
+    instead of being rejected. Cancelling a waiting caller gives up its turn.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Take one token, waiting for a refill if the bucket is empty"""
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                self.throttled += 1
+                start = time.monotonic()
+                try:
+                    while self._tokens < 1:
+                        await asyncio.sleep((1 - self._tokens) / self.rate)
+                        self._refill()
+                finally:
+                    self.wait_seconds += time.monotonic() - start
+            self._tokens -= 1
+            self.acquired += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Throughput and throttling counters for metrics"""
+        return {
+            "rate_per_second": round(self.rate, 4),
+            "burst": self.burst,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "avg_wait_ms": round(self.wait_seconds * 1000 / self.throttled, 1) if self.throttled else 0.0
+        }
+
+
+# Global limiter for the live OpenFoodFacts search API
+openfoodfacts_rate_limiter = TokenBucket(
+    rate=settings.openfoodfacts_rate_limit_per_minute / 60,
+    burst=settings.openfoodfacts_rate_limit_burst
+)
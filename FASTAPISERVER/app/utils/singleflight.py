@@ -0,0 +1,66 @@
+"""Single-flight coalescing of identical in-flight async calls"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.utils.logger import logger
+
+
+class SingleFlight:
+    """
+    Ensure only one execution per key is in flight at a time.
+
+    The first caller for a key (the leader) starts the work as a task; callers
+    arriving with the same key while it runs await that task instead of
+    starting their own. Each caller awaits through asyncio.shield, so one
+    client disconnecting never cancels the shared work for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        cleanup: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """
+        Run fn() for key, or join the execution already in flight for key.
+
+        cleanup releases what fn() would use (e.g. a spilled upload). The
+        execution owns it: it runs when the shared task finishes, not when the
+        leader returns, since coalesced callers may outlive a cancelled leader.
+        A caller that joins instead runs its cleanup right away.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            if cleanup is not None:
+                task.add_done_callback(lambda t: cleanup())
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalesced {self.name} request onto in-flight execution")
+            if cleanup is not None:
+                cleanup()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Leader/coalesced counters for metrics"""
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight)
+        }
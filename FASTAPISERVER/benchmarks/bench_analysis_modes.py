@@ -0,0 +1,250 @@
+"""
+Benchmark analysis modes: full (risk_analyzer_node, then
+conversational_designer_node - two sequential LLM calls) vs. fast
+(risk_and_design_node - one structured call returning both).
+
+Only the stages that differ are run, on fixed post-research workflow states
+for a few sample products, so extraction/research latency does not blur the
+comparison. Reported per mode:
+
+- latency of the analyze+design stages (mean and p95 over --runs)
+- prompt tokens sent and LLM calls made
+- quality: how many of the six insight sections (plus COLOR_CODE) are present,
+  how many decision colors came from the model rather than keyword fallback,
+  and how often both modes land on the same decision (green/yellow/orange/red)
+
+By default the LLM is simulated with a latency model (round trip + prefill
++ decode at --decode-tps), which isolates the saved round trip; the
+simulated text always contains every section, so quality numbers are only
+meaningful with --live, which calls Gemini (GOOGLE_API_KEY, GEMINI_MODEL).
+
+Usage (from FASTAPISERVER/):
+    python benchmarks/bench_analysis_modes.py [--runs 3] [--live]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings require API keys even though the simulated run calls no API
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatResult  # noqa: E402
+from langchain_core.runnables import RunnableLambda  # noqa: E402
+from app.services.health_agent.nodes import AgentNodes  # noqa: E402
+from app.services.health_agent.prompt_context import count_tokens  # noqa: E402
+
+SECTIONS = ["Scanning your", "Quick Decision", "Why This Matters", "Tradeoffs", "Unsure About", "Better Options", "COLOR_CODE"]
+
+SIMULATED_RISK = "Risk analysis: " + "the sodium and refined palm oil conflict with the user's blood pressure goals. " * 25
+SIMULATED_INSIGHT = (
+    "🤔 Scanning your product...\n**Quick Decision:** OK in moderation. Sodium is on the high side.\n"
+    "**COLOR_CODE:** #EAB308\n**Why This Matters To You:**\n" + "- Each serving adds sodium and saturated fat to your day.\n" * 12
+    + "**Tradeoffs:** Tasty and convenient, but salty.\n**What I'm Unsure About:**\n"
+    + "- The label does not say how the palm oil was refined.\n" * 6
+    + "**Better Options:** 🛒\n- Baked chips (Why it's better: less fat, available at: BigBasket)\n"
+)
+
+PROFILES = {
+    "hypertension": "Hypertension -> limit sodium (<1500 mg/day), saturated fat and vasoconstrictors.",
+    "diabetes": "Type 2 diabetes -> limit added sugars, refined starches and high glycemic load.",
+}
+
+
+def ingredient(name, nova, manufacturing, regulatory_gap, health_risks):
+    return {"name": name, "nova_score": nova, "manufacturing": manufacturing,
+            "regulatory_gap": regulatory_gap, "health_risks": health_risks}
+
+
+PRODUCTS = [
+    {
+        "brand_name": "Salted Potato Chips",
+        "ingredients_list": ["Potato", "Palm Oil", "Salt", "Maltodextrin", "Monosodium Glutamate"],
+        "nutrition_facts": {"serving_size": "28g", "calories": 152, "total_fat_g": 10, "saturated_fat_g": 4.5, "sodium_mg": 170, "carbohydrates_g": 15},
+        "ingredient_knowledge_base": [
+            ingredient("Potato", 1, "Sliced and fried", "", "Acrylamide forms when fried"),
+            ingredient("Palm Oil", 2, "Refined, bleached, deodorized", "", "High saturated fat; 3-MCPD esters from refining"),
+            ingredient("Salt", 2, "Evaporated", "", "Raises blood pressure in salt-sensitive people"),
+            ingredient("Maltodextrin", 4, "Enzymatic starch hydrolysis", "", "High glycemic index"),
+            ingredient("Monosodium Glutamate", 4, "Bacterial fermentation", "", "Adds sodium"),
+        ],
+        "product_alternatives": ["Baked Lentil Chips (Why it's better: 40% less fat)", "Roasted Makhana (Why it's better: low sodium)"],
+    },
+    {
+        "brand_name": "Chocolate Sandwich Cookies",
+        "ingredients_list": ["Wheat Flour", "Sugar", "Palm Oil", "Cocoa", "High Fructose Corn Syrup", "Soy Lecithin", "Vanillin"],
+        "nutrition_facts": {"serving_size": "34g", "calories": 160, "total_fat_g": 7, "sugars_g": 14, "sodium_mg": 135, "carbohydrates_g": 25},
+        "ingredient_knowledge_base": [
+            ingredient("Wheat Flour", 2, "Milled and bleached", "", "Refined starch"),
+            ingredient("Sugar", 2, "Refined cane sugar", "", "Blood sugar spikes"),
+            ingredient("Palm Oil", 2, "Refined, bleached, deodorized", "", "High saturated fat"),
+            ingredient("Cocoa", 2, "Alkalized", "", "Minimal"),
+            ingredient("High Fructose Corn Syrup", 4, "Enzymatic isomerization of corn starch", "Restricted labelling in the EU", "Linked to insulin resistance"),
+            ingredient("Soy Lecithin", 4, "Solvent extracted", "", "Soy allergen"),
+            ingredient("Vanillin", 4, "Synthesized from guaiacol", "", "Minimal"),
+        ],
+        "product_alternatives": ["Oat Digestives (Why it's better: more fiber, less sugar)"],
+    },
+    {
+        "brand_name": "Medjool Dates",
+        "ingredients_list": ["Dates"],
+        "nutrition_facts": {"serving_size": "40g", "calories": 110, "sugars_g": 27, "fiber_g": 3, "carbohydrates_g": 30},
+        "ingredient_knowledge_base": [ingredient("Dates", 1, "Dried whole fruit", "", "Natural sugars")],
+        "product_alternatives": [],
+    },
+]
+
+
+class SimulatedLLM(BaseChatModel):
+    """Chat model whose latency is round trip + prefill + decode time; replies are canned"""
+
+    round_trip: float = 0.4
+    prefill_tps: float = 10000.0
+    decode_tps: float = 150.0
+    calls: int = 0
+    prompt_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated"
+
+    async def _respond(self, prompt: str, output: str) -> str:
+        self.calls += 1
+        self.prompt_tokens += count_tokens(prompt)
+        await asyncio.sleep(self.round_trip + count_tokens(prompt) / self.prefill_tps + count_tokens(output) / self.decode_tps)
+        return output
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError("SimulatedLLM is async only")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = messages[-1].content
+        output = SIMULATED_INSIGHT if "COLOR_CODE" in prompt else SIMULATED_RISK
+        text = await self._respond(prompt, output)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def with_structured_output(self, schema, **kwargs):
+        async def respond(prompt):
+            await self._respond(prompt, SIMULATED_RISK + SIMULATED_INSIGHT)
+            return schema(clinical_risk_analysis=SIMULATED_RISK, final_conversational_insight=SIMULATED_INSIGHT)
+        return RunnableLambda(lambda prompt: None, afunc=respond)
+
+
+class CountingLLM:
+    """Wraps a real chat model to count calls and prompt tokens"""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        self.prompt_tokens += count_tokens(prompt)
+        return await self.llm.ainvoke(prompt)
+
+    def with_structured_output(self, schema, **kwargs):
+        structured = self.llm.with_structured_output(schema, **kwargs)
+        counter = self
+
+        class Structured:
+            async def ainvoke(self, prompt):
+                counter.calls += 1
+                counter.prompt_tokens += count_tokens(prompt)
+                return await structured.ainvoke(prompt)
+
+        return Structured()
+
+
+def decision(color: str) -> str:
+    """Bucket a decision color into green/yellow/orange/red"""
+    try:
+        red, green = int(color[1:3], 16), int(color[3:5], 16)
+    except (TypeError, ValueError):
+        return "unknown"
+    if green > red:
+        return "green"  # #22C55E, #84CC16
+    if green >= 0x90:
+        return "yellow"  # #EAB308, #F59E0B
+    return "orange" if green >= 0x60 else "red"  # #F97316 / #EF4444, #DC2626
+
+
+async def run_mode(nodes: AgentNodes, mode: str, state: dict) -> tuple:
+    start = time.perf_counter()
+    if mode == "fast":
+        update = await nodes.risk_and_design_node(state)
+    else:
+        update = await nodes.risk_analyzer_node(state)
+        update.update(await nodes.conversational_designer_node({**state, **update}))
+    return time.perf_counter() - start, update
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per product, profile and mode")
+    parser.add_argument("--live", action="store_true", help="Call Gemini instead of the simulated model")
+    parser.add_argument("--round-trip", type=float, default=0.4, help="Simulated seconds to first token")
+    parser.add_argument("--decode-tps", type=float, default=150.0, help="Simulated output tokens per second")
+    args = parser.parse_args()
+
+    if args.live:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from app.config.settings import settings
+        llm = CountingLLM(ChatGoogleGenerativeAI(
+            model=settings.gemini_model,
+            temperature=settings.gemini_temperature,
+            google_api_key=settings.google_api_key
+        ))
+    else:
+        llm = SimulatedLLM(round_trip=args.round_trip, decode_tps=args.decode_tps)
+    nodes = AgentNodes(llm)
+
+    states = [
+        {**product, "user_raw_health": name, "user_clinical_profile": profile}
+        for product in PRODUCTS for name, profile in PROFILES.items()
+    ]
+    results = {"full": [], "fast": []}
+    for mode in ("full", "fast"):
+        calls_before, tokens_before = llm.calls, llm.prompt_tokens
+        for state in states:
+            for _ in range(args.runs):
+                results[mode].append((state["brand_name"], state["user_raw_health"], *(await run_mode(nodes, mode, state))))
+        results[mode + "_calls"] = llm.calls - calls_before
+        results[mode + "_tokens"] = llm.prompt_tokens - tokens_before
+
+    analyses = len(states) * args.runs
+    print(f"{'mode':<6}{'mean s':>9}{'p95 s':>9}{'calls':>8}{'prompt tok':>12}{'sections':>11}{'model color':>13}")
+    decisions = {}
+    for mode in ("full", "fast"):
+        latencies = sorted(latency for _, _, latency, _ in results[mode])
+        sections = sum(
+            sum(section in update["final_conversational_insight"] for section in SECTIONS)
+            for _, _, _, update in results[mode]
+        )
+        model_colors = sum(
+            "COLOR_CODE" in update["final_conversational_insight"] for _, _, _, update in results[mode]
+        )
+        for brand, profile, _, update in results[mode]:
+            decisions.setdefault((brand, profile), {}).setdefault(mode, []).append(decision(update["decision_color"]))
+        print(f"{mode:<6}{statistics.mean(latencies):>9.2f}{latencies[int(0.95 * (len(latencies) - 1))]:>9.2f}"
+              f"{results[mode + '_calls'] / analyses:>8.1f}{results[mode + '_tokens'] / analyses:>12.0f}"
+              f"{sections / analyses:>8.2f}/{len(SECTIONS)}{model_colors / analyses:>12.0%}")
+
+    agreement = [
+        max(modes["full"], key=modes["full"].count) == max(modes["fast"], key=modes["fast"].count)
+        for modes in decisions.values()
+    ]
+    print(f"decision agreement (majority per product/profile): {sum(agreement)}/{len(agreement)}")
+    for (brand, profile), modes in decisions.items():
+        print(f"  {brand} / {profile}: full={','.join(modes['full'])} fast={','.join(modes['fast'])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Benchmark the ingredient canonicalizer.
+
+Builds a canonicalizer with the bundled alias table plus N synthetic
+aliases, then times exact, fuzzy (one typo) and unknown lookups, both
+cold (resolved) and warm (memoized). Cold fuzzy cost grows as aliases
+share more words, so try a smaller --vocabulary for a worst case.
+
+Usage (from FASTAPISERVER/):
+    python benchmarks/bench_canonicalizer.py [--aliases 50000] [--lookups 20000]
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings require API keys even though nothing here calls the APIs
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from app.services.health_agent.canonicalizer import DEFAULT_ALIASES_PATH, IngredientCanonicalizer  # noqa: E402
+
+def synthetic_vocabulary(count: int, rng: random.Random) -> list:
+    """Pseudo-words standing in for the vocabulary of a real alias table (thousands of distinct words)"""
+    vocabulary = set()
+    while len(vocabulary) < count:
+        vocabulary.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))))
+    return sorted(vocabulary)
+
+
+def synthetic_names(count: int, vocabulary: list, rng: random.Random) -> list:
+    names = set()
+    while len(names) < count:
+        names.add(" ".join(rng.sample(vocabulary, rng.randint(1, 4))))
+    return sorted(names)
+
+
+def with_typo(text: str, rng: random.Random) -> str:
+    position = rng.randrange(len(text))
+    return text[:position] + rng.choice(string.ascii_lowercase) + text[position + 1:]
+
+
+def time_lookups(canonicalizer: IngredientCanonicalizer, queries: list, clear_memo: bool) -> float:
+    """Mean microseconds per canonicalize() call"""
+    if clear_memo:
+        canonicalizer._memo.clear()
+    start = time.perf_counter()
+    for query in queries:
+        canonicalizer.canonicalize(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aliases", type=int, default=50000, help="Synthetic aliases to add")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="Distinct words the aliases are built from")
+    parser.add_argument("--lookups", type=int, default=20000, help="Lookups per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    canonicalizer = IngredientCanonicalizer(memo_size=args.lookups * 4)
+    start = time.perf_counter()
+    canonicalizer.load(DEFAULT_ALIASES_PATH)
+    names = synthetic_names(args.aliases, synthetic_vocabulary(args.vocabulary, rng), rng)
+    for i in range(0, len(names), 2):
+        canonicalizer.add(names[i], names[i + 1:i + 2])
+    build_seconds = time.perf_counter() - start
+
+    label_strings = [
+        "Sugar", "sugar*", "SUGAR (sucrose)", "INS 330", "Citric Acid (E330)", "Iodised Salt",
+        "Edible Vegetable Oil (Palmolein)", "Emulsifier (INS 471)", "Raising Agent (INS 500(ii))",
+        "Wheat Flour (Maida)", "Milk Solids", "Spices & Condiments", "Potato (62%)",
+    ]
+    scenarios = {
+        "label strings": [rng.choice(label_strings) + " " * rng.randint(0, 3) for _ in range(args.lookups)],
+        "exact alias": [rng.choice(names).upper() for _ in range(args.lookups)],
+        "fuzzy (1 typo)": [with_typo(rng.choice(names), rng) for _ in range(args.lookups)],
+        "unknown": ["".join(rng.choices(string.ascii_lowercase + " ", k=20)) for _ in range(args.lookups)],
+    }
+
+    stats = canonicalizer.stats()
+    print(f"aliases: {stats['aliases']}  build: {build_seconds:.2f} s")
+    print(f"{'scenario':<18}{'cold us/lookup':>16}{'memoized us/lookup':>20}")
+    for label, queries in scenarios.items():
+        cold = time_lookups(canonicalizer, queries, clear_memo=True)
+        warm = time_lookups(canonicalizer, queries, clear_memo=False)
+        print(f"{label:<18}{cold:>16.1f}{warm:>20.2f}")
+
+    stats = canonicalizer.stats()
+    print(f"resolved: exact={stats['exact']} fuzzy={stats['fuzzy']} unknown={stats['unknown']}")
+
+
+if __name__ == "__main__":
+    main()
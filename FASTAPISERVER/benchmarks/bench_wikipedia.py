@@ -0,0 +1,160 @@
+"""
+Benchmark Wikipedia intro extraction: full download + BeautifulSoup (before)
+vs. streaming parse with early stop (after).
+
+By default pages are served from a local server: synthetic articles shaped
+like Wikipedia's desktop HTML (page config and styles in <head>, navigation,
+an infobox, the lead, then --article-kb of sections), plus a disambiguation
+page and an HTTP redirect. With --live the real en.wikipedia.org articles for
+a list of common ingredients are fetched instead.
+
+Reports body bytes read (after decompression) and parse CPU per ingredient.
+
+Usage (from FASTAPISERVER/):
+    python benchmarks/bench_wikipedia.py [--articles 30] [--article-kb 300] [--live]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings require API keys even though nothing here calls the APIs
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from aiohttp import web  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+from app.services.health_agent.wikipedia import WikipediaFetcher  # noqa: E402
+from app.utils.http_client import http_client  # noqa: E402
+
+LIVE_INGREDIENTS = [
+    "Sugar", "Salt", "Palm oil", "Citric acid", "Sodium benzoate", "Monosodium glutamate",
+    "Soy lecithin", "Maltodextrin", "Xanthan gum", "Aspartame", "Sucralose", "Carrageenan",
+    "Sodium nitrite", "Tartrazine", "High-fructose corn syrup", "Wheat flour", "Cocoa butter",
+    "Whey", "Guar gum", "Acesulfame potassium",
+]
+
+WORDS = ("food additive acid sodium compound used flavour preservative production natural "
+         "synthetic process industry sugar water solution salt plant extract studies health "
+         "intake regulation approved europe united states").split()
+
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(12, 24))
+    return " ".join(words).capitalize() + f'.<sup class="reference"><a href="#cite_note-{rng.randint(1, 99)}">[{rng.randint(1, 99)}]</a></sup>'
+
+
+def paragraph(rng: random.Random, sentences: int) -> str:
+    return "<p>" + " ".join(sentence(rng) for _ in range(sentences)) + "</p>\n"
+
+
+def synthetic_article(title: str, article_kb: int, rng: random.Random, disambiguation: bool = False) -> bytes:
+    categories = '"All disambiguation pages","Disambiguation pages"' if disambiguation else '"Food additives"'
+    head = (
+        f'<!DOCTYPE html><html><head><meta charset="UTF-8"><title>{title} - Wikipedia</title>'
+        f'<script>RLCONF={{"wgPageName":"{title.replace(" ", "_")}","wgCategories":[{categories}]}};</script>'
+        + "<style>" + ".vector-menu{display:block}" * 1500 + "</style></head>"
+    )
+    navigation = "<nav>" + "".join(f'<li><a href="/wiki/P{i}">Portal {i}</a></li>' for i in range(400)) + "</nav>"
+    infobox = "<table class=\"infobox\">" + "".join(
+        f"<tr><th>Property {i}</th><td><p>{i * 3.7:.1f} g/mol</p></td></tr>" for i in range(40)
+    ) + "</table>"
+    if disambiguation:
+        lead = f"<p><b>{title}</b> may refer to:</p><ul>" + "<li>Something</li>" * 30 + "</ul>"
+    else:
+        lead = '<p class="mw-empty-elt"></p>' + "".join(paragraph(rng, 4) for _ in range(4))
+    body = []
+    size = 0
+    while size < article_kb * 1024:
+        section = '<h2>Section<span class="mw-editsection">[edit]</span></h2>' + paragraph(rng, 8)
+        body.append(section)
+        size += len(section)
+    html = (
+        head + "<body>" + navigation
+        + '<main><div id="mw-content-text"><div class="mw-parser-output">'
+        + infobox + lead + "".join(body) + "</div></div></main></body></html>"
+    )
+    return html.encode("utf-8")
+
+
+async def fetch_full(url: str):
+    """Before: read the whole body, parse it with BeautifulSoup/lxml, keep the first 3 <p>"""
+    async def read(response):
+        return await response.read()
+
+    body = await http_client.get_with(url, read, timeout=30)
+    start = time.thread_time()
+    soup = BeautifulSoup(body.decode("utf-8", "replace"), "lxml")
+    text = " ".join(p.text for p in soup.select("p")[:3])
+    return len(body), time.thread_time() - start, text
+
+
+async def run(base_url: str, titles: list, fetcher: WikipediaFetcher):
+    before_bytes = before_cpu = 0
+    for title in titles:
+        size, cpu, _ = await fetch_full(base_url + title.replace(" ", "_"))
+        before_bytes += size
+        before_cpu += cpu
+
+    for title in titles:
+        await fetcher.fetch_intro(title, timeout=30)
+    stats = fetcher.stats()
+
+    count = len(titles)
+    print(f"{'':<10}{'KB read/ingredient':>20}{'parse CPU ms/ingredient':>26}")
+    print(f"{'before':<10}{before_bytes / 1024 / count:>20.1f}{before_cpu * 1000 / count:>26.2f}")
+    print(f"{'after':<10}{stats['avg_kb_read']:>20.1f}{stats['avg_parse_ms']:>26.2f}")
+    print(f"early stops: {stats['early_stops']}/{stats['fetches']}  redirects: {stats['redirects']}  "
+          f"disambiguations: {stats['disambiguations']}")
+    sample = await fetcher.fetch_intro(titles[0], timeout=30)
+    print(f"sample intro ({titles[0]}): {sample[:160]}...")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=30, help="Synthetic articles to serve")
+    parser.add_argument("--article-kb", type=int, default=300, help="Approximate size of each synthetic article")
+    parser.add_argument("--live", action="store_true", help="Fetch real en.wikipedia.org articles")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    fetcher = WikipediaFetcher(max_paragraphs=3, max_chars=1000)
+
+    if args.live:
+        await run(WikipediaFetcher.BASE_URL, LIVE_INGREDIENTS, fetcher)
+        await http_client.close()
+        return
+
+    rng = random.Random(args.seed)
+    titles = [f"Additive {i}" for i in range(args.articles)]
+    pages = {title.replace(" ", "_"): synthetic_article(title, args.article_kb, rng) for title in titles}
+    pages["Gum"] = synthetic_article("Gum", 20, rng, disambiguation=True)
+
+    async def serve(request):
+        name = request.match_info["name"]
+        if name == "E_number_0":
+            raise web.HTTPMovedPermanently("/wiki/Additive_0")
+        if name not in pages:
+            raise web.HTTPNotFound()
+        return web.Response(body=pages[name], content_type="text/html", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/wiki/{name}", serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    fetcher.BASE_URL = f"http://127.0.0.1:{port}/wiki/"
+    try:
+        await run(fetcher.BASE_URL, titles + ["Gum", "E number 0"], fetcher)
+    finally:
+        await http_client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings require API keys; unit tests never call the APIs
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+# Module-level stores open their SQLite files (and the log file) on import;
+# keep them out of the working tree
+_state_dir = tempfile.mkdtemp(prefix="ingredisense-tests-")
+for variable, filename in {
+    "CATALOG_PATH": "catalog.db",
+    "LABEL_INDEX_PATH": "label_index.db",
+    "INGREDIENT_CACHE_PATH": "ingredient_profiles.db",
+    "CLINICAL_PROFILE_CACHE_PATH": "clinical_profiles.db",
+    "JOB_STORE_PATH": "jobs.db",
+    "LOG_FILE": "logs/app.log",
+}.items():
+    os.environ[variable] = os.path.join(_state_dir, filename)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_state_dir, ignore_errors=True)
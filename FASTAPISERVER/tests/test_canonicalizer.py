@@ -0,0 +1,108 @@
+import pytest
+from app.services.health_agent.canonicalizer import (
+    DEFAULT_ALIASES_PATH,
+    IngredientCanonicalizer,
+    normalize,
+    tokens_match,
+)
+
+
+@pytest.fixture(scope="module")
+def canonicalizer():
+    canonicalizer = IngredientCanonicalizer()
+    canonicalizer.load(DEFAULT_ALIASES_PATH)
+    return canonicalizer
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("E330", "e330"),
+    ("e-330", "e330"),
+    ("INS 330", "e330"),
+    ("E 150d", "e150d"),
+    ("INS 500(ii)", "e500ii"),
+    ("Sugar 12.5%", "sugar"),
+])
+def test_normalize(raw, expected):
+    assert normalize(raw) == expected
+
+
+@pytest.mark.parametrize("raw, expected_id", [
+    ("SUGAR (sucrose)", "sugar"),
+    ("INS 330", "citric-acid"),
+    ("Citric Acid (E330)", "citric-acid"),
+    ("Edible vegetable oil (palmolein)", "palm-oil"),
+    ("Wheat Flour (Maida) 45%", "wheat-flour"),
+])
+def test_exact_aliases(canonicalizer, raw, expected_id):
+    assert canonicalizer.key(raw) == expected_id
+
+
+@pytest.mark.parametrize("raw, expected_id", [
+    ("Emulsifier (471)", "mono-and-diglycerides-of-fatty-acids"),
+    ("Emulsifier (E471)", "mono-and-diglycerides-of-fatty-acids"),
+    ("Preservative (211)", "sodium-benzoate"),
+    ("Colour (150d)", "sulphite-ammonia-caramel"),
+    ("Class II Preservative (INS 211)", "sodium-benzoate"),
+    ("Raising agent 500(ii)", "sodium-bicarbonate"),
+    ("Emulsifiers (322, 471)", "lecithins+mono-and-diglycerides-of-fatty-acids"),
+    ("Emulsifier (E322, E471)", "lecithins+mono-and-diglycerides-of-fatty-acids"),
+    ("Colours (E102, E110)", "tartrazine+sunset-yellow-fcf"),
+    ("Flavour enhancer (627, 631)", "disodium-guanylate+disodium-inosinate"),
+    ("Stabilizer (E412, E415)", "guar-gum+xanthan-gum"),
+])
+def test_functional_class_with_codes_resolves_to_additives(canonicalizer, raw, expected_id):
+    assert canonicalizer.key(raw) == expected_id
+
+
+def test_additive_names_round_trip(canonicalizer):
+    combined = canonicalizer.canonicalize("Emulsifiers (322, 471)")
+    assert "E322" in combined.name and "E471" in combined.name
+    assert canonicalizer.key(combined.name) == combined.id
+    assert canonicalizer.is_known("Emulsifiers (322, 471)")
+
+
+def test_unknown_code_is_not_collapsed_to_class(canonicalizer):
+    additive = canonicalizer.canonicalize("Preservative (9999)")
+    assert additive.id == "e9999"
+    assert "E9999" in additive.name
+
+
+def test_bare_class_stays_class(canonicalizer):
+    assert canonicalizer.key("Emulsifiers") == "emulsifier"
+    assert canonicalizer.key("Permitted food colour") == "colour"
+
+
+@pytest.mark.parametrize("raw", [
+    "vitamin a", "vitamin b1", "vitamin b6", "vitamin d3", "vitamin k",
+    "Onion", "garlic", "chilli", "glucose", "rice flour", "egg powder",
+])
+def test_distinct_ingredients_are_not_merged(canonicalizer, raw):
+    resolved = canonicalizer.canonicalize(raw)
+    assert resolved.id not in ("vitamins", "onion-powder", "garlic-powder", "red-chilli-powder", "glucose-syrup", "rice", "egg")
+
+
+@pytest.mark.parametrize("raw, expected_id", [
+    ("Maltodextrine", "maltodextrin"),
+    ("Skimmed milk powdr", "skimmed-milk-powder"),
+])
+def test_fuzzy_fixes_spelling(canonicalizer, raw, expected_id):
+    assert canonicalizer.key(raw) == expected_id
+
+
+def test_tokens_match():
+    assert tokens_match("suqar", "sugar")
+    assert not tokens_match("vitamin b1", "vitamin b6")
+    assert not tokens_match("onion", "onion powder")
+    assert not tokens_match("salt", "malt")
+
+
+def test_unknown_spellings_collapse(canonicalizer):
+    assert canonicalizer.key("Dragon Fruit Pulp") == canonicalizer.key("dragon-fruit pulp (12%)")
+    assert not canonicalizer.is_known("Dragon Fruit Pulp")
+
+
+def test_memoized(canonicalizer):
+    hits = canonicalizer.memo_hits
+    canonicalizer.key("Memo test sugar")
+    canonicalizer.key("Memo test sugar")
+    assert canonicalizer.memo_hits == hits + 1
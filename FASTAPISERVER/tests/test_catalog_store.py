@@ -0,0 +1,165 @@
+import gzip
+import json
+import pytest
+from app.services.catalog import ingest
+from app.services.catalog import store as store_module
+from app.services.catalog.store import CatalogStore
+
+
+def product(code, name, brands="Acme", categories="en:snacks", modified=100, **fields):
+    return {
+        "code": code,
+        "product_name": name,
+        "brands": brands,
+        "categories_tags": categories,
+        "last_modified_t": modified,
+        "ingredients_text": "potato, salt",
+        **fields,
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    catalog = CatalogStore(str(tmp_path / "catalog.db"))
+    yield catalog
+    catalog.close()
+
+
+def test_not_ready_until_ingested(store):
+    assert not store.is_ready()
+    store.upsert_products([product("0001", "Chips")])
+    assert store.is_ready()
+
+
+def test_older_version_does_not_replace_newer(store):
+    assert store.upsert_products([product("0001", "New chips", modified=200)]) == 1
+    assert store.upsert_products([product("0001", "Old chips", modified=100)]) == 0
+    assert store.get_by_barcode("0001")["product_name"] == "New chips"
+
+
+def test_equal_or_newer_version_replaces_indexes(store):
+    store.upsert_products([product("0001", "Salted chips", categories="en:chips", modified=100)])
+    assert store.upsert_products([product("0001", "Masala puffs", categories="en:puffs", modified=100)]) == 1
+    assert store.get_by_barcode("0001")["product_name"] == "Masala puffs"
+    assert store.products_in_category("chips") == []
+    assert [p["code"] for p in store.products_in_category("en:puffs")] == ["0001"]
+    assert store.search("salted") == []
+    assert store.search("masala")[0]["code"] == "0001"
+    assert store.stats() == {"products": 1, "categories": 1}
+
+
+def test_later_duplicate_in_one_batch_wins(store):
+    store.upsert_products([product("0001", "First", modified=100), product("0001", "Second", modified=100)])
+    assert store.get_by_barcode("0001")["product_name"] == "Second"
+
+
+def test_country_filter_and_missing_code(store):
+    written = store.upsert_products([
+        product("0001", "Indian chips", countries_tags="en:india"),
+        product("0002", "French chips", countries_tags="en:france"),
+        product("", "No barcode"),
+    ], country="en:india")
+    assert written == 1
+    assert store.get_by_barcode("0002") is None
+
+
+def test_category_order_puts_ungraded_last(store):
+    store.upsert_products([
+        product("0001", "Ungraded"),
+        product("0002", "Grade C", nutriscore_grade="c", nova_group=4),
+        product("0003", "Grade A", nutriscore_grade="a", nova_group=3),
+        product("0004", "Grade A less processed", nutriscore_grade="a", nova_group=1),
+    ])
+    assert [p["code"] for p in store.products_in_category("Snacks")] == ["0004", "0003", "0002", "0001"]
+    assert [p["code"] for p in store.products_in_category("snacks", nutriscore_grades=["A"], max_nova_group=2)] == ["0004"]
+
+
+def test_search_requires_all_words_then_falls_back_to_any(store):
+    store.upsert_products([
+        product("0001", "Classic salted potato chips"),
+        product("0002", "Salted peanuts"),
+    ])
+    assert [p["code"] for p in store.search("salted potato")] == ["0001"]
+    assert [p["code"] for p in store.search("potato wafers")] == ["0001"]
+    assert store.search("chocolate") == []
+    assert store.search("!!!") == []
+
+
+def test_search_results_cached_case_insensitively(store):
+    store.upsert_products([product("0001", "Salted peanuts")])
+    first = store.search("Salted  Peanuts")
+    assert store.search("salted peanuts") is first
+    assert store.search("salted peanuts", limit=5) is not first
+
+
+def test_search_cache_evicts_least_recently_used(store, monkeypatch):
+    monkeypatch.setattr(store_module, "SEARCH_CACHE_SIZE", 2)
+    store.upsert_products([product("0001", "Salted peanuts")])
+    salted = store.search("salted")
+    peanuts = store.search("peanuts")
+    assert store.search("salted") is salted  # peanuts is now least recently used
+    store.search("acme")
+    assert store.search("salted") is salted
+    assert store.search("peanuts") is not peanuts
+
+
+def test_search_many(store):
+    store.upsert_products([product("0001", "Salted peanuts")])
+    results = store.search_many(["peanuts", "chocolate"])
+    assert [p["code"] for p in results["peanuts"]] == ["0001"]
+    assert results["chocolate"] == []
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.content
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def delta_file(*products):
+    return gzip.compress("\n".join(json.dumps(p) for p in products).encode("utf-8"))
+
+
+def test_refresh_applies_only_pending_deltas_in_order(store, monkeypatch):
+    files = {
+        "index.txt": b"delta_2.json.gz\ndelta_1.json.gz\ndelta_3.json.gz\n",
+        "delta_1.json.gz": delta_file(product("0001", "Old name", modified=100)),
+        "delta_2.json.gz": delta_file(product("0001", "New name", modified=200), product("0002", "Peanuts")),
+        "delta_3.json.gz": delta_file(product("0003", "Already applied")),
+    }
+    requested = []
+
+    def fake_get(url, **kwargs):
+        name = url.rsplit("/", 1)[1]
+        requested.append(name)
+        return FakeResponse(files[name])
+
+    monkeypatch.setattr(ingest.requests, "get", fake_get)
+    store.set_meta(ingest.APPLIED_DELTAS_KEY, "delta_3.json.gz")
+
+    assert ingest.refresh(store) == 3
+    assert requested == ["index.txt", "delta_1.json.gz", "delta_2.json.gz"]
+    assert store.get_by_barcode("0001")["product_name"] == "New name"
+    assert store.get_by_barcode("0003") is None
+    assert set(store.get_meta(ingest.APPLIED_DELTAS_KEY).split("\n")) == {
+        "delta_1.json.gz", "delta_2.json.gz", "delta_3.json.gz"
+    }
+
+    requested.clear()
+    assert ingest.refresh(store) == 0
+    assert requested == ["index.txt"]
@@ -0,0 +1,80 @@
+import pytest
+from app.services.health_agent import ingredient_cache as ingredient_cache_module
+from app.services.health_agent.ingredient_cache import IngredientProfileCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ingredient_cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def make_cache(tmp_path, ttl_seconds=100, max_entries=10):
+    return IngredientProfileCache(str(tmp_path / "cache" / "profiles.db"), ttl_seconds, max_entries)
+
+
+def test_round_trip_and_stats(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.set_many({"sugar": '{"name": "Sugar"}', "salt": '{"name": "Salt"}'})
+    assert cache.get_many(["sugar", "salt", "sugar", "palm-oil"]) == {
+        "sugar": '{"name": "Sugar"}', "salt": '{"name": "Salt"}'
+    }
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["lookups"] == 3 and stats["hits"] == 2
+
+
+def test_empty_inputs(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    assert cache.get_many([]) == {}
+    cache.set_many({})
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=100)
+    cache.set_many({"sugar": "{}"})
+    clock[0] += 99
+    assert cache.get_many(["sugar"]) == {"sugar": "{}"}
+    clock[0] += 2
+    assert cache.get_many(["sugar"]) == {}
+
+
+def test_reads_do_not_extend_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=100)
+    cache.set_many({"sugar": "{}"})
+    clock[0] += 60
+    cache.get_many(["sugar"])
+    clock[0] += 60
+    assert cache.get_many(["sugar"]) == {}
+
+
+def test_least_recently_used_evicted(tmp_path, clock):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.set_many({"a": "1"})
+    clock[0] += 1
+    cache.set_many({"b": "2"})
+    clock[0] += 1
+    cache.get_many(["a"])  # b is now least recently used
+    clock[0] += 1
+    cache.set_many({"c": "3"})
+    assert cache.get_many(["a", "b", "c"]) == {"a": "1", "c": "3"}
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+
+
+def test_overwrite_refreshes_entry(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl_seconds=100)
+    cache.set_many({"sugar": "old"})
+    clock[0] += 90
+    cache.set_many({"sugar": "new"})
+    clock[0] += 90
+    assert cache.get_many(["sugar"]) == {"sugar": "new"}
+
+
+def test_persists_across_instances_and_clear(tmp_path, clock):
+    make_cache(tmp_path).set_many({"sugar": "{}"})
+    cache = make_cache(tmp_path)
+    assert cache.stats()["entries"] == 1
+    assert cache.get_many(["sugar"]) == {"sugar": "{}"}
+    cache.clear()
+    assert cache.get_many(["sugar"]) == {}
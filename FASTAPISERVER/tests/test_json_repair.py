@@ -0,0 +1,65 @@
+import pytest
+from app.utils.json_repair import JSONRepairParser
+
+
+@pytest.fixture
+def parser():
+    return JSONRepairParser()
+
+
+def test_clean_json(parser):
+    assert parser.parse('{"brand": "X"}', "t", dict) == {"brand": "X"}
+    assert parser.stats()["t"]["clean"] == 1
+
+
+@pytest.mark.parametrize("text", [
+    'Here is the data:\n```json\n{"brand": "X", "ingredients": ["a", "b"]}\n```\nHope it helps',
+    'Sure! {"brand": "X", "ingredients": ["a", "b"]} Let me know if you need more.',
+])
+def test_extracts_json_from_prose_and_fences(parser, text):
+    assert parser.parse(text, "t", dict) == {"brand": "X", "ingredients": ["a", "b"]}
+    assert parser.stats()["t"]["extracted"] == 1
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"ingredients": ["a", "b",],}', {"ingredients": ["a", "b"]}),
+    ("{'brand': 'Lay\\'s', 'ok': True, 'n': None}", {"brand": "Lay's", "ok": True, "n": None}),
+    ('{\n  // comment\n  brand: "X", /* block */ "ingredients": ["a"]  # python\n}', {"brand": "X", "ingredients": ["a"]}),
+    ('{"text": "line1\nline2"}', {"text": "line1\nline2"}),
+    ('{"a": [1, 2}', {"a": [1, 2]}),
+])
+def test_repairs_common_defects(parser, text, expected):
+    assert parser.parse(text, "t", dict) == expected
+    stats = parser.stats()["t"]
+    assert stats["repaired"] == 1 and stats["llm_calls_avoided"] == 1
+
+
+def test_hash_inside_string_is_not_a_comment(parser):
+    assert parser.parse('{"color": "#EAB308", "x": 1,}', "t", dict) == {"color": "#EAB308", "x": 1}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"brand": "X", "ingredients": ["Wheat flour", "Sugar", "Pal', {"brand": "X", "ingredients": ["Wheat flour", "Sugar"]}),
+    ('{"brand": "X", "nutrition": {"calories": 80, "fat": 1.', {"brand": "X", "nutrition": {"calories": 80}}),
+    ('{"brand": "X", "ingredients": ["a", "b"', {"brand": "X", "ingredients": ["a", "b"]}),
+])
+def test_truncated_objects(parser, text, expected):
+    assert parser.parse(text, "t", dict) == expected
+
+
+def test_truncated_array_drops_unfinished_record(parser):
+    text = '[{"ingredient": "a", "nova_score": 1}, {"ingredient": "b", "name": "B'
+    assert parser.parse(text, "t", list) == [{"ingredient": "a", "nova_score": 1}]
+
+
+def test_expected_type_is_enforced(parser):
+    with pytest.raises(ValueError):
+        parser.parse("[1, 2]", "t", dict)
+
+
+def test_unrecoverable_text_fails_and_counts(parser):
+    with pytest.raises(ValueError):
+        parser.parse("I cannot read this label.", "t", dict)
+    parser.record_fallback("t")
+    stats = parser.stats()["t"]
+    assert stats["failed"] == 1 and stats["llm_fallbacks"] == 1 and stats["repair_rate"] == 0.0
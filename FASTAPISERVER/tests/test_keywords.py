@@ -0,0 +1,64 @@
+import json
+import pytest
+from app.services.health_agent.keywords import KeywordMatcher, build_matcher, normalize
+
+
+@pytest.fixture
+def matcher():
+    matcher = KeywordMatcher("test")
+    matcher.add("chocolate", ["chocolate", "dark chocolate"])
+    matcher.add("nuts", ["nuts", "mixed nuts"])
+    matcher.add("bread", ["roll", "bread"])
+    return matcher
+
+
+def test_normalize():
+    assert normalize("Lay's Ready-to-Eat") == "lay s ready to eat"
+    assert normalize("Café  CRÈME") == "cafe creme"
+
+
+def test_matches_on_word_boundaries_only(matcher):
+    assert matcher.labels("Mixed Nuts") == {"nuts"}
+    assert matcher.labels("Doughnuts") == set()
+    assert matcher.labels("rolled oats") == set()
+    assert matcher.labels("Bread roll") == {"bread"}
+
+
+def test_overlapping_terms_all_reported(matcher):
+    terms = [match.term for match in matcher.find_all("70% Dark Chocolate")]
+    assert terms == ["dark chocolate", "chocolate"]
+
+
+def test_best_uses_vocabulary_order(matcher):
+    assert matcher.best("Chocolate bread roll with nuts") == "chocolate"
+    assert matcher.best("Bread with nuts") == "nuts"
+    assert matcher.best("Potato chips") is None
+
+
+def test_contains_across_texts(matcher):
+    assert matcher.contains("Sugar", "Salt", "Hazelnut and mixed nuts")
+    assert not matcher.contains("Sugar", "Salt")
+
+
+def test_terms_added_after_build_are_matched(matcher):
+    matcher.find_all("warm up")
+    matcher.add("dates", ["medjool dates"])
+    assert matcher.labels("Medjool Dates") == {"dates"}
+
+
+def test_duplicate_terms_keep_first_label(matcher):
+    matcher.add("other", ["nuts"])
+    assert matcher.labels("nuts") == {"nuts"}
+
+
+def test_load_json_vocabulary(tmp_path):
+    path = tmp_path / "vocab.json"
+    path.write_text(json.dumps([{"label": "milk", "terms": ["milk", "whey"]}]))
+    matcher = KeywordMatcher("file")
+    assert matcher.load(str(path)) == 1
+    assert matcher.labels("Whey protein") == {"milk"}
+
+
+def test_bundled_allergens():
+    allergens = build_matcher("allergens")
+    assert {"peanuts", "gluten"} <= allergens.labels("Contains peanuts and wheat")
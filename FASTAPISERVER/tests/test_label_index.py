@@ -0,0 +1,104 @@
+import pytest
+from app.services.health_agent import label_index as label_index_module
+from app.services.health_agent.label_index import HASH_BITS, LabelHashIndex
+
+BASE = 0xF0F0_1234_ABCD_8001
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(label_index_module.time, "time", lambda: now[0])
+    return now
+
+
+def make_index(tmp_path, max_distance=4, ttl_seconds=100, max_entries=10):
+    return LabelHashIndex(str(tmp_path / "labels.db"), max_distance, ttl_seconds, max_entries)
+
+
+def flip(phash, *bits):
+    for bit in bits:
+        phash ^= 1 << bit
+    return phash
+
+
+@pytest.mark.parametrize("num_segments", [1, 3, 5, 7, 64])
+def test_segments_cover_every_bit_once(num_segments):
+    layout = LabelHashIndex._segment_layout(num_segments)
+    covered = 0
+    for shift, mask in layout:
+        assert covered & (mask << shift) == 0
+        covered |= mask << shift
+    assert covered == (1 << HASH_BITS) - 1
+
+
+@pytest.mark.parametrize("bits, found", [
+    ((), True),
+    ((0,), True),
+    ((0, 13, 26, 39), True),  # One differing bit in each of four segments
+    ((60, 61, 62, 63), True),  # All differences in the last segment
+    ((0, 13, 26, 39, 52), False),  # Every segment differs: beyond max_distance
+    ((1, 2, 3, 4, 5), False),
+])
+def test_lookup_within_max_distance(tmp_path, clock, bits, found):
+    index = make_index(tmp_path, max_distance=4)
+    index.add(BASE, '{"brand": "A"}')
+    assert (index.lookup(flip(BASE, *bits)) is not None) is found
+
+
+def test_closest_match_wins(tmp_path, clock):
+    index = make_index(tmp_path, max_distance=4)
+    index.add(flip(BASE, 0, 1, 2), '{"brand": "far"}')
+    index.add(flip(BASE, 40), '{"brand": "near"}')
+    assert index.lookup(BASE) == '{"brand": "near"}'
+
+
+def test_exact_duplicate_replaces_entry(tmp_path, clock):
+    index = make_index(tmp_path)
+    index.add(BASE, '{"brand": "old"}')
+    index.add(BASE, '{"brand": "new"}')
+    assert index.lookup(BASE) == '{"brand": "new"}'
+    assert index.stats()["entries"] == 1
+
+
+def test_high_bit_hashes_persist_across_instances(tmp_path, clock):
+    phash = (1 << 63) | 0x1F
+    make_index(tmp_path).add(phash, '{"brand": "A"}')
+    index = make_index(tmp_path)
+    assert index.stats()["entries"] == 1
+    assert index.lookup(flip(phash, 63)) == '{"brand": "A"}'
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    index = make_index(tmp_path, ttl_seconds=100)
+    index.add(BASE, '{"brand": "A"}')
+    clock[0] += 99
+    assert index.lookup(BASE) is not None
+    clock[0] += 2
+    assert index.lookup(BASE) is None
+    assert make_index(tmp_path, ttl_seconds=100).stats()["entries"] == 0
+
+
+def test_expired_match_does_not_hide_a_live_one(tmp_path, clock):
+    index = make_index(tmp_path, ttl_seconds=100)
+    index.add(BASE, '{"brand": "stale"}')
+    clock[0] += 60
+    index.add(flip(BASE, 5), '{"brand": "fresh"}')
+    clock[0] += 50
+    assert index.lookup(BASE) == '{"brand": "fresh"}'
+
+
+def test_least_recently_used_evicted(tmp_path, clock):
+    index = make_index(tmp_path, max_entries=2)
+    first, second, third = BASE, ~BASE & ((1 << HASH_BITS) - 1), 0
+    index.add(first, '{"brand": "first"}')
+    clock[0] += 1
+    index.add(second, '{"brand": "second"}')
+    clock[0] += 1
+    index.lookup(first)  # second is now least recently used
+    clock[0] += 1
+    index.add(third, '{"brand": "third"}')
+    assert index.lookup(second) is None
+    assert index.lookup(first) == '{"brand": "first"}'
+    assert index.lookup(third) == '{"brand": "third"}'
+    assert index.stats()["evictions"] == 1 and index.stats()["entries"] == 2
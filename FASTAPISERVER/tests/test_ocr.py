@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from app.services.health_agent.ocr import (
+    OcrLine, parse_brand, parse_ingredients, parse_label, parse_nutrition, score_extraction
+)
+from app.services.health_agent.preprocessing import binarize_for_ocr, unpack_ocr_page
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Ingredients: Sugar, Salt, Palm Oil.", ["Sugar", "Salt", "Palm Oil"]),
+    ("INGREDIENTS: Potato (62%), Edible Vegetable Oil (Palm Oil), Salt",
+     ["Potato", "Edible Vegetable Oil (Palm Oil)", "Salt"]),
+    ("Ingredients: Milk chocolate (sugar, cocoa butter), peanuts and salt. Store in a cool place",
+     ["Milk chocolate (sugar, cocoa butter)", "peanuts and salt"]),
+    ("Ingredients: Wheat flour, sugar & salt", ["Wheat flour", "sugar & salt"]),
+    ("Ingredients: Wheat flour; Sugar; and Salt", ["Wheat flour", "Sugar", "Salt"]),
+    ("Ingredients: Oats (2.5%), Sugar. Nutrition", ["Oats", "Sugar"]),
+    ("Ingredients: Wheat flour, Sugar\nNutritional Information per 100g", ["Wheat flour", "Sugar"]),
+    ("Ingredients: Wheat flour, Sugar\nAllergen advice: contains gluten", ["Wheat flour", "Sugar"]),
+    ("Ingredients: Emul-\nsifier (E322), Salt", ["Emulsifier (E322)", "Salt"]),
+    ("Ingredlents: Rice, Salt", ["Rice", "Salt"]),  # OCR reads the i as l
+    ("Ingredients: Salt, 3, *, Sugar", ["Salt", "Sugar"]),
+    ("Classic Salted Potato Chips", None),
+])
+def test_parse_ingredients(text, expected):
+    assert parse_ingredients(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Energy 2244 kJ / 536 kcal", {"calories": 536}),
+    ("Energy 2100 kJ", {"calories": 502}),
+    ("Calories 120", {"calories": 120}),
+    ("Sodium 0.72 g", {"sodium_mg": 720}),
+    ("Sodium 170mg", {"sodium_mg": 170}),
+    ("Protein 6500 mg", {"protein_g": 6.5}),
+    ("Total Fat 33.2g\nSaturated Fat 15.1 g\nTrans Fat 0.1g",
+     {"total_fat_g": 33.2, "saturated_fat_g": 15.1}),
+    ("Total Carbohydrate 20g of which sugars 5g", {"carbohydrates_g": 20.0, "sugars_g": 5.0}),
+    ("Fat 12g Saturated Fat 4g Protein 3g", {"total_fat_g": 12.0, "saturated_fat_g": 4.0, "protein_g": 3.0}),
+    ("Dietary Fibre 3,5 g", {"fiber_g": 3.5}),
+    ("Protein 6.5g\nProtein 2g", {"protein_g": 6.5}),  # First value per nutrient
+    ("Serving size: 25g\nSugars 5g", {"sugars_g": 5.0, "serving_size": "25g"}),
+    ("Sugar, salt, palm fat", None),
+    ("", None),
+])
+def test_parse_nutrition(text, expected):
+    assert parse_nutrition(text) == expected
+
+
+@pytest.mark.parametrize("lines, expected", [
+    ([OcrLine("Classic Potato Chips", 0.9, 30), OcrLine("CRUNCHO", 0.9, 80),
+      OcrLine("Ingredients: Potato, Salt", 0.9, 14)], "CRUNCHO"),
+    # Lines from the ingredient list on are never the brand
+    ([OcrLine("Chips", 0.9, 20), OcrLine("Ingredients: Potato", 0.9, 14),
+      OcrLine("MANUFACTURED BY GIANT FOODS", 0.9, 90)], "Chips"),
+    ([OcrLine("Nutritional Information", 0.9, 60), OcrLine("Snacko.", 0.9, 40)], "Snacko"),
+    ([OcrLine("250 g 1234", 0.9, 80), OcrLine("Ab", 0.9, 40)], None),
+    ([], None),
+])
+def test_parse_brand(lines, expected):
+    assert parse_brand(lines) == expected
+
+
+CLEAN = [OcrLine("Ingredients: Sugar, Salt", 0.9, 14)]
+
+
+@pytest.mark.parametrize("brand, ingredients, text, nutrition, expected", [
+    ("Acme", ["Sugar", "Salt"], "Ingredients: Sugar, Salt", None, 0.95),
+    (None, ["Sugar", "Salt"], "Ingredients: Sugar, Salt", None, 0.0),
+    ("", ["Sugar", "Salt"], "Ingredients: Sugar, Salt", None, 0.0),
+    ("Acme", ["Sugar"], "Ingredients: Sugar", None, 0.0),
+    ("Acme", None, "Sugar, Salt", None, 0.0),
+    ("Acme", ["Sugar", "Qxzvw"], "Ingredients: Sugar, Qxzvw", None, 0.75),
+    # A visible nutrition table must parse into at least three values
+    ("Acme", ["Sugar", "Salt"], "Ingredients: Sugar, Salt\nNutrition", {"calories": 90}, 0.85),
+    ("Acme", ["Sugar", "Salt"], "Ingredients: Sugar, Salt\nNutrition",
+     {"calories": 90, "sugars_g": 5.0, "protein_g": 1.0}, 0.95),
+])
+def test_score_extraction(brand, ingredients, text, nutrition, expected):
+    assert score_extraction(CLEAN, text, brand, ingredients, nutrition) == expected
+
+
+def test_score_weights_ocr_confidence_by_text_length():
+    lines = [OcrLine("Ingredients: Sugar, Salt", 1.0, 14), OcrLine("x" * 24, 0.5, 14)]
+    assert score_extraction(lines, "", "Acme", ["Sugar", "Salt"], None) == 0.875
+
+
+def test_parse_label_without_brand_is_escalated():
+    lines = [OcrLine("Ingredients: Sugar, Salt, Palm Oil.", 0.95, 14)]
+    extraction = parse_label(lines)
+    assert extraction.brand is None
+    assert extraction.ingredients == ["Sugar", "Salt", "Palm Oil"]
+    assert extraction.confidence == 0.0
+
+
+def test_ocr_page_round_trip():
+    image = np.full((40, 100), 255, dtype=np.uint8)
+    image[10:30, 20:60] = 0
+    page = binarize_for_ocr(image)
+    unpacked = unpack_ocr_page(page)
+    assert unpacked.shape == (120, 304)  # Upscaled 3x for Tesseract, width padded to whole bytes
+    assert page.nbytes * 8 == unpacked.nbytes
+    assert set(np.unique(unpacked)) == {0, 255}
+    assert unpacked.mean() > 127  # Black text on white
+
+
+def test_ocr_page_inverts_light_text_on_dark():
+    image = np.zeros((40, 100), dtype=np.uint8)
+    image[10:30, 20:60] = 255
+    assert unpack_ocr_page(binarize_for_ocr(image)).mean() > 127
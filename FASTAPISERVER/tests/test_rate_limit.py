@@ -0,0 +1,107 @@
+import asyncio
+import types
+import pytest
+from app.utils import rate_limit as rate_limit_module
+from app.utils.rate_limit import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; asyncio.sleep in the limiter advances it instead of waiting"""
+    now = [1000.0]
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(rate_limit_module, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(rate_limit_module, "asyncio", types.SimpleNamespace(Lock=asyncio.Lock, sleep=sleep))
+    return types.SimpleNamespace(now=now, sleeps=sleeps)
+
+
+def test_burst_is_immediate_then_waits_for_refill(clock):
+    async def scenario():
+        bucket = TokenBucket(rate=2, burst=3)
+        for _ in range(3):
+            await bucket.acquire()
+        assert clock.sleeps == []
+        await bucket.acquire()
+        return bucket
+
+    bucket = asyncio.run(scenario())
+    assert clock.sleeps == [0.5]
+    assert bucket.stats()["acquired"] == 4 and bucket.stats()["throttled"] == 1
+    assert bucket.stats()["avg_wait_ms"] == 500.0
+
+
+def test_refill_is_proportional_and_capped_at_burst(clock):
+    async def scenario():
+        bucket = TokenBucket(rate=1, burst=3)
+        for _ in range(3):
+            await bucket.acquire()
+        clock.now[0] += 2  # Two tokens back
+        await bucket.acquire()
+        await bucket.acquire()
+        assert clock.sleeps == []
+        clock.now[0] += 0.25
+        await bucket.acquire()  # Waits only for the missing 0.75 of a token
+        assert clock.sleeps == [0.75]
+        clock.now[0] += 3600
+        for _ in range(3):
+            await bucket.acquire()
+        assert clock.sleeps == [0.75]
+        await bucket.acquire()
+        assert clock.sleeps == [0.75, 1.0]
+
+    asyncio.run(scenario())
+
+
+def test_burst_below_one_is_clamped(clock):
+    assert TokenBucket(rate=1, burst=0).burst == 1
+
+
+def test_waiters_are_served_in_arrival_order(clock):
+    async def scenario():
+        bucket = TokenBucket(rate=1, burst=1)
+        order = []
+
+        async def caller(name):
+            await bucket.acquire()
+            order.append((name, clock.now[0]))
+
+        await asyncio.gather(*(caller(name) for name in "abcd"))
+        return order
+
+    assert asyncio.run(scenario()) == [("a", 1000.0), ("b", 1001.0), ("c", 1002.0), ("d", 1003.0)]
+
+
+def test_max_wait_gives_up_its_turn():
+    async def scenario():
+        bucket = TokenBucket(rate=0.01, burst=1)
+        await bucket.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(bucket.acquire(), timeout=0.05)
+        # The cancelled waiter released the queue and took no token
+        assert not bucket._lock.locked()
+        assert bucket.acquired == 1
+        bucket._tokens = 1
+        await asyncio.wait_for(bucket.acquire(), timeout=0.05)
+        return bucket
+
+    bucket = asyncio.run(scenario())
+    assert bucket.stats()["acquired"] == 2 and bucket.stats()["throttled"] == 1
+
+
+def test_openfoodfacts_search_max_wait(monkeypatch):
+    from app.services.health_agent import tools
+    bucket = TokenBucket(rate=0.01, burst=1)
+    monkeypatch.setattr(tools, "openfoodfacts_rate_limiter", bucket)
+
+    async def scenario():
+        await bucket.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await tools.ProHealthTools._search_openfoodfacts(None, {"search_terms": "salt"}, timeout=1, max_wait=0.05)
+
+    asyncio.run(scenario())
@@ -0,0 +1,77 @@
+import pytest
+from app.utils import cache as cache_module
+from app.utils.cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_hit_and_miss_counters(clock):
+    cache = ResponseCache(max_bytes=100, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", b"body")
+    assert cache.get("a") == b"body"
+    assert cache.get("a") == b"body"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (2, 1, 0.6667)
+    assert (stats["entries"], stats["size_bytes"]) == (1, 4)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(max_bytes=100, ttl_seconds=60)
+    cache.set("a", b"body")
+    clock[0] += 60
+    assert cache.get("a") == b"body"
+    clock[0] += 1
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["size_bytes"] == 0
+
+
+def test_least_recently_used_evicted_over_byte_cap(clock):
+    cache = ResponseCache(max_bytes=10, ttl_seconds=60)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    cache.get("a")  # b is now least recently used
+    cache.set("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size_bytes"] == 8
+
+
+def test_one_large_body_evicts_several(clock):
+    cache = ResponseCache(max_bytes=10, ttl_seconds=60)
+    for key in "abc":
+        cache.set(key, b"xxx")
+    cache.set("d", b"x" * 8)
+    assert [cache.get(key) for key in "abc"] == [None, None, None]
+    assert cache.stats()["evictions"] == 3
+
+
+def test_body_over_cap_is_not_stored(clock):
+    cache = ResponseCache(max_bytes=10, ttl_seconds=60)
+    cache.set("a", b"aaaa")
+    cache.set("big", b"x" * 11)
+    assert cache.get("big") is None
+    assert cache.get("a") == b"aaaa"
+
+
+def test_overwrite_replaces_size_and_age(clock):
+    cache = ResponseCache(max_bytes=100, ttl_seconds=60)
+    cache.set("a", b"old body")
+    clock[0] += 50
+    cache.set("a", b"new")
+    clock[0] += 50
+    assert cache.get("a") == b"new"
+    assert cache.stats()["size_bytes"] == 3
+
+
+def test_clear(clock):
+    cache = ResponseCache(max_bytes=100, ttl_seconds=60)
+    cache.set("a", b"body")
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.stats()["size_bytes"] == 0
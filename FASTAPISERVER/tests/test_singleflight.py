@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from app.utils.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        return flight, await asyncio.gather(flight.do("a", lambda: work(1)), flight.do("b", lambda: work(2)))
+
+    flight, results = asyncio.run(scenario())
+    assert results == [1, 2]
+    assert flight.stats()["leaders"] == 2
+
+
+def test_sequential_calls_run_again():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        return [await flight.do("key", work), await flight.do("key", work)]
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        return await asyncio.gather(flight.do("key", work), flight.do("key", work), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("key", work))
+        follower = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+
+
+def test_cancelled_leader_keeps_spilled_input_until_done(tmp_path):
+    async def scenario():
+        flight = SingleFlight("test")
+        leader_file = tmp_path / "leader.jpg"
+        follower_file = tmp_path / "follower.jpg"
+        leader_file.write_bytes(b"label")
+        follower_file.write_bytes(b"label")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return leader_file.read_bytes()
+
+        leader = asyncio.create_task(flight.do("key", work, cleanup=leader_file.unlink))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", work, cleanup=follower_file.unlink))
+        await asyncio.sleep(0.01)
+        # The joining caller's own copy is never read
+        assert leader_file.exists() and not follower_file.exists()
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert leader_file.exists()
+        return leader_file, await follower
+
+    leader_file, result = asyncio.run(scenario())
+    assert result == b"label"
+    assert not leader_file.exists()
+
+
+def test_cleanup_runs_when_shared_work_fails(tmp_path):
+    async def scenario():
+        flight = SingleFlight("test")
+        spilled = tmp_path / "upload.jpg"
+        spilled.write_bytes(b"label")
+
+        async def work():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await flight.do("key", work, cleanup=spilled.unlink)
+        return spilled
+
+    assert not asyncio.run(scenario()).exists()